@@ -1,14 +1,205 @@
-import pandas as pd
-import numpy as np
+import time
+_import_started = time.perf_counter() # Import-time checkpoints, see startup_report()
 import datetime
 import uuid
-
+import sys
+import json
+import itertools
+import functools
+import bisect
+import tracemalloc
+import threading
+import os
+import io
+import tempfile
+import zipfile
+import importlib.util
+import shutil
+import statistics
+import multiprocessing
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+
+_stdlib_imported = time.perf_counter()
+import pandas as pd
+import numpy as np
+_pandas_imported = time.perf_counter()
 import dash
 from dash import dcc
 from dash import html
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
+_dash_imported = time.perf_counter()
 import plotly.express as px
 import plotly.graph_objects as go
+_plotly_imported = time.perf_counter()
+
+# Seconds spent per import and boot stage; startup_report() turns them into a table
+STARTUP_TIMINGS = OrderedDict([
+    ('import stdlib', _stdlib_imported - _import_started),
+    ('import pandas/numpy', _pandas_imported - _stdlib_imported),
+    ('import dash', _dash_imported - _pandas_imported),
+    ('import plotly', _plotly_imported - _dash_imported)
+])
+
+@contextmanager
+def startup_stage(name):
+    """Adds the time spent in the with-block to STARTUP_TIMINGS[name]."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STARTUP_TIMINGS[name] = STARTUP_TIMINGS.get(name, 0.0) + time.perf_counter() - started
+
+def startup_report():
+    """Returns seconds and share of total per import and boot stage recorded so far."""
+    report = pd.DataFrame(list(STARTUP_TIMINGS.items()), columns=['stage', 'seconds'])
+    report['share'] = report['seconds'] / report['seconds'].sum()
+    report.loc[len(report)] = ['total', report['seconds'].sum(), 1.0]
+    return report
+
+# --- Runtime metrics ---
+# Every dashboard callback, and the stages inside it (filtering, section computes, figure and
+# table construction, JSON serialization), is timed into fixed-bucket histograms. Observing is a
+# bisect and a few additions under a lock, cheap enough to leave on. The /metrics route serves the
+# histograms in the Prometheus text format, metrics_report() estimates p50/p99 from them, and
+# app_config['trace_log'] names an optional JSON-lines file with one record per callback request.
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0) # Seconds
+SIZE_BUCKETS = (1e3, 3e3, 1e4, 3e4, 1e5, 3e5, 1e6, 3e6, 1e7, 3e7) # Bytes
+
+class Histogram:
+    """Prometheus-style histogram with one label: per label value, counts per upper bucket bound, a sum and a count."""
+
+    def __init__(self, name, description, label, buckets):
+        self.name = name
+        self.description = description
+        self.label = label
+        self.buckets = buckets
+        self._series = {} # label value -> [counts per bucket (+Inf last), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, label_value, value):
+        """Records one observation for label_value."""
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][position] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self):
+        """Returns {label value: (cumulative bucket counts, sum, count)}."""
+        with self._lock:
+            return {label_value: (list(itertools.accumulate(counts)), total, count)
+                    for label_value, (counts, total, count) in self._series.items()}
+
+    def quantile(self, cumulative, count, q):
+        """Estimates the q-quantile from cumulative bucket counts, interpolating within a bucket like histogram_quantile."""
+        rank = q * count
+        position = bisect.bisect_left(cumulative, rank)
+        if position >= len(self.buckets):
+            return self.buckets[-1] # Above the largest finite bound
+        lower = self.buckets[position - 1] if position > 0 else 0.0
+        below = cumulative[position - 1] if position > 0 else 0
+        in_bucket = cumulative[position] - below
+        return lower + (self.buckets[position] - lower) * ((rank - below) / in_bucket if in_bucket else 0.0)
+
+    def render(self):
+        """Returns the histogram in the Prometheus text exposition format."""
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for label_value, (cumulative, total, count) in sorted(self.snapshot().items()):
+            label = f'{self.label}="{label_value}"'
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), cumulative):
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {bucket_count}')
+            lines.append(f"{self.name}_sum{{{label}}} {total}")
+            lines.append(f"{self.name}_count{{{label}}} {count}")
+        return "\n".join(lines)
+
+CALLBACK_SECONDS = Histogram('healthkart_callback_seconds', "Time spent in each dashboard callback.", 'callback', LATENCY_BUCKETS)
+STAGE_SECONDS = Histogram('healthkart_stage_seconds', "Time spent in each stage of the callbacks (nested stages included).",
+                          'stage', LATENCY_BUCKETS)
+SERIALIZE_SECONDS = Histogram('healthkart_serialize_seconds', "Request time outside the callback: JSON serialization and dispatch.",
+                              'callback', LATENCY_BUCKETS)
+RESPONSE_BYTES = Histogram('healthkart_response_bytes', "Size of each callback response.", 'callback', SIZE_BUCKETS)
+METRICS = [CALLBACK_SECONDS, STAGE_SECONDS, SERIALIZE_SECONDS, RESPONSE_BYTES]
+
+_request_trace = threading.local() # The current callback request's trace record, if any
+_trace_log_lock = threading.Lock()
+
+@contextmanager
+def timed_stage(name):
+    """Times the with-block (or decorated function) into STAGE_SECONDS[name] and the current request trace."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        STAGE_SECONDS.observe(name, seconds)
+        trace = getattr(_request_trace, 'record', None)
+        if trace is not None:
+            trace['stages'][name] = trace['stages'].get(name, 0.0) + seconds
+
+def timed_callback(func):
+    """Wraps a dashboard callback so each completed call is timed into CALLBACK_SECONDS."""
+    @functools.wraps(func)
+    def timed(*args, **kwargs):
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        seconds = time.perf_counter() - started
+        CALLBACK_SECONDS.observe(func.__name__, seconds)
+        trace = getattr(_request_trace, 'record', None)
+        if trace is not None:
+            trace['callback'], trace['callback_seconds'] = func.__name__, seconds
+        return result
+    return timed
+
+def start_request_trace():
+    """Flask before_request hook starting the trace record of a callback request."""
+    from flask import request
+    if request.path.endswith('/_dash-update-component'):
+        _request_trace.record = {'started': time.time(), 'callback': None, 'callback_seconds': 0.0, 'stages': {}}
+        _request_trace.started = time.perf_counter()
+
+def finish_request_trace(response):
+    """Flask after_request hook recording serialization time and response size, and appending to the trace log."""
+    trace = getattr(_request_trace, 'record', None)
+    if trace is None:
+        return response
+    _request_trace.record = None
+    if trace['callback'] is not None and response.status_code == 200:
+        trace['seconds'] = time.perf_counter() - _request_trace.started
+        trace['serialize_seconds'] = max(trace['seconds'] - trace['callback_seconds'], 0.0)
+        trace['response_bytes'] = len(response.get_data())
+        SERIALIZE_SECONDS.observe(trace['callback'], trace['serialize_seconds'])
+        RESPONSE_BYTES.observe(trace['callback'], trace['response_bytes'])
+        if app_config['trace_log']:
+            line = json.dumps(trace)
+            with _trace_log_lock:
+                with open(app_config['trace_log'], 'a') as trace_log:
+                    trace_log.write(line + "\n")
+    return response
+
+def metrics_endpoint():
+    """Serves METRICS in the Prometheus text exposition format."""
+    from flask import Response
+    return Response("\n".join(histogram.render() for histogram in METRICS) + "\n", mimetype='text/plain; version=0.0.4')
+
+def metrics_report():
+    """Returns count, mean and estimated p50/p99 per series (callback or stage) of each histogram recorded so far."""
+    rows = [{
+        'metric': histogram.name,
+        'series': label_value,
+        'count': count,
+        'mean': total / count,
+        'p50': histogram.quantile(cumulative, count, 0.5),
+        'p99': histogram.quantile(cumulative, count, 0.99)
+    } for histogram in METRICS for label_value, (cumulative, total, count) in sorted(histogram.snapshot().items())]
+    return pd.DataFrame(rows, columns=['metric', 'series', 'count', 'mean', 'p50', 'p99'])
 
 # --- 1. Data Modeling---
 
@@ -24,14 +215,23 @@ def get_random_date(start_date, end_date):
     random_date = start_date + datetime.timedelta(days=random_number_of_days)
     return random_date.strftime('%Y-%m-%d')
 
-def generate_mock_data(num_influencers=20, num_posts_per_influencer=5, num_tracking_entries_per_post=3):
-    """Generates mock data for influencers, posts, tracking_data, and payouts."""
+CATEGORIES = ['Fitness', 'Beauty', 'Nutrition', 'Lifestyle', 'Gaming']
+GENDERS = ['Male', 'Female', 'Other']
+PLATFORMS = ['Instagram', 'YouTube', 'Twitter']
+BRANDS = ['MuscleBlaze', 'HKVitals', 'Gritzo', 'TrueBasics']
+PRODUCTS = ['Protein Powder', 'Multivitamin', 'Kids Nutrition', 'Omega-3', 'Creatine', 'Hair Gummies']
+CAMPAIGNS = [f'Campaign-{i}' for i in range(1, 5)]
+PAYOUT_BASES = ['post', 'order']
+TABLE_NAMES = ['influencers', 'posts', 'tracking_data', 'payouts']
 
-    categories = ['Fitness', 'Beauty', 'Nutrition', 'Lifestyle', 'Gaming']
-    genders = ['Male', 'Female', 'Other']
-    platforms = ['Instagram', 'YouTube', 'Twitter']
-    brands = ['MuscleBlaze', 'HKVitals', 'Gritzo', 'TrueBasics']
-    products = ['Protein Powder', 'Multivitamin', 'Kids Nutrition', 'Omega-3', 'Creatine', 'Hair Gummies']
+def generate_mock_data_loop(num_influencers=20, num_posts_per_influencer=5, num_tracking_entries_per_post=3):
+    """Generates mock data row by row (reference implementation for generate_mock_data)."""
+
+    categories = CATEGORIES
+    genders = GENDERS
+    platforms = PLATFORMS
+    brands = BRANDS
+    products = PRODUCTS
 
     influencers_data = []
     posts_data = []
@@ -64,6 +264,7 @@ def generate_mock_data(num_influencers=20, num_posts_per_influencer=5, num_track
             comments = int(likes * np.random.uniform(0.01, 0.1))
 
             posts_data.append({
+                'ID': post_id,
                 'influencer_id': influencer_id,
                 'platform': post_platform,
                 'date': post_date,
@@ -101,6 +302,7 @@ def generate_mock_data(num_influencers=20, num_posts_per_influencer=5, num_track
             total_payout = rate if basis == 'post' else total_orders_for_post * rate
             payouts_data.append({
                 'influencer_id': influencer_id,
+                'post_id': post_id,
                 'basis': basis,
                 'rate': rate,
                 'orders': total_orders_for_post, # Total orders linked to this payout entry
@@ -114,294 +316,2674 @@ def generate_mock_data(num_influencers=20, num_posts_per_influencer=5, num_track
 
     return influencers_df, posts_df, tracking_data_df, payouts_df
 
-# Generate initial data
-influencers_df, posts_df, tracking_data_df, payouts_df = generate_mock_data()
+# --- Bulk generation ---
+# Columns are drawn in whole batches from a numpy Generator instead of one row at a time,
+# so a seed fully determines the output and cost is dominated by array operations.
+
+MOCK_START_DATE = np.datetime64('2024-01-01')
+MOCK_DAYS = 365 # Posts fall on 2024-01-01 .. 2024-12-30, like get_random_date
+TRACKING_WINDOW_DAYS = 30 # Tracking events fall within 30 days after their post
+
+_HEX_DIGITS = np.array([list(f'{b:02x}') for b in range(256)], dtype='S1')
+_UUID_HEX_POSITIONS = [i for i in range(36) if i not in (8, 13, 18, 23)]
+
+def generate_uuids(rng, n):
+    """Generates n random version-4 UUID strings in one batch."""
+    raw = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40 # Version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80 # RFC 4122 variant
+    chars = np.full((n, 36), b'-', dtype='S1')
+    chars[:, _UUID_HEX_POSITIONS] = _HEX_DIGITS[raw].reshape(n, 32)
+    return chars.view('S36').ravel().astype(str)
+
+def _generate_mock_block(rng, first_influencer, num_influencers, num_posts_per_influencer, num_tracking_entries_per_post):
+    """Generates the four tables for a contiguous block of influencers."""
+    num_posts = num_influencers * num_posts_per_influencer
+    num_tracking = num_posts * num_tracking_entries_per_post
+
+    # Influencers
+    influencer_ids = generate_uuids(rng, num_influencers)
+    follower_count = rng.integers(10000, 1000000, size=num_influencers) # 10k to 1M
+    influencers_df = pd.DataFrame({
+        'ID': influencer_ids,
+        'name': [f'Influencer {i + 1}' for i in range(first_influencer, first_influencer + num_influencers)],
+        'category': np.asarray(CATEGORIES)[rng.integers(len(CATEGORIES), size=num_influencers)],
+        'gender': np.asarray(GENDERS)[rng.integers(len(GENDERS), size=num_influencers)],
+        'follower_count': follower_count,
+        'platform': np.asarray(PLATFORMS)[rng.integers(len(PLATFORMS), size=num_influencers)] # Primary platform
+    })
+
+    # Posts, one row per (influencer, post)
+    post_influencer = np.repeat(np.arange(num_influencers), num_posts_per_influencer)
+    post_platform = np.asarray(PLATFORMS)[rng.integers(len(PLATFORMS), size=num_posts)]
+    post_date = MOCK_START_DATE + rng.integers(MOCK_DAYS, size=num_posts)
+    reach = (follower_count[post_influencer] * rng.uniform(0.2, 0.8, size=num_posts)).astype(np.int64)
+    likes = (reach * rng.uniform(0.01, 0.1, size=num_posts)).astype(np.int64)
+    comments = (likes * rng.uniform(0.01, 0.1, size=num_posts)).astype(np.int64)
+    captions = np.array([[f'Check out this amazing {product} from {brand}! #ad #healthkart' for brand in BRANDS] for product in PRODUCTS])
+    post_ids = generate_uuids(rng, num_posts)
+    urls = np.char.add(np.char.add(np.char.add('https://', post_platform), '.com/post/'), post_ids)
+    posts_df = pd.DataFrame({
+        'ID': post_ids,
+        'influencer_id': influencer_ids[post_influencer],
+        'platform': post_platform,
+        'date': np.datetime_as_string(post_date, unit='D'),
+        'URL': urls,
+        'caption': captions[rng.integers(len(PRODUCTS), size=num_posts), rng.integers(len(BRANDS), size=num_posts)],
+        'reach': reach,
+        'likes': likes,
+        'comments': comments
+    })
+
+    # Tracking data, one row per (post, entry)
+    tracking_post = np.repeat(np.arange(num_posts), num_tracking_entries_per_post)
+    tracking_date = post_date[tracking_post] + rng.integers(TRACKING_WINDOW_DAYS, size=num_tracking)
+    num_orders = rng.integers(1, 50, size=num_tracking) # 1 to 50 orders
+    revenue_per_order = rng.integers(200, 1500, size=num_tracking) # 200 to 1500 per order
+    tracking_data_df = pd.DataFrame({
+        'source': post_platform[tracking_post],
+        'campaign': np.asarray(CAMPAIGNS)[rng.integers(len(CAMPAIGNS), size=num_tracking)],
+        'influencer_id': influencer_ids[post_influencer[tracking_post]],
+        'user_id': generate_uuids(rng, num_tracking),
+        'product': np.asarray(PRODUCTS)[rng.integers(len(PRODUCTS), size=num_tracking)],
+        'brand': np.asarray(BRANDS)[rng.integers(len(BRANDS), size=num_tracking)],
+        'date': np.datetime_as_string(tracking_date, unit='D'),
+        'orders': num_orders,
+        'revenue': num_orders * revenue_per_order
+    })
+
+    # Payouts, one row per post
+    basis = np.asarray(PAYOUT_BASES)[rng.integers(len(PAYOUT_BASES), size=num_posts)]
+    is_post_basis = basis == 'post'
+    rate = np.where(is_post_basis, rng.uniform(500, 5000, size=num_posts), rng.uniform(0.5, 10, size=num_posts))
+    total_orders_for_post = num_orders.reshape(num_posts, num_tracking_entries_per_post).sum(axis=1)
+    payouts_df = pd.DataFrame({
+        'influencer_id': influencer_ids[post_influencer],
+        'post_id': post_ids, # The post this payout is for
+        'basis': basis,
+        'rate': rate,
+        'orders': total_orders_for_post, # Total orders linked to this payout entry
+        'total_payout': np.where(is_post_basis, rate, total_orders_for_post * rate)
+    })
+
+    return influencers_df, posts_df, tracking_data_df, payouts_df
+
+def generate_mock_data(num_influencers=20, num_posts_per_influencer=5, num_tracking_entries_per_post=3, seed=None):
+    """Generates mock data for influencers, posts, tracking_data, and payouts."""
+    rng = np.random.default_rng(seed)
+    return _generate_mock_block(rng, 0, num_influencers, num_posts_per_influencer, num_tracking_entries_per_post)
+
+def iter_mock_data_chunks(num_influencers=20, num_posts_per_influencer=5, num_tracking_entries_per_post=3,
+                          chunk_size=10000, seed=None):
+    """Yields (influencers, posts, tracking_data, payouts) for consecutive blocks of chunk_size influencers."""
+    rng = np.random.default_rng(seed)
+    for first_influencer in range(0, num_influencers, chunk_size):
+        block_size = min(chunk_size, num_influencers - first_influencer)
+        yield _generate_mock_block(rng, first_influencer, block_size, num_posts_per_influencer, num_tracking_entries_per_post)
+
+def write_mock_data_csv(directory, **kwargs):
+    """Streams generated chunks into <table>.csv files in directory without holding the full dataset."""
+    os.makedirs(directory, exist_ok=True)
+    for chunk_number, tables in enumerate(iter_mock_data_chunks(**kwargs)):
+        for table_name, df in zip(TABLE_NAMES, tables):
+            df.to_csv(os.path.join(directory, f'{table_name}.csv'), mode='w' if chunk_number == 0 else 'a',
+                      header=chunk_number == 0, index=False)
+    return [os.path.join(directory, f'{table_name}.csv') for table_name in TABLE_NAMES]
+
+def measure_generation_throughput(generator=generate_mock_data, **kwargs):
+    """Times one call of a mock data generator and reports rows generated per second."""
+    started = time.perf_counter()
+    tables = generator(**kwargs)
+    seconds = time.perf_counter() - started
+    rows = sum(len(df) for df in tables)
+    return {
+        'generator': generator.__name__,
+        'rows': rows,
+        'tracking_rows': len(tables[2]),
+        'seconds': seconds,
+        'rows_per_sec': rows / seconds if seconds > 0 else float('inf')
+    }
+
+# --- Compact schema ---
+# Low-cardinality strings become categoricals, influencer, post and user IDs become integer surrogate
+# keys (the strings live only in influencers['ID'], posts['ID'] and the user lookup), dates become
+# datetime64 and integer measures are downcast, so filters and groupbys compare small integers.
+
+# Column order of the generator's string schema, restored by decode_table
+STRING_SCHEMA_COLUMNS = {
+    'influencers': ['ID', 'name', 'category', 'gender', 'follower_count', 'platform'],
+    'posts': ['ID', 'influencer_id', 'platform', 'date', 'URL', 'caption', 'reach', 'likes', 'comments'],
+    'tracking_data': ['source', 'campaign', 'influencer_id', 'user_id', 'product', 'brand', 'date', 'orders', 'revenue'],
+    'payouts': ['influencer_id', 'post_id', 'basis', 'rate', 'orders', 'total_payout']
+}
+
+CATEGORICAL_COLUMNS = {
+    'influencers': ['category', 'gender', 'platform'],
+    'posts': ['platform', 'caption'],
+    'tracking_data': ['source', 'campaign', 'product', 'brand'],
+    'payouts': ['basis']
+}
+
+def _compact_frame(table_name, df):
+    """Applies categorical, datetime and downcast integer dtypes to one table."""
+    df = df.copy()
+    for col in CATEGORICAL_COLUMNS[table_name]:
+        df[col] = df[col].astype('category')
+    if 'date' in df.columns:
+        df['date'] = pd.to_datetime(df['date'], format='%Y-%m-%d')
+    for col in df.select_dtypes('integer').columns:
+        if not col.endswith('_key'):
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+    return df
+
+class KeyLookup:
+    """Maps IDs to surrogate keys, their position in a lookup, through a few hash tables extended per batch.
+
+    Each layer is a pd.Index of IDs with consecutive keys, whose hash table pandas builds once on first
+    lookup. Extending adds the batch as a new layer rather than rebuilding the whole lookup, and merges
+    trailing layers of similar size, so there are O(log n) layers and each ID is rehashed O(log n) times
+    over all appends. Lookups are immutable, so older dataset versions keep theirs.
+    """
+
+    def __init__(self, layers=()):
+        self.layers = tuple(layers) # (first key, pd.Index of IDs) pairs
+
+    @classmethod
+    def from_ids(cls, ids):
+        """Builds the lookup of IDs held in key order."""
+        return cls().extended(ids)
+
+    def __len__(self):
+        first, ids = self.layers[-1] if self.layers else (0, ())
+        return first + len(ids)
+
+    def get_indexer(self, values):
+        """Returns the key of each value, or -1 for values that are not in the lookup."""
+        keys = np.full(len(values), -1, dtype=np.int64)
+        for first, ids in self.layers:
+            found = ids.get_indexer(values)
+            keys[found >= 0] = first + found[found >= 0]
+        return keys
+
+    def isin(self, values):
+        """Returns a boolean array marking the values that are in the lookup."""
+        return self.get_indexer(values) >= 0
+
+    def ids(self, start=0):
+        """Returns the IDs with keys from start on, in key order."""
+        parts = [ids[max(start - first, 0):] for first, ids in self.layers if first + len(ids) > start]
+        return parts[0].append(parts[1:]) if parts else pd.Index([], dtype=object)
+
+    def extended(self, ids):
+        """Returns a lookup that also maps ids, which must be new and distinct, to the keys after this lookup's."""
+        ids = pd.Index(ids, dtype=object)
+        layers = list(self.layers)
+        # Merge while the previous layer is at most twice the size of the new one, so layer sizes shrink geometrically
+        while layers and len(layers[-1][1]) <= 2 * len(ids):
+            first, previous = layers.pop()
+            ids = previous.append(ids)
+        first = layers[-1][0] + len(layers[-1][1]) if layers else 0
+        return KeyLookup(layers + [(first, ids)]) if len(ids) else KeyLookup(layers)
+
+def _surrogate_keys(values, known):
+    """Maps values to their key in the known KeyLookup, extending it with unseen values; returns (keys, lookup)."""
+    keys = known.get_indexer(values)
+    unseen = keys < 0
+    if unseen.any():
+        new_keys, new_values = pd.factorize(values[unseen])
+        keys[unseen] = len(known) + new_keys
+        known = known.extended(new_values)
+    return keys.astype(np.int32), known
+
+def compact_table(table_name, df, influencer_ids, user_ids, post_ids=None):
+    """Converts one generator table to the compact schema; returns (table, user_ids extended with new users).
+
+    influencer_ids is the influencer KeyLookup that influencer_id values are mapped through, user_ids the user KeyLookup
+    and post_ids the post KeyLookup for payouts' post_id. Payouts without a post_id get post_key -1.
+    """
+    df = df.reset_index(drop=True)
+    if 'influencer_id' in df.columns:
+        df = df.drop(columns=['influencer_id']).assign(influencer_key=influencer_ids.get_indexer(df['influencer_id']).astype(np.int32))
+    if table_name == 'payouts':
+        post_key = post_ids.get_indexer(df['post_id']) if 'post_id' in df.columns else np.full(len(df), -1)
+        df = df.drop(columns=['post_id'], errors='ignore').assign(post_key=post_key.astype(np.int32))
+    if 'user_id' in df.columns:
+        user_key, user_ids = _surrogate_keys(df['user_id'].to_numpy(), user_ids)
+        df = df.drop(columns=['user_id']).assign(user_key=user_key)
+    df = _compact_frame(table_name, df)
+    if table_name == 'tracking_data':
+        df = sort_by_date(df) # Date ranges are then contiguous row slices (see date_bounds)
+    return df, user_ids
+
+def _new_ids(kind, ids, known):
+    """Returns the known KeyLookup extended with a batch's ids; raises ValueError if the batch repeats a known or batch ID."""
+    ids = pd.Index(ids, dtype=object)
+    repeated = ids[ids.duplicated() | known.isin(ids)]
+    if len(repeated):
+        raise ValueError(f"Batch repeats {len(repeated)} existing or duplicate {kind} IDs, e.g. {repeated[0]!r}")
+    return known.extended(ids)
+
+def _check_references(table_name, kind, values, known):
+    """Raises ValueError if values (nulls aside) hold IDs that are not in the known KeyLookup."""
+    values = pd.Series(values).dropna()
+    unknown = values[~known.isin(pd.Index(values, dtype=object))]
+    if len(unknown):
+        raise ValueError(f"{table_name} batch has {len(unknown)} rows with unknown {kind} IDs, e.g. {unknown.iloc[0]!r}")
+
+def validate_batch(influencer_ids, post_ids, influencers=None, posts=None, tracking_data=None, payouts=None):
+    """Raises ValueError if a batch repeats a known or batch influencer or post ID, or references an unknown one.
+
+    influencer_ids and post_ids are the dataset's KeyLookups. Returns them extended with the batch's influencers and posts.
+    """
+    if influencers is not None:
+        influencer_ids = _new_ids('influencer', influencers['ID'], influencer_ids)
+    if posts is not None:
+        post_ids = _new_ids('post', posts['ID'], post_ids)
+    for table_name, df in (('posts', posts), ('tracking_data', tracking_data), ('payouts', payouts)):
+        if df is not None:
+            _check_references(table_name, 'influencer', df['influencer_id'], influencer_ids)
+    if payouts is not None and 'post_id' in payouts.columns:
+        _check_references('payouts', 'post', payouts['post_id'], post_ids)
+    return influencer_ids, post_ids
+
+def compact_tables(influencers, posts, tracking_data, payouts):
+    """Converts the four generator tables to the compact schema; returns (tables, user_ids lookup)."""
+    # An influencer's key is its row position in the influencers table
+    influencer_ids = KeyLookup.from_ids(influencers['ID'])
+    post_ids = KeyLookup.from_ids(posts['ID']) # Likewise a post's key is its row position in posts
+    user_ids = KeyLookup()
+    tables = []
+    for table_name, df in zip(TABLE_NAMES, (influencers, posts, tracking_data, payouts)):
+        table, user_ids = compact_table(table_name, df, influencer_ids, user_ids, post_ids)
+        tables.append(table)
+    return tables, user_ids.ids().rename('user_id')
+
+def concat_compact(old, new):
+    """Appends compact rows to a compact table, merging the categories of categorical columns."""
+    old, new = old.copy(deep=False), new.copy(deep=False)
+    for col in old.columns:
+        if isinstance(old[col].dtype, pd.CategoricalDtype):
+            old_categories = old[col].cat.categories
+            categories = old_categories.append(new[col].cat.categories.difference(old_categories))
+            if len(categories) > len(old_categories):
+                old[col] = old[col].cat.set_categories(categories)
+            new[col] = new[col].cat.set_categories(categories)
+    return pd.concat([old, new], ignore_index=True)
+
+def decode_table(table_name, df, influencer_ids, user_ids, post_ids=None):
+    """Restores the generator's string schema for a (slice of a) compact table, e.g. for export."""
+    df = df.copy()
+    if 'influencer_key' in df.columns:
+        df['influencer_id'] = influencer_ids[df['influencer_key'].to_numpy()]
+    if 'post_key' in df.columns:
+        df['post_id'] = pd.api.extensions.take(post_ids, df['post_key'].to_numpy(), allow_fill=True) # -1 (no post) becomes NaN
+    if 'user_key' in df.columns:
+        df['user_id'] = user_ids[df['user_key'].to_numpy()]
+    if 'date' in df.columns:
+        df['date'] = df['date'].dt.strftime('%Y-%m-%d')
+    return df[STRING_SCHEMA_COLUMNS[table_name]]
+
+def memory_report(raw_tables, dataset):
+    """Compares deep memory usage per table between the string schema and a compact Dataset."""
+    rows = [{
+        'table': table_name,
+        'rows': len(raw_df),
+        'string_schema_bytes': int(raw_df.memory_usage(deep=True).sum()),
+        'compact_bytes': int(compact_df.memory_usage(deep=True).sum())
+    } for table_name, raw_df, compact_df in zip(TABLE_NAMES, raw_tables, dataset.tables())]
+    rows.append({
+        'table': 'user_lookup',
+        'rows': len(dataset.user_ids),
+        'string_schema_bytes': 0, # Held inline in tracking_data before conversion
+        'compact_bytes': int(dataset.user_ids.memory_usage(deep=True))
+    })
+    report = pd.DataFrame(rows)
+    report.loc[len(report)] = ['total', report['rows'].sum(), report['string_schema_bytes'].sum(), report['compact_bytes'].sum()]
+    report['reduction'] = report['string_schema_bytes'] / report['compact_bytes']
+    return report
+
+# --- 2. Dataset Registry ---
+# The dashboard's dcc.Store components only carry a version key; the tables themselves stay
+# in process memory here, so filter changes never ship the dataset to the browser and back.
+
+class Dataset:
+    """One generation of the influencers, posts, tracking_data and payouts tables, in the compact schema."""
+
+    def __init__(self, version, influencers, posts, tracking_data, payouts, user_ids, derived=None):
+        self.version = version
+        self.influencers = influencers
+        self.posts = posts
+        self.tracking_data = tracking_data
+        self.payouts = payouts
+        self._load_user_ids = user_ids if callable(user_ids) else (lambda: user_ids) # Stored datasets load it lazily
+        self._derived = dict(derived or {})
+        self._build_locks = {} # One lock per derived name, so a slow build never blocks reading or building another
+        self._build_locks_lock = threading.Lock()
+        self.stored_dir = None # Generation directory holding these tables, once published or loaded
+        self.batch = None # For appended datasets: (weakref to the base dataset, the appended compact rows, their STORED_DERIVED parts)
+
+    @classmethod
+    def from_frames(cls, version, influencers, posts, tracking_data, payouts):
+        """Builds a Dataset from tables in the generator's string schema."""
+        tables, user_ids = compact_tables(influencers, posts, tracking_data, payouts)
+        return cls(version, *tables, user_ids)
+
+    def appended(self, version, influencers=None, posts=None, tracking_data=None, payouts=None):
+        """Returns a new Dataset with string-schema rows appended to this one.
+
+        Derived structures that were already built (cube, bitmap index, influencer totals, buyer sketches)
+        are extended with the new rows only, rather than rebuilt from the full tables.
+        """
+        influencer_ids, post_ids = validate_batch(self.influencer_lookup, self.post_lookup, influencers, posts, tracking_data, payouts)
+        user_lookup = self.user_lookup
+        new = {}
+        if influencers is not None:
+            new['influencers'], _ = compact_table('influencers', influencers, influencer_ids, user_lookup)
+        for table_name, df in (('posts', posts), ('tracking_data', tracking_data), ('payouts', payouts)):
+            if df is not None:
+                new[table_name], user_lookup = compact_table(table_name, df, influencer_ids, user_lookup, post_ids)
+
+        combine = {'tracking_data': merge_by_date} # tracking_data stays date-sorted (see date_bounds)
+        tables = {table_name: combine.get(table_name, concat_compact)(old, new[table_name]) if table_name in new else old
+                  for table_name, old in zip(TABLE_NAMES, self.tables())}
+        # A batch dated before the existing rows is merged in among them, which moves rows under the bitmap index
+        tracking_in_order = ('tracking_data' not in new or len(self.tracking_data) == 0 or len(new['tracking_data']) == 0
+                             or new['tracking_data']['date'].iloc[0] >= self.tracking_data['date'].iloc[-1])
+        all_influencers = tables['influencers']
+        empty = {table_name: old.iloc[:0] for table_name, old in zip(TABLE_NAMES, self.tables())}
+        new_posts = new.get('posts', empty['posts'])
+        new_tracking = new.get('tracking_data', empty['tracking_data'])
+        new_payouts = new.get('payouts', empty['payouts'])
+
+        new_user_ids = user_lookup.ids(len(self.user_ids)).rename('user_id')
+        user_ids = self.user_ids.append(new_user_ids).rename('user_id')
+        derived = {'influencer_lookup': influencer_ids, 'post_lookup': post_ids, 'user_lookup': user_lookup}
+        batch_derived = {}
+        if 'cube' in self._derived:
+            # Cells of the batch may repeat existing cube keys; every rollup sums, so that is harmless
+            batch_derived['cube'] = build_cube(all_influencers, new_tracking)
+            derived['cube'] = merge_by_date(self.cube, batch_derived['cube'])
+        if 'bitmap_index' in self._derived and tracking_in_order:
+            derived['bitmap_index'] = self.bitmap_index.append(all_influencers, new_tracking)
+        if 'influencer_totals' in self._derived:
+            derived['influencer_totals'] = build_influencer_totals(
+                len(all_influencers), new_posts, new_tracking, new_payouts, base=self.influencer_totals)
+        if 'buyer_sketches' in self._derived:
+            batch_derived['buyer_sketches'] = build_buyer_sketches(all_influencers, new_tracking)
+            derived['buyer_sketches'] = self.buyer_sketches.merge(batch_derived['buyer_sketches'])
+        dataset = Dataset(version, *(tables[table_name] for table_name in TABLE_NAMES), user_ids, derived)
+        dataset.batch = (weakref.ref(self), dict(new, user_ids=new_user_ids.to_frame(index=False)), batch_derived)
+        return dataset
+
+    def derived(self, name, builder):
+        """Returns builder(self), computed once for this version and cached under name."""
+        if name in self._derived: # Built entries are never replaced, so they are read without locking
+            return self._derived[name]
+        with self._build_locks_lock:
+            build_lock = self._build_locks.setdefault(name, threading.Lock())
+        with build_lock: # Concurrent first uses of name wait for a single build; builders may use other names
+            if name not in self._derived:
+                self._derived[name] = builder(self)
+            return self._derived[name]
+
+    @property
+    def cube(self):
+        """Aggregate cube of tracking_data (see build_cube), built on first use."""
+        return self.derived('cube', lambda dataset: build_cube(dataset.influencers, dataset.tracking_data))
+
+    @property
+    def bitmap_index(self):
+        """BitmapIndex over tracking_data rows, built on first use."""
+        return self.derived('bitmap_index', lambda dataset: build_bitmap_index(dataset.influencers, dataset.tracking_data))
+
+    @property
+    def date_span(self):
+        """First and last tracking date, or (None, None) without tracking data."""
+        dates = self.tracking_data['date']
+        return (dates.iloc[0], dates.iloc[-1]) if len(dates) else (None, None)
+
+    @property
+    def user_ids(self):
+        """Lookup from user_key to the user_id string."""
+        return self.derived('user_ids', lambda dataset: dataset._load_user_ids())
+
+    @property
+    def influencer_lookup(self):
+        """KeyLookup from influencer ID to influencer_key, built on first use and extended by appends."""
+        return self.derived('influencer_lookup', lambda dataset: KeyLookup.from_ids(dataset.influencers['ID']))
+
+    @property
+    def post_lookup(self):
+        """KeyLookup from post ID to post_key, built on first use and extended by appends."""
+        return self.derived('post_lookup', lambda dataset: KeyLookup.from_ids(dataset.posts['ID']))
+
+    @property
+    def user_lookup(self):
+        """KeyLookup from user_id to user_key, built on first use and extended by appends."""
+        return self.derived('user_lookup', lambda dataset: KeyLookup.from_ids(dataset.user_ids))
+
+    @property
+    def influencer_totals(self):
+        """Unfiltered per-influencer totals (see build_influencer_totals), built on first use."""
+        return self.derived('influencer_totals', lambda dataset: build_influencer_totals(
+            len(dataset.influencers), dataset.posts, dataset.tracking_data, dataset.payouts))
+
+    @property
+    def buyer_sketches(self):
+        """BuyerSketches of tracking_data's buyers, built on first use."""
+        return self.derived('buyer_sketches', lambda dataset: build_buyer_sketches(dataset.influencers, dataset.tracking_data))
+
+    @property
+    def payout_inputs(self):
+        """Basis, rate and attributed orders per payout row (see build_payout_inputs), built on first use."""
+        return self.derived('payout_inputs', build_payout_inputs)
+
+    def post_attribution(self, lookback_days=None):
+        """Post row attributed to each tracking_data row (see attribute_posts), built on first use per lookback."""
+        lookback_days = ATTRIBUTION_LOOKBACK_DAYS if lookback_days is None else lookback_days
+        return self.derived(f'post_attribution_{lookback_days}', lambda dataset: attribute_posts(
+            dataset.posts, dataset.tracking_data, lookback_days))
+
+    @property
+    def dimensions(self):
+        """Dimension table of the filter dropdowns: sorted values per filter dimension, built on first use."""
+        # The compact categoricals already hold every distinct value as a category, so no column is scanned
+        return self.derived('dimensions', lambda dataset: {
+            'brand': sorted(dataset.tracking_data['brand'].cat.categories),
+            'product': sorted(dataset.tracking_data['product'].cat.categories),
+            'category': sorted(dataset.influencers['category'].cat.categories),
+            'platform': sorted(dataset.tracking_data['source'].cat.categories)
+        })
+
+    def tables(self):
+        """Returns the four compact tables in generate_mock_data order."""
+        return self.influencers, self.posts, self.tracking_data, self.payouts
+
+    def decode(self, table_name, df):
+        """Returns df (a slice of one of this dataset's tables) in the generator's string schema."""
+        return decode_table(table_name, df, self.influencers['ID'].to_numpy(), self.user_ids.to_numpy(), self.posts['ID'].to_numpy())
+
+    def decoded_tables(self):
+        """Returns the four tables in the generator's string schema."""
+        return tuple(self.decode(table_name, df) for table_name, df in zip(TABLE_NAMES, self.tables()))
+
+class DatasetRegistry:
+    """Holds recent dataset generations under a version key, evicting the least recently used.
+
+    If the registry is empty on first access, initial_loader(registry) is called once to register a generation.
+    """
+
+    def __init__(self, max_generations=3, initial_loader=None):
+        self.max_generations = max_generations
+        self.initial_loader = initial_loader
+        self._datasets = OrderedDict()
+        self._last_version = 0
+        self._lock = threading.Lock()
+        self._append_lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        """Runs initial_loader if nothing has been registered yet."""
+        if self._datasets or self.initial_loader is None:
+            return
+        with self._load_lock: # Concurrent first requests wait for a single load
+            if not self._datasets:
+                self.initial_loader(self)
+
+    def _register(self, build, version=None):
+        """Registers build(version) under version (by default the next key) and returns the key."""
+        with self._lock:
+            if version is None:
+                self._last_version += 1
+                version = self._last_version
+            else:
+                self._last_version = max(self._last_version, version)
+        dataset = build(version)
+        with self._lock:
+            self._datasets[version] = dataset
+            while len(self._datasets) > self.max_generations:
+                self._datasets.popitem(last=False)
+        return version
+
+    def put(self, influencers, posts, tracking_data, payouts):
+        """Registers a new generation built from string-schema tables and returns its version key."""
+        return self.put_compact(*compact_tables(influencers, posts, tracking_data, payouts))
+
+    def put_compact(self, tables, user_ids, derived=None):
+        """Registers a new generation from compact tables (see compact_tables) and returns its version key."""
+        return self._register(lambda version: Dataset(version, *tables, user_ids, derived))
+
+    def append(self, influencers=None, posts=None, tracking_data=None, payouts=None):
+        """Appends string-schema rows to the latest generation and registers the result as a new version."""
+        with self._append_lock: # Appends build on each other, so they are applied one at a time
+            base = self.get()
+            return self._register(lambda version: base.appended(version, influencers, posts, tracking_data, payouts))
+
+    def load(self, directory):
+        """Registers the dataset stored in directory (see save_dataset) and returns its version key."""
+        return self._register(lambda version: load_dataset(version, directory))
+
+    def get(self, version=None):
+        """Returns the Dataset for version, or the latest one if version is missing or was evicted."""
+        self._ensure_loaded()
+        with self._lock:
+            if version not in self._datasets:
+                version = max(self._datasets) # Versions increase, while the order tracks recent use
+            self._datasets.move_to_end(version)
+            return self._datasets[version]
+
+    @property
+    def latest_version(self):
+        """Version key of the newest registered generation."""
+        self._ensure_loaded()
+        with self._lock:
+            return max(self._datasets)
+
+# --- Persistent storage ---
+# Datasets are published to DATA_DIR as numbered generations: each is a directory of uncompressed
+# Arrow IPC (Feather v2) files holding the compact tables and the user lookup, and the CURRENT file
+# holds the latest generation number. A generation is written completely before CURRENT is
+# replaced (atomically) to point at it, so readers never see a partial dataset. Loading
+# memory-maps the files: a restarted process serves the stored dataset instead of regenerating it,
+# numeric columns are not copied, and every process reads the same pages of the OS page cache.
+# A generation appended to a stored one hard-links its parent's files and writes only the batch, as
+# the next segments/<k> directory; loading concatenates the segments onto the base tables. Every
+# STORED_SEGMENTS appends the generation is written in full again, so loads go back to zero-copy.
+# The cube and buyer sketches are built at publish time and stored with the tables (a segment holds
+# the batch's own), so workers map them instead of each building its own copy.
+# An empty HEALTHKART_DATA_DIR disables persistence.
+DATA_DIR = os.environ.get('HEALTHKART_DATA_DIR', 'healthkart_data')
+STORAGE_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+STORED_GENERATIONS = 3 # Older generations are deleted; processes that mapped them keep their pages
+STORED_SEGMENTS = 8 # Appended batches a generation keeps as segments before it is written in full
+STORED_DERIVED = ['cube', 'buyer_sketches'] # Derived structures stored with every generation
+SKETCH_ARRAYS = ['registers', 'entry_cells', 'influencer_keys', 'entry_registers', 'ranks',
+                 'sketch_cells', 'sketch_influencers', 'sketch_registers']
+STORAGE_FORMAT = 4 # Written into every generation; generations stored in another format are ignored
+fcntl = importlib.import_module('fcntl') if importlib.util.find_spec('fcntl') else None # POSIX only
+
+def _stored_path(directory, table_name):
+    return os.path.join(directory, table_name + '.arrow')
+
+def generation_dir(data_dir, generation):
+    """Directory holding one published generation."""
+    return os.path.join(data_dir, 'generations', str(generation))
+
+def stored_segments(directory):
+    """Returns the segment directories of a stored generation, in append order."""
+    segments_dir = os.path.join(directory, 'segments')
+    if not os.path.isdir(segments_dir):
+        return []
+    return [os.path.join(segments_dir, name) for name in sorted(os.listdir(segments_dir), key=int)]
+
+def _link_generation(source, directory):
+    """Hard-links the table and segment files of the generation in source into directory (copying where links fail)."""
+    for root, _, files in os.walk(source):
+        target = os.path.join(directory, os.path.relpath(root, source))
+        os.makedirs(target, exist_ok=True)
+        for name in files:
+            if name == 'FORMAT':
+                continue
+            try:
+                os.link(os.path.join(root, name), os.path.join(target, name))
+            except OSError: # Unsupported by the filesystem
+                shutil.copy2(os.path.join(root, name), os.path.join(target, name))
+
+def _appended_to(dataset):
+    """Returns the stored generation directory dataset was appended to, if it can take one more segment."""
+    if dataset.batch is None:
+        return None
+    base = dataset.batch[0]()
+    base_dir = base.stored_dir if base is not None else None
+    if base_dir is None or set(dataset.batch[2]) != set(STORED_DERIVED) or stored_format(base_dir) != STORAGE_FORMAT or len(stored_segments(base_dir)) >= STORED_SEGMENTS:
+        return None
+    return base_dir
+
+def save_buyer_sketches(sketches, directory):
+    """Writes BuyerSketches to directory: the cells as an Arrow IPC file and each array as a .npy file."""
+    import pyarrow.feather as feather
+    os.makedirs(directory, exist_ok=True)
+    feather.write_feather(sketches.cells, _stored_path(directory, 'cells'), compression='uncompressed', chunksize=max(len(sketches.cells), 1))
+    for name in SKETCH_ARRAYS:
+        np.save(os.path.join(directory, name + '.npy'), getattr(sketches, name))
+
+def load_buyer_sketches(directory):
+    """Memory-maps BuyerSketches written by save_buyer_sketches."""
+    import pyarrow.feather as feather
+    cells = feather.read_table(_stored_path(directory, 'cells'), memory_map=True).to_pandas(split_blocks=True)
+    arrays = {name: np.load(os.path.join(directory, name + '.npy'), mmap_mode='r') for name in SKETCH_ARRAYS}
+    return BuyerSketches(cells, arrays['registers'], tuple(arrays[name] for name in SKETCH_ARRAYS[1:5]),
+                         tuple(arrays[name] for name in SKETCH_ARRAYS[5:]))
+
+def save_dataset(dataset, directory):
+    """Writes a dataset's compact tables and STORED_DERIVED structures to directory as Arrow IPC (and .npy) files.
+
+    A dataset appended to a stored generation (see Dataset.appended) links that generation's files
+    and writes only its batch, as the next segment. Derived structures not built yet are built here.
+    """
+    import pyarrow.feather as feather
+    os.makedirs(directory, exist_ok=True)
+    base_dir = _appended_to(dataset)
+    if base_dir is not None:
+        _link_generation(base_dir, directory)
+        frames, derived = dataset.batch[1], dataset.batch[2]
+        tables_dir = os.path.join(directory, 'segments', str(len(stored_segments(base_dir))))
+        os.makedirs(tables_dir)
+    else:
+        frames = dict(zip(TABLE_NAMES, dataset.tables()), user_ids=dataset.user_ids.to_frame(index=False))
+        derived = {'cube': dataset.cube, 'buyer_sketches': dataset.buyer_sketches}
+        tables_dir = directory
+    for table_name, frame in dict(frames, cube=derived['cube']).items():
+        # One record batch per table: columns split across batches would be copied when loaded
+        feather.write_feather(frame, _stored_path(tables_dir, table_name), compression='uncompressed', chunksize=max(len(frame), 1))
+    save_buyer_sketches(derived['buyer_sketches'], os.path.join(tables_dir, 'buyer_sketches'))
+    with open(os.path.join(directory, 'FORMAT'), 'w') as format_file:
+        format_file.write(str(STORAGE_FORMAT))
+
+def stored_format(directory):
+    """Returns the STORAGE_FORMAT a generation directory was written in, or None (missing, or written before formats)."""
+    try:
+        with open(os.path.join(directory, 'FORMAT')) as format_file:
+            return int(format_file.read())
+    except (FileNotFoundError, ValueError):
+        return None
+
+def is_stored_generation(data_dir, generation):
+    """Whether generation is published in data_dir in the current STORAGE_FORMAT."""
+    return stored_format(generation_dir(data_dir, generation)) == STORAGE_FORMAT
+
+def load_dataset(version, directory, derived=None):
+    """Memory-maps a dataset written by save_dataset and returns it as a Dataset with the given version.
+
+    Segments are concatenated onto the base tables (and their sketches merged), so only a generation
+    without segments is used zero-copy. derived adds to (or replaces) the stored derived structures.
+    """
+    import pyarrow.feather as feather
+    table_dirs = [directory] + stored_segments(directory)
+
+    def read(table_name):
+        frames = [feather.read_table(_stored_path(table_dir, table_name), memory_map=True).to_pandas(split_blocks=True)
+                  for table_dir in table_dirs if os.path.exists(_stored_path(table_dir, table_name))]
+        return functools.reduce(concat_compact, frames)
+
+    # Only exports and appends need the user lookup, and building millions of strings dominates startup
+    load_user_ids = lambda: pd.Index(read('user_ids')['user_id'], dtype=object, name='user_id')
+    influencers, posts, tracking_data, payouts = (read(table_name) for table_name in TABLE_NAMES)
+    tracking_data = sort_by_date(tracking_data) # Segments dated before earlier rows
+    stored = {'cube': sort_by_date(read('cube')),
+              'buyer_sketches': functools.reduce(BuyerSketches.merge, (load_buyer_sketches(os.path.join(table_dir, 'buyer_sketches'))
+                                                                       for table_dir in table_dirs))}
+    dataset = Dataset(version, influencers, posts, tracking_data, payouts, load_user_ids, dict(stored, **(derived or {})))
+    dataset.stored_dir = directory
+    return dataset
+
+def _latest_generation(data_dir):
+    """Returns the generation number CURRENT points to, or None if nothing was published."""
+    try:
+        with open(os.path.join(data_dir, 'CURRENT')) as current_file:
+            return int(current_file.read())
+    except (FileNotFoundError, ValueError):
+        return None
+
+def current_generation(data_dir):
+    """Returns the latest published generation number in data_dir, or None if there is none in the current STORAGE_FORMAT."""
+    generation = _latest_generation(data_dir)
+    return generation if generation is not None and is_stored_generation(data_dir, generation) else None
+
+@contextmanager
+def _publish_lock(data_dir):
+    """Serializes publishers across processes with a file lock (a no-op where fcntl is unavailable)."""
+    os.makedirs(data_dir, exist_ok=True)
+    with open(os.path.join(data_dir, 'publish.lock'), 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX) # Released when the file is closed
+        yield
+
+def publish_generation(data_dir, build, if_empty=False):
+    """Publishes build(generation) as the next generation in data_dir; returns (generation, dataset).
+
+    build runs while the publish lock is held, so it can safely derive the new dataset from
+    generation - 1. With if_empty, nothing is built if a generation exists already (dataset is None).
+    """
+    with _publish_lock(data_dir):
+        current = current_generation(data_dir)
+        if if_empty and current is not None:
+            return current, None
+        generation = (_latest_generation(data_dir) or 0) + 1 # Numbers keep increasing past generations in an old format
+        dataset = build(generation)
+        partial_dir = generation_dir(data_dir, generation) + '.partial'
+        shutil.rmtree(partial_dir, ignore_errors=True) # Left over from a crashed publisher
+        save_dataset(dataset, partial_dir)
+        shutil.rmtree(generation_dir(data_dir, generation), ignore_errors=True)
+        os.rename(partial_dir, generation_dir(data_dir, generation))
+        dataset.stored_dir = generation_dir(data_dir, generation)
+        pointer = os.path.join(data_dir, 'CURRENT')
+        with open(pointer + '.tmp', 'w') as pointer_file:
+            pointer_file.write(str(generation))
+        os.replace(pointer + '.tmp', pointer) # The atomic switch every process follows
+        for old in range(generation - STORED_GENERATIONS, 0, -1):
+            if not os.path.isdir(generation_dir(data_dir, old)):
+                break
+            shutil.rmtree(generation_dir(data_dir, old), ignore_errors=True)
+    return generation, dataset
+
+class SharedDatasetRegistry(DatasetRegistry):
+    """DatasetRegistry over the generations published in data_dir, for serving from several processes.
+
+    Version keys are generation numbers, so they mean the same in every worker. Each process
+    memory-maps the tables read-only and switches to a new generation on its first access after
+    CURRENT moves; put and append publish a generation rather than registering it locally.
+    """
+
+    def __init__(self, data_dir, max_generations=3):
+        super().__init__(max_generations, initial_loader=self._publish_initial)
+        self.data_dir = data_dir
+
+    @staticmethod
+    def _publish_initial(registry):
+        """Publishes generated data as generation 1 if no process has published anything yet."""
+        with startup_stage('load dataset'):
+            publish_generation(registry.data_dir, lambda generation: Dataset.from_frames(
+                generation, *generate_mock_data(**app_config['generation'])), if_empty=True)
+
+    def _attach(self, generation, derived=None):
+        """Registers a published generation under its number, unless it is registered already."""
+        with self._load_lock:
+            if generation not in self._datasets:
+                directory = generation_dir(self.data_dir, generation)
+                self._register(lambda version: load_dataset(version, directory, derived), version=generation)
+
+    def _ensure_loaded(self):
+        """Attaches the generation CURRENT points to, publishing initial data if there is none."""
+        generation = current_generation(self.data_dir)
+        if generation is None:
+            self.initial_loader(self)
+            generation = current_generation(self.data_dir)
+        if generation not in self._datasets:
+            self._attach(generation)
+
+    def _publish(self, build):
+        """Publishes build(generation), attaches it with the derived structures build made and returns its number."""
+        generation, dataset = publish_generation(self.data_dir, build)
+        self._attach(generation, {name: value for name, value in dataset._derived.items() if name != 'user_ids'})
+        return generation
+
+    def put_compact(self, tables, user_ids, derived=None):
+        """Publishes a new generation from compact tables and returns its number."""
+        return self._publish(lambda generation: Dataset(generation, *tables, user_ids, derived))
+
+    def append(self, influencers=None, posts=None, tracking_data=None, payouts=None):
+        """Publishes the latest generation plus string-schema rows as a new generation and returns its number."""
+        return self._publish(lambda generation: self.get(generation - 1).appended(generation, influencers, posts, tracking_data, payouts))
+
+    def get(self, version=None):
+        """Returns the Dataset for version, attaching it if another process published it."""
+        if version is not None and version not in self._datasets and is_stored_generation(self.data_dir, version):
+            self._attach(version)
+        return super().get(version)
+
+# --- App configuration ---
+# create_app(config) overrides these defaults. Nothing is loaded at import time: the registry
+# loads (or generates) the initial dataset on first access.
+DEFAULT_CONFIG = {
+    'data_dir': DATA_DIR, # Empty disables persistence
+    'generation': {}, # Keyword arguments for generate_mock_data
+    'poll_interval_ms': 5000, # How often open dashboards check for appended data
+    'preload': False, # Load the dataset in create_app instead of on the first request
+    'shared_storage': False, # Serve the generations in data_dir to several worker processes (see SharedDatasetRegistry)
+    'attribution_lookback_days': 30, # How far back a tracking event looks for the post that drove it
+    'job_workers': 2, # Worker processes for background jobs; 0 runs their heavy steps in the job thread
+    'trace_log': '', # JSON-lines file receiving one timing record per callback request; empty disables it
+    'incremental_share': 0.7, # Share of attributed revenue assumed incremental, for incremental ROAS
+    'bootstrap_resamples': 1000, # Resamples behind the ROAS and incremental ROAS intervals
+    'confidence_level': 0.95 # Coverage of those intervals
+}
+app_config = dict(DEFAULT_CONFIG)
+
+def persist_dataset(version):
+    """Publishes a registered dataset to the configured data directory, if storage is available."""
+    if STORAGE_AVAILABLE and app_config['data_dir'] and not isinstance(dataset_registry, SharedDatasetRegistry):
+        publish_generation(app_config['data_dir'], lambda generation: dataset_registry.get(version))
+
+def load_initial_dataset(registry):
+    """Registers the stored dataset, or generates (and stores) initial data; returns its version key."""
+    with startup_stage('load dataset'):
+        data_dir = app_config['data_dir']
+        generation = current_generation(data_dir) if STORAGE_AVAILABLE and data_dir else None
+        if generation is not None:
+            return registry.load(generation_dir(data_dir, generation))
+        version = registry.put(*generate_mock_data(**app_config['generation']))
+        persist_dataset(version)
+        return version
+
+dataset_registry = DatasetRegistry(initial_loader=load_initial_dataset)
+
+def __getattr__(name):
+    """Resolves the influencers_df/posts_df/tracking_data_df/payouts_df module globals to the latest dataset."""
+    legacy_globals = ['influencers_df', 'posts_df', 'tracking_data_df', 'payouts_df']
+    if name in legacy_globals:
+        return dataset_registry.get().tables()[legacy_globals.index(name)]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Ingestion: append_batch adds rows (in the generator's string schema, any subset of the four
+# tables) to the latest dataset as a new version. Aggregates and indexes that were already built
+# are extended with the batch only; open dashboards pick the new version up on their next poll.
+def append_batch(influencers=None, posts=None, tracking_data=None, payouts=None):
+    """Appends a batch of new rows to the latest dataset and returns the new version key."""
+    version = dataset_registry.append(influencers, posts, tracking_data, payouts)
+    invalidate_caches()
+    persist_dataset(version)
+    return version
+
+# --- 3. Aggregate Cube ---
+# Revenue and orders pre-summed per (brand, product, category, platform, campaign, influencer, date).
+# Every KPI and chart is a rollup of the matching cells, so filter changes cost O(cube cells)
+# instead of scanning and regrouping the raw tracking rows. Tracking rows and cube cells are both
+# kept sorted by date, so a date range is a contiguous slice found by binary search and a narrow
+# window only touches its own rows.
+
+CUBE_DIMENSIONS = ['brand', 'product', 'category', 'platform', 'campaign', 'influencer_key', 'date']
+FILTER_DIMENSIONS = ['brand', 'product', 'category', 'platform']
+
+def sort_by_date(df):
+    """Returns df stably sorted by its date column, or df itself if it already is."""
+    if df['date'].is_monotonic_increasing:
+        return df
+    return df.sort_values('date', kind='stable', ignore_index=True)
+
+def _merge_order(old_keys, new_keys):
+    """Returns the positions into concatenate([old, new]) that merge two sorted key runs (new after old on ties)."""
+    order = np.empty(len(old_keys) + len(new_keys), dtype=np.int64)
+    new_positions = np.searchsorted(old_keys, new_keys, side='right') + np.arange(len(new_keys))
+    from_old = np.ones(len(order), dtype=bool)
+    from_old[new_positions] = False
+    order[from_old] = np.arange(len(old_keys))
+    order[new_positions] = len(old_keys) + np.arange(len(new_keys))
+    return order
+
+def merge_by_date(old, new):
+    """Concatenates two date-sorted compact tables into one date-sorted table, old rows first among equal dates.
+
+    Same result as a stable sort of the concatenation, but a linear merge: the existing rows are already in order.
+    """
+    combined = concat_compact(old, new)
+    if len(old) == 0 or len(new) == 0 or new['date'].iloc[0] >= old['date'].iloc[-1]:
+        return combined
+    order = _merge_order(old['date'].to_numpy(), new['date'].to_numpy())
+    return combined.take(order).reset_index(drop=True)
+
+def date_limits(start_date=None, end_date=None):
+    """Converts an inclusive date range to [first day, day after the last) datetime64 bounds; None is open-ended."""
+    first_day = None if start_date is None else np.datetime64(str(start_date)[:10], 'D')
+    stop_day = None if end_date is None else np.datetime64(str(end_date)[:10], 'D') + 1
+    return first_day, stop_day
+
+def date_bounds(dates, start_date=None, end_date=None):
+    """Returns the [first, stop) row positions within an inclusive date range of a date-sorted column."""
+    first_day, stop_day = date_limits(start_date, end_date)
+    values = dates.to_numpy()
+    first = 0 if first_day is None else int(np.searchsorted(values, first_day, side='left'))
+    stop = len(values) if stop_day is None else int(np.searchsorted(values, stop_day, side='left'))
+    return first, max(first, stop)
+
+def build_cube(influencers, tracking_data):
+    """Sums tracking_data revenue and orders over CUBE_DIMENSIONS."""
+    influencer_category = influencers['category']
+    cube_source = tracking_data[['brand', 'product', 'source', 'campaign', 'influencer_key', 'date', 'revenue', 'orders']].rename(
+        columns={'source': 'platform'})
+    cube_source['category'] = pd.Categorical.from_codes(
+        influencer_category.cat.codes.to_numpy()[tracking_data['influencer_key'].to_numpy()],
+        dtype=influencer_category.dtype
+    )
+    cube = cube_source.groupby(CUBE_DIMENSIONS, observed=True, sort=False).agg(
+        revenue=('revenue', 'sum'),
+        orders=('orders', 'sum')
+    ).reset_index()
+    return sort_by_date(cube) # Already sorted when tracking_data is: groups come out in order of first appearance
+
+def slice_cube(cube, brand='All', product='All', category='All', platform='All', start_date=None, end_date=None):
+    """Returns the cube cells matching a filter selection; 'All' (or no date) leaves a dimension unfiltered."""
+    first, stop = date_bounds(cube['date'], start_date, end_date)
+    cube = cube.iloc[first:stop]
+    mask = np.ones(len(cube), dtype=bool)
+    for dimension, value in zip(FILTER_DIMENSIONS, (brand, product, category, platform)):
+        if value != 'All':
+            mask &= (cube[dimension] == value).to_numpy()
+    return cube[mask]
+
+def rollup_cube(cells, dimension):
+    """Rolls cube cells up to revenue and orders per value of one dimension."""
+    return cells.groupby(dimension, observed=True)[['revenue', 'orders']].sum().reset_index()
+
+def build_influencer_totals(num_influencers, posts, tracking_data, payouts, base=None):
+    """Sums revenue, orders, payouts and post reach/likes/comments per influencer_key, on top of base totals if given."""
+    def per_influencer(total, df, col, dtype=np.float64):
+        sums = np.bincount(df['influencer_key'].to_numpy(), weights=df[col].to_numpy(dtype=np.float64), minlength=num_influencers)
+        sums = sums.round().astype(dtype) if dtype != np.float64 else sums.astype(dtype) # Empty batches count as int64
+        if base is not None:
+            sums[:len(base)] += base[total].to_numpy()
+        return total, sums
+
+    return pd.DataFrame(dict([
+        per_influencer('totalRevenue', tracking_data, 'revenue'),
+        per_influencer('totalOrders', tracking_data, 'orders', np.int64),
+        per_influencer('total_payout', payouts, 'total_payout'),
+        per_influencer('totalReach', posts, 'reach', np.int64),
+        per_influencer('totalLikes', posts, 'likes', np.int64),
+        per_influencer('totalComments', posts, 'comments', np.int64)
+    ]))
+
+# --- 4. Bitmap Indexes ---
+# For datasets whose cube would be too large, each filter dimension keeps one packed bitset per
+# value over the tracking rows. A filter selection is the AND of at most four bitsets, which
+# yields matching row positions directly.
+
+FILTER_ENGINE = 'cube' # 'cube' or 'bitmap'
+
+def _append_bits(packed, num_bits, new_bits):
+    """Appends a boolean array to a packed bitset currently holding num_bits bits."""
+    used_in_last_byte = num_bits % 8
+    if used_in_last_byte:
+        carried = np.unpackbits(packed[-1:], count=used_in_last_byte).astype(bool)
+        return np.concatenate([packed[:-1], np.packbits(np.concatenate([carried, new_bits]))])
+    return np.concatenate([packed, np.packbits(new_bits)])
+
+class BitmapIndex:
+    """Per-value packed bitsets over tracking_data rows for brand, product, category and platform."""
+
+    def __init__(self, num_rows=0, bitsets=None):
+        self.num_rows = num_rows
+        self.bitsets = bitsets if bitsets is not None else {dimension: {} for dimension in FILTER_DIMENSIONS}
+
+    def append(self, influencers, tracking_data):
+        """Returns a new index covering this index's rows followed by tracking_data's rows."""
+        influencer_category = influencers['category']
+        dimension_values = {
+            'brand': tracking_data['brand'].array,
+            'product': tracking_data['product'].array,
+            # Category is an influencer attribute, joined through influencer_key
+            'category': pd.Categorical.from_codes(
+                influencer_category.cat.codes.to_numpy()[tracking_data['influencer_key'].to_numpy()],
+                dtype=influencer_category.dtype
+            ),
+            'platform': tracking_data['source'].array
+        }
+        bitsets = {}
+        for dimension, values in dimension_values.items():
+            codes = values.codes
+            bitsets[dimension] = {}
+            for value in set(self.bitsets[dimension]) | set(values.categories):
+                new_bits = codes == values.categories.get_loc(value) if value in values.categories else np.zeros(len(codes), dtype=bool)
+                old_bits = self.bitsets[dimension].get(value, np.zeros((self.num_rows + 7) // 8, dtype=np.uint8))
+                bitsets[dimension][value] = _append_bits(old_bits, self.num_rows, new_bits)
+        return BitmapIndex(self.num_rows + len(tracking_data), bitsets)
+
+    def select(self, brand='All', product='All', category='All', platform='All', first=0, stop=None):
+        """Returns the positions of the tracking_data rows in [first, stop) matching a filter selection."""
+        stop = self.num_rows if stop is None else stop
+        if first >= stop:
+            return np.empty(0, dtype=np.int64)
+        # Only the bytes covering [first, stop) are combined, so a narrow row range stays cheap
+        first_byte, stop_byte = first // 8, (stop + 7) // 8
+        bits = None
+        for dimension, value in zip(FILTER_DIMENSIONS, (brand, product, category, platform)):
+            if value == 'All':
+                continue
+            bitset = self.bitsets[dimension].get(value)
+            if bitset is None:
+                return np.empty(0, dtype=np.int64)
+            bits = bitset[first_byte:stop_byte] if bits is None else bits & bitset[first_byte:stop_byte]
+        if bits is None:
+            return np.arange(first, stop)
+        rows = first_byte * 8 + np.flatnonzero(np.unpackbits(bits))
+        return rows[(rows >= first) & (rows < stop)]
+
+def build_bitmap_index(influencers, tracking_data):
+    """Builds the BitmapIndex of tracking_data."""
+    return BitmapIndex().append(influencers, tracking_data)
+
+def select_tracking_rows(dataset, brand='All', product='All', category='All', platform='All', start_date=None, end_date=None):
+    """Returns the positions of the tracking_data rows matching a filter selection."""
+    first, stop = date_bounds(dataset.tracking_data['date'], start_date, end_date)
+    return dataset.bitmap_index.select(brand, product, category, platform, first, stop)
+
+def select_cells(dataset, brand='All', product='All', category='All', platform='All', start_date=None, end_date=None):
+    """Returns the rows that answer a filter selection: cube cells, or raw tracking rows for the bitmap engine."""
+    if FILTER_ENGINE == 'bitmap':
+        rows = select_tracking_rows(dataset, brand, product, category, platform, start_date, end_date)
+        return dataset.tracking_data.iloc[rows].rename(columns={'source': 'platform'})
+    return slice_cube(dataset.cube, brand, product, category, platform, start_date, end_date)
+
+def influencer_mask(influencer_keys, num_influencers):
+    """Boolean mask over all influencer keys marking those that occur in influencer_keys."""
+    mask = np.zeros(num_influencers, dtype=bool)
+    mask[influencer_keys] = True
+    return mask
+
+# --- 5. Result Cache ---
+# Dashboard outputs (formatted KPIs, Plotly figures, tables) memoized per dataset version and
+# filter selection, so flipping back to a previous selection skips all recomputation. Filtered
+# selections, which can be slices of millions of rows, live in their own cache bounded by bytes,
+# as do the per-influencer and per-row tables the sections share (influencer performance, intervals,
+# buyer counts, the paginated tables), and slider-driven payout scenarios in another, so none of
+# them pushes the section outputs out.
+
+SELECTION_CACHE_BYTES = 256 * 1024 * 1024
+TABLE_CACHE_BYTES = 256 * 1024 * 1024
+
+class ResultCache:
+    """Bounded LRU cache of computed results with hit/miss counters.
+
+    With max_bytes, sizeof(result) is recorded per entry and the least recently used entries are
+    evicted until the total fits (the newest entry is always kept).
+    """
+
+    def __init__(self, max_entries=128, max_bytes=None, sizeof=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.total_bytes = 0
+        self._entries = OrderedDict() # key -> (result, bytes)
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        """Returns the cached result for key, calling compute() and caching its result on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+            self.misses += 1
+        result = compute()
+        size = self.sizeof(result) if self.sizeof is not None else 0
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= self._entries[key][1]
+            self._entries[key] = (result, size)
+            self.total_bytes += size
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries or
+                                              (self.max_bytes is not None and self.total_bytes > self.max_bytes)):
+                self.total_bytes -= self._entries.popitem(last=False)[1][1]
+        return result
+
+    def invalidate(self):
+        """Drops every cached result, e.g. when a new dataset generation is registered."""
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        """Returns the hit/miss counters and current size."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries), 'max_entries': self.max_entries,
+                    'bytes': self.total_bytes, 'max_bytes': self.max_bytes}
+
+def frames_bytes(frames):
+    """Shallow memory usage of a tuple of DataFrames, the sizeof of selection_cache."""
+    return int(sum(df.memory_usage(index=True).sum() for df in frames))
+
+def result_bytes(result):
+    """Shallow memory usage of the DataFrames, Series and arrays in a result (nested in tuples), the sizeof of table_cache."""
+    if isinstance(result, (tuple, list)):
+        return sum(result_bytes(item) for item in result)
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(index=True).sum())
+    if isinstance(result, pd.Series):
+        return int(result.memory_usage(index=True))
+    if isinstance(result, np.ndarray):
+        return result.nbytes
+    return 0 # Scalars and formatted strings
+
+dashboard_cache = ResultCache()
+selection_cache = ResultCache(max_entries=16, max_bytes=SELECTION_CACHE_BYTES, sizeof=frames_bytes)
+table_cache = ResultCache(max_entries=64, max_bytes=TABLE_CACHE_BYTES, sizeof=result_bytes)
+scenario_cache = ResultCache(max_entries=32)
+RESULT_CACHES = [dashboard_cache, selection_cache, table_cache, scenario_cache]
+
+def invalidate_caches():
+    """Drops every cached dashboard result."""
+    for cache in RESULT_CACHES:
+        cache.invalidate()
+
+# --- 6. Table Formatting and Pagination ---
+# Tables are formatted a whole column at a time, and long tables are sorted and sliced on the
+# server so only one page of rows is formatted and sent to the browser.
+
+CURRENCY_COLUMNS = ['totalRevenue', 'total_payout', 'totalPayout', 'rate', 'expected_payout', 'payout_gap']
+RATIO_COLUMNS = ['roas', 'incremental_roas', 'avg_roas', 'roas_low', 'roas_high', 'incremental_roas_low', 'incremental_roas_high']
+COUNT_COLUMNS = ['totalOrders', 'orders', 'follower_count', 'influencerCount', 'totalReach', 'totalLikes', 'totalComments', 'uniqueBuyers']
+TABLE_PAGE_SIZE = 20
+
+def _with_thousands_separators(numbers):
+    """Inserts thousands separators into a Series of formatted numbers."""
+    return numbers.str.replace(r'(\d)(?=(\d{3})+(?!\d))', r'\1,', regex=True)
+
+def format_column(col, values):
+    """Formats a currency, ratio or count column for display; other columns are returned unchanged."""
+    if col not in CURRENCY_COLUMNS + RATIO_COLUMNS + COUNT_COLUMNS:
+        return values.to_numpy()
+    numbers = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    missing = np.isnan(numbers)
+    if col in CURRENCY_COLUMNS:
+        formatted = '$' + _with_thousands_separators(pd.Series(np.char.mod('%.2f', numbers)))
+        return formatted.to_numpy()
+    if col in RATIO_COLUMNS:
+        return np.where(missing | (numbers == 0), "N/A", np.char.mod('%.2f', numbers))
+    formatted = _with_thousands_separators(pd.Series(np.char.mod('%d', np.where(missing, 0, numbers).astype(np.int64))))
+    return np.where(missing, "N/A", formatted.to_numpy())
+
+def sorted_page_positions(df, sort_by, ascending, start, stop):
+    """Returns the row positions of df[start:stop] in sort order, selecting partially when possible."""
+    column = df[sort_by]
+    keys = column.cat.codes.to_numpy() if isinstance(column.dtype, pd.CategoricalDtype) else column.to_numpy()
+    if keys.dtype.kind in 'iuf':
+        keys = keys.astype(np.float64) if ascending else -keys.astype(np.float64)
+        if stop < len(keys):
+            # Only the first `stop` rows need ordering; rows tied with the last of them are taken in
+            # position order, so every page matches the stable full sort and no row shows up twice.
+            kth = np.partition(keys, stop - 1)[stop - 1]
+            if np.isnan(kth): # NaN sorts last, as in argsort
+                less, equal = np.flatnonzero(~np.isnan(keys)), np.flatnonzero(np.isnan(keys))
+            else:
+                less, equal = np.flatnonzero(keys < kth), np.flatnonzero(keys == kth)
+            candidates = np.concatenate([less, equal[:stop - len(less)]])
+            return candidates[np.argsort(keys[candidates], kind='stable')][start:stop]
+        return np.argsort(keys, kind='stable')[start:stop]
+    order = np.argsort(keys, kind='stable')
+    return (order if ascending else order[::-1])[start:stop]
+
+def render_table_page(df, sort_by, ascending, page, page_size=TABLE_PAGE_SIZE):
+    """Sorts and slices df on the server and formats one page; returns (table, page, total_rows)."""
+    total_rows = len(df)
+    page = min(max(page, 0), max(total_rows - 1, 0) // page_size)
+    positions = sorted_page_positions(df, sort_by, ascending, page * page_size, (page + 1) * page_size)
+    return generate_table(df.iloc[positions]), page, total_rows
+
+def describe_page(page, total_rows, page_size=TABLE_PAGE_SIZE):
+    """Returns the 'Rows x-y of n' label for a table page."""
+    if total_rows == 0:
+        return "No rows"
+    return f"Rows {page * page_size + 1:,}-{min((page + 1) * page_size, total_rows):,} of {total_rows:,}"
+
+def turn_page(table_id, page):
+    """Returns the page to show after the callback trigger: previous/next, or the first page for anything else."""
+    if dash.ctx.triggered_id == f'{table_id}-prev':
+        return (page or 0) - 1
+    if dash.ctx.triggered_id == f'{table_id}-next':
+        return (page or 0) + 1
+    return 0
+
+def table_pager(table_id, sort_columns, default_sort, default_ascending=False):
+    """Builds the sort and page controls for a server-side paginated table."""
+    button_class = "px-3 py-1 bg-gray-200 text-gray-700 rounded-md hover:bg-gray-300 text-sm"
+    return html.Div(className="flex flex-wrap items-center gap-3 mb-4", children=[
+        html.Label("Sort by", className="text-sm font-medium text-gray-700"),
+        dcc.Dropdown(
+            id=f'{table_id}-sort-by',
+            options=[{'label': label, 'value': col} for col, label in sort_columns.items()],
+            value=default_sort,
+            clearable=False,
+            className="w-48 text-sm"
+        ),
+        dcc.Dropdown(
+            id=f'{table_id}-sort-order',
+            options=[{'label': 'Descending', 'value': 'desc'}, {'label': 'Ascending', 'value': 'asc'}],
+            value='asc' if default_ascending else 'desc',
+            clearable=False,
+            className="w-36 text-sm"
+        ),
+        html.Button("Previous", id=f'{table_id}-prev', n_clicks=0, className=button_class),
+        html.Button("Next", id=f'{table_id}-next', n_clicks=0, className=button_class),
+        html.Span(id=f'{table_id}-page-info', className="text-sm text-gray-600"),
+        dcc.Store(id=f'{table_id}-page', data=0)
+    ])
+
+# --- 7. Export ---
+# The export applies the current filter selection and streams each table, chunk by chunk,
+# into a zip held in a spooled temporary file (memory up to EXPORT_SPOOL_BYTES, disk beyond),
+# which the /export route then streams to the browser.
+
+EXPORT_FORMATS = {'csv': 'CSV', 'parquet': 'Parquet (zstd)'}
+PARQUET_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+EXPORT_TABLES = ['tracking_data', 'payouts', 'influencers', 'posts']
+EXPORT_CHUNK_ROWS = 100000
+EXPORT_SPOOL_BYTES = 32 * 1024 * 1024
+
+def select_export_rows(dataset, filters):
+    """Returns the row positions of each table that belong to a filter selection."""
+    brand, product, category, platform, start_date, end_date = filters
+    tracking_rows = select_tracking_rows(dataset, *filters)
+    matching_influencers = influencer_mask(dataset.tracking_data['influencer_key'].to_numpy()[tracking_rows], len(dataset.influencers))
+    post_mask = matching_influencers[dataset.posts['influencer_key'].to_numpy()]
+    if platform != 'All':
+        post_mask &= (dataset.posts['platform'] == platform).to_numpy()
+    first_day, stop_day = date_limits(start_date, end_date)
+    if first_day is not None:
+        post_mask &= dataset.posts['date'].to_numpy() >= first_day
+    if stop_day is not None:
+        post_mask &= dataset.posts['date'].to_numpy() < stop_day
+    return {
+        'tracking_data': tracking_rows,
+        'payouts': np.flatnonzero(matching_influencers[dataset.payouts['influencer_key'].to_numpy()]),
+        'influencers': np.flatnonzero(matching_influencers),
+        'posts': np.flatnonzero(post_mask)
+    }
+
+def iter_export_chunks(dataset, table_name, rows, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yields the selected rows of one table in the generator's string schema, chunk_rows at a time."""
+    table = getattr(dataset, table_name)
+    for start in range(0, max(len(rows), 1), chunk_rows): # An empty selection still yields one (empty) chunk
+        yield dataset.decode(table_name, table.iloc[rows[start:start + chunk_rows]])
+
+def _write_csv_chunks(entry, chunks):
+    """Writes DataFrame chunks as one CSV into a binary stream."""
+    text = io.TextIOWrapper(entry, encoding='utf-8', newline='')
+    for chunk_number, chunk in enumerate(chunks):
+        chunk.to_csv(text, index=False, header=chunk_number == 0)
+    text.flush()
+    text.detach()
+
+def _write_parquet_chunks(entry, chunks):
+    """Writes DataFrame chunks as row groups of one zstd-compressed Parquet file into a binary stream."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    writer = None
+    for chunk in chunks:
+        row_group = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(entry, row_group.schema, compression='zstd')
+        writer.write_table(row_group)
+    writer.close()
+
+def write_export(dataset, filters, export_format, fileobj, progress=None):
+    """Writes the filtered tables into fileobj as a zip of CSV or Parquet files, calling progress(fraction, message) per table."""
+    if export_format == 'parquet' and not PARQUET_AVAILABLE:
+        raise ValueError("Parquet export requires pyarrow (pip install pyarrow)")
+    write_chunks = _write_parquet_chunks if export_format == 'parquet' else _write_csv_chunks
+    compression = zipfile.ZIP_STORED if export_format == 'parquet' else zipfile.ZIP_DEFLATED # Parquet is already compressed
+    rows_by_table = select_export_rows(dataset, filters)
+    with zipfile.ZipFile(fileobj, 'w', compression) as zip_file:
+        for table_number, table_name in enumerate(EXPORT_TABLES):
+            if progress is not None:
+                progress(table_number / len(EXPORT_TABLES), f"Writing {table_name}")
+            with zip_file.open(f"{table_name}.{export_format}", 'w', force_zip64=True) as entry:
+                write_chunks(entry, iter_export_chunks(dataset, table_name, rows_by_table[table_name]))
+
+# --- 8. Time Series ---
+# The Revenue Over Time chart is drawn from the selection's date-sorted daily series. The visible
+# range is cut out with searchsorted, summed per day, week or month (the finest granularity with at
+# most TIME_SERIES_MAX_BUCKETS buckets) and LTTB-downsampled to TIME_SERIES_POINT_BUDGET points,
+# so the figure payload stays bounded however much history there is. Zooming re-requests the range.
+
+TIME_SERIES_POINT_BUDGET = 500
+TIME_SERIES_MAX_BUCKETS = 2000
+TIME_SERIES_GRANULARITIES = {'day': 1, 'week': 7, 'month': 30.44} # Average days per bucket
+TIME_SERIES_TITLES = {'day': 'Revenue Over Time', 'week': 'Weekly Revenue Over Time', 'month': 'Monthly Revenue Over Time'}
+
+def bucket_dates(dates, granularity):
+    """Floors datetime64 dates to the first day of their day, Monday-based week or month."""
+    days = dates.astype('datetime64[D]')
+    if granularity == 'week':
+        # datetime64[W] counts weeks from Thursday 1970-01-01; shift so weeks start on Monday
+        return (days + 3).astype('datetime64[W]').astype('datetime64[D]') - 3
+    if granularity == 'month':
+        return days.astype('datetime64[M]').astype('datetime64[D]')
+    return days
+
+def choose_granularity(start, end):
+    """Returns the finest granularity that splits [start, end] into at most TIME_SERIES_MAX_BUCKETS buckets."""
+    span_days = (end - start) / np.timedelta64(1, 'D') + 1
+    for granularity, bucket_days in TIME_SERIES_GRANULARITIES.items():
+        if span_days / bucket_days <= TIME_SERIES_MAX_BUCKETS:
+            return granularity
+    return granularity
+
+def resample_series(dates, values, granularity):
+    """Sums a date-sorted series per bucket; returns (bucket start dates, sums)."""
+    buckets = bucket_dates(dates, granularity)
+    if len(buckets) == 0:
+        return buckets, values
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    return buckets[starts], np.add.reduceat(values, starts)
+
+def lttb(x, y, num_points):
+    """Largest-Triangle-Three-Buckets: returns the indices of num_points points that keep the shape of (x, y)."""
+    n = len(x)
+    if num_points >= n or num_points < 3:
+        return np.arange(n)
+    # The first and last points are always kept; the rest are split into num_points - 2 buckets
+    edges = np.linspace(1, n - 1, num_points - 1).astype(np.int64)
+    selected = np.empty(num_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    for i in range(num_points - 2):
+        start, stop = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x, next_y = x[stop:edges[i + 2]].mean(), y[stop:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        # Keep the point forming the largest triangle with the previous pick and the next bucket's average
+        prev_x, prev_y = x[selected[i]], y[selected[i]]
+        area = np.abs((prev_x - next_x) * (y[start:stop] - prev_y) - (prev_x - x[start:stop]) * (next_y - prev_y))
+        selected[i + 1] = start + np.argmax(area)
+    return selected
+
+def downsample_time_series(dates, values, start=None, end=None, num_points=TIME_SERIES_POINT_BUDGET):
+    """Cuts [start, end] out of a date-sorted daily series, resamples and downsamples it; returns (frame, granularity)."""
+    # Keep one point beyond each edge so the line runs to the ends of a zoomed axis
+    first = 0 if start is None else max(np.searchsorted(dates, start, side='left') - 1, 0)
+    last = len(dates) if end is None else min(np.searchsorted(dates, end, side='right') + 1, len(dates))
+    dates, values = dates[first:last], values[first:last]
+    if len(dates) == 0:
+        return pd.DataFrame({'date': dates, 'revenue': values}), 'day'
+
+    granularity = choose_granularity(dates[0] if start is None else start, dates[-1] if end is None else end)
+    buckets, sums = resample_series(dates, values, granularity)
+    keep = lttb(buckets.astype(np.int64).astype(np.float64), sums.astype(np.float64), num_points)
+    return pd.DataFrame({'date': buckets[keep], 'revenue': sums[keep]}), granularity
+
+def visible_range(relayout_data):
+    """Returns the x-axis (start, end) dates in a graph's relayoutData, (None, None) on autorange, or None if absent."""
+    if not relayout_data:
+        return None
+    if relayout_data.get('xaxis.autorange'):
+        return None, None
+    if 'xaxis.range[0]' in relayout_data:
+        bounds = relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']
+    elif 'xaxis.range' in relayout_data:
+        bounds = relayout_data['xaxis.range']
+    else:
+        return None # Not a zoom, e.g. autosize
+    return tuple(np.datetime64(pd.Timestamp(bound).date(), 'D') for bound in bounds)
+
+# --- 9. Charts and Payloads ---
+# Each chart's figure, layout included, is built once with the page layout. Callbacks then send
+# dash.Patch updates that replace only the trace arrays (plus the few layout properties that
+# depend on the data). Response sizes are recorded by finish_request_trace and summarized by payload_report().
+
+CHART_LAYOUT = dict(
+    plot_bgcolor='white', paper_bgcolor='white', font_color='#333',
+    xaxis_title=None, yaxis_title=None, margin=dict(l=20, r=20, t=40, b=20)
+)
+PLATFORM_COLORS = px.colors.qualitative.Pastel
+CAMPAIGN_COLORS = px.colors.qualitative.Set2
+
+def empty_chart(plot, x, title, labels, axis_type, **kwargs):
+    """Builds a px chart of revenue over x with no data yet and the dashboard's chart layout."""
+    fig = plot(pd.DataFrame({x: [], 'revenue': []}), x=x, y='revenue', title=title, labels=labels, **kwargs)
+    fig.update_layout(**CHART_LAYOUT)
+    fig.update_xaxes(type=axis_type) # Fixed up front, as there is no data to infer it from
+    return fig
+
+@timed_stage('figure')
+def build_charts():
+    """Builds the dashboard's charts, keyed by graph id."""
+    return {
+        'revenue-over-time-chart': empty_chart(px.line, 'date', 'Revenue Over Time', {'date': 'Date', 'revenue': 'Revenue ($)'},
+                                               'date', color_discrete_sequence=px.colors.qualitative.Plotly),
+        'revenue-by-platform-chart': empty_chart(px.bar, 'platform', 'Revenue by Platform', {'platform': 'Platform', 'revenue': 'Revenue ($)'},
+                                                 'category'),
+        'revenue-by-campaign-chart': empty_chart(px.bar, 'campaign', 'Revenue by Campaign', {'campaign': 'Campaign', 'revenue': 'Revenue ($)'},
+                                                 'category')
+    }
+
+@timed_stage('figure')
+def trace_patch(x, y, colors=None):
+    """Returns a dash.Patch replacing the x and y arrays of a chart's trace, coloring each bar in turn from colors."""
+    x, y = list(x), list(y)
+    patch = dash.Patch()
+    patch['data'][0]['x'] = x
+    patch['data'][0]['y'] = y
+    if colors is not None:
+        patch['data'][0]['marker']['color'] = [colors[i % len(colors)] for i in range(len(x))]
+    return patch
+
+def payload_report():
+    """Returns responses, total and mean response bytes per callback, from the RESPONSE_BYTES histogram."""
+    rows = [(callback, count, total) for callback, (cumulative, total, count) in sorted(RESPONSE_BYTES.snapshot().items())]
+    report = pd.DataFrame(rows, columns=['callback', 'responses', 'total_bytes'])
+    report['mean_bytes'] = report['total_bytes'] / report['responses']
+    return report
+
+# --- 10. Influencer Performance ---
+# Per-influencer metrics are arrays aligned on influencer_key: the selection's revenue and orders
+# are summed with one bincount, payouts and post metrics come from the dataset's influencer totals,
+# and ROAS is a masked division. Persona rollups are bincounts over the category codes, and the
+# top-N lists use partial selection, so there is no per-row Python work however many influencers.
+
+def influencer_performance(dataset, filtered_cells, incremental_share=0.7, unique_buyers=None, revenue_bounds=None):
+    """Computes revenue, orders, payout, post metrics and ROAS for every influencer with rows in filtered_cells.
+
+    unique_buyers, if given, holds the estimated distinct buyers of every influencer_key and adds a uniqueBuyers column.
+    revenue_bounds, if given, holds (low, high) revenue intervals per matching influencer (see revenue_intervals)
+    and adds interval columns for ROAS and incremental ROAS.
+    """
+    num_influencers = len(dataset.influencers)
+    keys = filtered_cells['influencer_key'].to_numpy()
+    revenue = np.bincount(keys, weights=filtered_cells['revenue'].to_numpy(dtype=np.float64), minlength=num_influencers)
+    orders = np.bincount(keys, weights=filtered_cells['orders'].to_numpy(dtype=np.float64), minlength=num_influencers)
+    matching = np.flatnonzero(np.bincount(keys, minlength=num_influencers)) # Ascending influencer keys
+
+    totals = dataset.influencer_totals
+    payout = totals['total_payout'].to_numpy()[matching]
+    revenue = revenue[matching].round().astype(np.int64)
+    has_payout = payout > 0
+    roas = np.divide(revenue, payout, out=np.zeros(len(matching)), where=has_payout)
+    details = dataset.influencers.iloc[matching]
+    performance = pd.DataFrame({
+        'influencer_key': matching.astype(np.int32),
+        'totalRevenue': revenue,
+        'totalOrders': orders[matching].round().astype(np.int64),
+        'total_payout': payout,
+        'totalReach': totals['totalReach'].to_numpy()[matching],
+        'totalLikes': totals['totalLikes'].to_numpy()[matching],
+        'totalComments': totals['totalComments'].to_numpy()[matching],
+        'name': details['name'].to_numpy(),
+        'category': details['category'].array,
+        'platform': details['platform'].array,
+        'follower_count': details['follower_count'].to_numpy(),
+        'roas': roas,
+        'incremental_roas': np.divide(revenue * incremental_share, payout, out=np.zeros(len(matching)), where=has_payout)
+    })
+    if unique_buyers is not None:
+        performance['uniqueBuyers'] = unique_buyers[matching].round().astype(np.int64)
+    if revenue_bounds is not None:
+        low, high = (np.divide(bound, payout, out=np.zeros(len(matching)), where=has_payout) for bound in revenue_bounds)
+        performance['roas_low'], performance['roas_high'] = low, high
+        performance['incremental_roas_low'], performance['incremental_roas_high'] = low * incremental_share, high * incremental_share
+    return performance
+
+def persona_performance(performance, unique_buyers=None):
+    """Rolls influencer performance up per category: average positive ROAS, revenue, payout and influencer count.
+
+    unique_buyers, if given, holds the estimated distinct buyers per category code; buyers of several
+    influencers count once, so these are not sums of the influencers' counts.
+    """
+    category = performance['category'].array
+    codes, num_categories = category.codes, len(category.categories)
+    roas = performance['roas'].to_numpy()
+    valid = roas > 0
+    influencer_count = np.bincount(codes, minlength=num_categories)
+    valid_count = np.bincount(codes[valid], minlength=num_categories)
+    valid_roas_sum = np.bincount(codes[valid], weights=roas[valid], minlength=num_categories)
+    observed = np.flatnonzero(influencer_count) # Categories without influencers are left out
+    personas = pd.DataFrame({
+        'category': pd.Categorical.from_codes(observed, dtype=category.dtype),
+        'avg_roas': np.divide(valid_roas_sum, valid_count, out=np.zeros(num_categories), where=valid_count > 0)[observed],
+        'totalRevenue': np.bincount(codes, weights=performance['totalRevenue'].to_numpy(dtype=np.float64), minlength=num_categories)[observed].round().astype(np.int64),
+        'totalPayout': np.bincount(codes, weights=performance['total_payout'].to_numpy(), minlength=num_categories)[observed],
+        'influencerCount': influencer_count[observed]
+    })
+    if unique_buyers is not None:
+        personas['uniqueBuyers'] = unique_buyers[observed].round().astype(np.int64)
+    return personas.iloc[sorted_page_positions(personas, 'avg_roas', False, 0, len(personas))]
+
+def top_influencers(performance, sort_by, count=5):
+    """Returns the count rows with the highest sort_by value, in descending order, by partial selection."""
+    return performance.iloc[sorted_page_positions(performance, sort_by, False, 0, count)]
+
+# --- Unique buyer sketches ---
+# Distinct buyers are counted with HyperLogLog sketches: each user_key is hashed to 64 bits, the first
+# HLL_PRECISION bits pick one of HLL_REGISTERS registers, and the register keeps the highest rank (the
+# position of the first set bit in the rest of the hash) it has seen. A sketch estimates its distinct
+# count with a relative standard error of HLL_ERROR (1.04 / sqrt(HLL_REGISTERS), about 1.6%), and two
+# sketches merge by an elementwise max, so the union over any set of cells is a max over their registers.
+# Dense sketches are kept per (brand, product, category, platform, month) cell for the KPI and persona
+# counts. Per-influencer counts use one sketch per (cell, influencer): sparse, as the (register, rank)
+# pairs the influencer set within the cell, until it holds HLL_SPARSE_MAX entries, then dense, so each
+# sketch stays within a fixed size. Everything is kept sorted by cell, so a selection reads only its own
+# cells' runs, and appended batches are merged run into run. Whole months of a date range come from the
+# sketches; partial months at its edges are hashed from their tracking rows.
+
+HLL_PRECISION = 12
+HLL_REGISTERS = 1 << HLL_PRECISION
+HLL_ERROR = 1.04 / np.sqrt(HLL_REGISTERS)
+HLL_ALPHA = 0.7213 / (1 + 1.079 / HLL_REGISTERS)
+_RANK_WEIGHTS = 2.0 ** -np.arange(66) # 2^-rank for every possible register value
+HLL_SPARSE_MAX = 384 # Sparse entries take 11 bytes, so a sketch with more is smaller as 4096 one-byte registers
+
+def hll_hash(user_keys):
+    """Returns the register and rank of each user key, from a splitmix64 hash of the key."""
+    z = user_keys.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    z ^= z >> np.uint64(31)
+    registers = (z >> np.uint64(64 - HLL_PRECISION)).astype(np.int64)
+    # The remaining bits fit a float64 exactly, and frexp's exponent is the position of their highest set bit
+    rest = (z & np.uint64((1 << (64 - HLL_PRECISION)) - 1)).astype(np.float64)
+    ranks = (65 - HLL_PRECISION - np.frexp(rest)[1]).astype(np.uint8)
+    return registers, ranks
+
+def hll_estimate(inverse_sum, empty_registers):
+    """HyperLogLog estimates from each sketch's sum of 2^-rank over its registers and its count of empty registers."""
+    raw = HLL_ALPHA * HLL_REGISTERS ** 2 / inverse_sum
+    # Small counts are estimated by linear counting over the empty registers (no large-range correction is needed with 64-bit hashes)
+    linear = HLL_REGISTERS * np.log(HLL_REGISTERS / np.maximum(empty_registers, 1))
+    return np.where((raw <= 2.5 * HLL_REGISTERS) & (empty_registers > 0), linear, raw)
+
+def count_dense(registers):
+    """Estimates the distinct count of each row of a (..., HLL_REGISTERS) register array."""
+    return hll_estimate(_RANK_WEIGHTS[registers].sum(axis=-1), (registers == 0).sum(axis=-1))
+
+def count_sparse(groups, registers, ranks, num_groups):
+    """Estimates distinct counts per group from sparse (group, register, rank) entries sorted by group and register."""
+    keys = groups.astype(np.int64) * HLL_REGISTERS + registers
+    starts = np.flatnonzero(np.diff(keys, prepend=-1)) # One run per (group, register) pair
+    run_groups = groups[starts]
+    run_ranks = np.maximum.reduceat(ranks, starts) if len(starts) else ranks
+    filled = np.bincount(run_groups, minlength=num_groups)
+    inverse_sum = np.bincount(run_groups, weights=_RANK_WEIGHTS[run_ranks], minlength=num_groups) + (HLL_REGISTERS - filled)
+    return hll_estimate(inverse_sum, HLL_REGISTERS - filled)
+
+def split_date_range(months, start_date=None, end_date=None):
+    """Splits an inclusive date range into whole months and partial edges.
+
+    Returns a mask over months (month starts) of those the range fully covers, and the [first day, stop day)
+    ranges of its partial months.
+    """
+    first_day, stop_day = date_limits(start_date, end_date)
+    inside = np.ones(len(months), dtype=bool)
+    edges = []
+    first_month = stop_month = None
+    if first_day is not None:
+        first_month = first_day.astype('datetime64[M]')
+        first_month += first_month.astype('datetime64[D]') < first_day # Round up to the first whole month
+        inside &= months >= first_month
+    if stop_day is not None:
+        stop_month = stop_day.astype('datetime64[M]')
+        inside &= months < stop_month
+    if first_month is not None and stop_month is not None and first_month >= stop_month:
+        return inside, [(first_day, stop_day)] # No whole month in the range
+    if first_month is not None and first_day < first_month.astype('datetime64[D]'):
+        edges.append((first_day, first_month.astype('datetime64[D]')))
+    if stop_month is not None and stop_month.astype('datetime64[D]') < stop_day:
+        edges.append((stop_month.astype('datetime64[D]'), stop_day))
+    return inside, edges
+
+def _gather_ranges(starts, stops):
+    """Returns the concatenation of the position ranges [starts[i], stops[i])."""
+    lengths = stops - starts
+    return np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(lengths.sum())
+
+class BuyerSketches:
+    """HyperLogLog sketches of the tracking_data buyers per (brand, product, category, platform, month) cell.
+
+    cells holds one row per cell and registers its dense registers. Per-influencer sketches, one per
+    (cell, influencer), are either sparse entries (entry_cells, influencer_keys, entry_registers, ranks:
+    the highest rank per register) or, past HLL_SPARSE_MAX entries, dense rows (sketch_cells,
+    sketch_influencers, sketch_registers). Both are sorted by cell, then influencer (then register), and
+    entry_starts / sketch_starts hold the offset of each cell's run.
+    """
+
+    def __init__(self, cells=None, registers=None, entries=None, sketches=None):
+        self.cells = cells
+        self.registers = registers if registers is not None else np.zeros((0, HLL_REGISTERS), dtype=np.uint8)
+        self.entry_cells, self.influencer_keys, self.entry_registers, self.ranks = entries or (
+            np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.uint16), np.empty(0, dtype=np.uint8))
+        self.sketch_cells, self.sketch_influencers, self.sketch_registers = sketches or (
+            np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32), np.zeros((0, HLL_REGISTERS), dtype=np.uint8))
+        cell_ids = np.arange(len(self.registers) + 1)
+        self.entry_starts = np.searchsorted(self.entry_cells, cell_ids, side='left')
+        self.sketch_starts = np.searchsorted(self.sketch_cells, cell_ids, side='left')
+
+    @classmethod
+    def build(cls, influencers, tracking_data):
+        """Builds the sketches of tracking_data's rows."""
+        influencer_category = influencers['category']
+        influencer_keys = tracking_data['influencer_key'].to_numpy()
+        cell_source = pd.DataFrame({
+            'brand': tracking_data['brand'].array,
+            'product': tracking_data['product'].array,
+            'category': pd.Categorical.from_codes(influencer_category.cat.codes.to_numpy()[influencer_keys], dtype=influencer_category.dtype),
+            'platform': tracking_data['source'].array,
+            'month': tracking_data['date'].to_numpy().astype('datetime64[M]').astype('datetime64[ns]')
+        })
+        row_cells = cell_source.groupby(list(cell_source.columns), observed=True, sort=False).ngroup().to_numpy()
+        cells = cell_source.iloc[np.unique(row_cells, return_index=True)[1]].reset_index(drop=True)
+        registers, ranks = hll_hash(tracking_data['user_key'].to_numpy())
+        dense = np.zeros((len(cells), HLL_REGISTERS), dtype=np.uint8)
+        np.maximum.at(dense, (row_cells, registers), ranks)
+
+        # Sparse entries keep the highest rank per (cell, influencer, register)
+        span = int(influencer_keys.max()) + 1 if len(influencer_keys) else 1
+        keys = (row_cells.astype(np.int64) * span + influencer_keys) * HLL_REGISTERS + registers
+        order = np.lexsort((ranks, keys))
+        last = order[np.flatnonzero(np.diff(keys[order], append=-1))]
+        entries = (row_cells[last].astype(np.int32), influencer_keys[last].astype(np.int32),
+                   registers[last].astype(np.uint16), ranks[last])
+        return cls(cells, dense, *_densify(entries, None, span))
+
+    def merge(self, other):
+        """Returns the union of two BuyerSketches; other's cells that match one of this one's are merged into it.
+
+        Both sides are already sorted, so their runs are merged rather than sorted again (only other's
+        entries are re-sorted, after its cells are renumbered).
+        """
+        if other.cells is None or len(other.cells) == 0:
+            return self
+        cell_ids = pd.MultiIndex.from_frame(self.cells).get_indexer(pd.MultiIndex.from_frame(other.cells))
+        new_cells = np.flatnonzero(cell_ids < 0)
+        cell_ids[new_cells] = len(self.cells) + np.arange(len(new_cells))
+        cells = concat_compact(self.cells, other.cells.iloc[new_cells])
+        registers = np.concatenate([self.registers, np.zeros((len(new_cells), HLL_REGISTERS), dtype=np.uint8)])
+        registers[cell_ids] = np.maximum(registers[cell_ids], other.registers)
+
+        span = int(max(self.influencer_keys.max(initial=-1), self.sketch_influencers.max(initial=-1),
+                       other.influencer_keys.max(initial=-1), other.sketch_influencers.max(initial=-1))) + 1
+        other_entry_cells = cell_ids[other.entry_cells].astype(np.int32)
+        other_keys = (other_entry_cells.astype(np.int64) * span + other.influencer_keys) * HLL_REGISTERS + other.entry_registers
+        resort = np.argsort(other_keys, kind='stable') # Batch-sized
+        keys = (self.entry_cells.astype(np.int64) * span + self.influencer_keys) * HLL_REGISTERS + self.entry_registers
+        order = _merge_order(keys, other_keys[resort])
+        keys = np.concatenate([keys, other_keys[resort]])[order]
+        ranks = np.concatenate([self.ranks, other.ranks[resort]])[order]
+        starts = np.flatnonzero(np.diff(keys, prepend=-1)) # Equal keys are adjacent; keep their highest rank
+        entries = tuple(np.concatenate([old, new[resort]])[order][starts] for old, new in (
+            (self.entry_cells, other_entry_cells), (self.influencer_keys, other.influencer_keys), (self.entry_registers, other.entry_registers)))
+        entries += (np.maximum.reduceat(ranks, starts) if len(starts) else ranks,)
+
+        other_sketch_cells = cell_ids[other.sketch_cells].astype(np.int32)
+        other_sketch_keys = other_sketch_cells.astype(np.int64) * span + other.sketch_influencers
+        resort = np.argsort(other_sketch_keys, kind='stable')
+        sketch_keys = self.sketch_cells.astype(np.int64) * span + self.sketch_influencers
+        order = _merge_order(sketch_keys, other_sketch_keys[resort])
+        sketch_keys = np.concatenate([sketch_keys, other_sketch_keys[resort]])[order]
+        starts = np.flatnonzero(np.diff(sketch_keys, prepend=-1))
+        sketch_registers = np.concatenate([self.sketch_registers, other.sketch_registers[resort]])[order]
+        sketches = (np.concatenate([self.sketch_cells, other_sketch_cells[resort]])[order][starts],
+                    np.concatenate([self.sketch_influencers, other.sketch_influencers[resort]])[order][starts],
+                    np.maximum.reduceat(sketch_registers, starts, axis=0) if len(starts) else sketch_registers)
+        return BuyerSketches(cells, registers, *_densify(entries, sketches, span))
+
+    def select(self, brand='All', product='All', category='All', platform='All'):
+        """Returns the mask of the cells matching a filter selection."""
+        mask = np.ones(len(self.registers), dtype=bool)
+        for dimension, value in zip(FILTER_DIMENSIONS, (brand, product, category, platform)):
+            if value != 'All':
+                mask &= (self.cells[dimension] == value).to_numpy()
+        return mask
+
+    def count_influencers(self, cells, num_influencers, influencer_keys=None, user_keys=None):
+        """Estimates distinct buyers per influencer_key over the selected cells (a mask), plus extra (influencer_key, user_key) rows.
+
+        Only the selected cells' runs of entries and dense rows are read.
+        """
+        selected = np.flatnonzero(cells)
+        entries = _gather_ranges(self.entry_starts[selected], self.entry_starts[selected + 1])
+        groups, registers, ranks = self.influencer_keys[entries], self.entry_registers[entries].astype(np.int64), self.ranks[entries]
+        if influencer_keys is not None and len(influencer_keys):
+            extra_registers, extra_ranks = hll_hash(user_keys)
+            groups = np.concatenate([groups, influencer_keys.astype(np.int32)])
+            registers, ranks = np.concatenate([registers, extra_registers]), np.concatenate([ranks, extra_ranks])
+
+        # Influencers with a dense row in any selected cell are counted from the max of those rows
+        rows = _gather_ranges(self.sketch_starts[selected], self.sketch_starts[selected + 1])
+        dense_influencers, dense_groups = np.unique(self.sketch_influencers[rows], return_inverse=True)
+        merged = np.zeros((len(dense_influencers), HLL_REGISTERS), dtype=np.uint8)
+        np.maximum.at(merged, dense_groups, self.sketch_registers[rows])
+        dense_row = np.full(num_influencers, -1, dtype=np.int64)
+        dense_row[dense_influencers] = np.arange(len(dense_influencers))
+        into_dense = dense_row[groups] >= 0
+        np.maximum.at(merged, (dense_row[groups[into_dense]], registers[into_dense]), ranks[into_dense])
+
+        sparse = ~into_dense
+        groups, registers, ranks = groups[sparse], registers[sparse], ranks[sparse]
+        order = np.argsort(groups.astype(np.int64) * HLL_REGISTERS + registers, kind='stable')
+        counts = count_sparse(groups[order], registers[order], ranks[order], num_influencers)
+        counts[dense_influencers] = count_dense(merged)
+        return counts
+
+def _densify(entries, sketches, span):
+    """Moves the sparse entries of (cell, influencer) sketches that have a dense row, or more than HLL_SPARSE_MAX entries, into dense rows.
+
+    entries and sketches are sorted as in BuyerSketches; returns them in the same form.
+    """
+    entry_cells, influencer_keys, entry_registers, ranks = entries
+    sketch_cells, sketch_influencers, sketch_registers = sketches or (
+        np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32), np.zeros((0, HLL_REGISTERS), dtype=np.uint8))
+    entry_sketches = entry_cells.astype(np.int64) * span + influencer_keys
+    sketch_keys = sketch_cells.astype(np.int64) * span + sketch_influencers
+    starts = np.flatnonzero(np.diff(entry_sketches, prepend=-1))
+    sizes = np.diff(np.append(starts, len(entry_sketches)))
+    run_keys = entry_sketches[starts]
+    position = np.minimum(np.searchsorted(sketch_keys, run_keys), max(len(sketch_keys) - 1, 0))
+    has_row = (sketch_keys[position] == run_keys) if len(sketch_keys) else np.zeros(len(run_keys), dtype=bool)
+    overflowing = ~has_row & (sizes > HLL_SPARSE_MAX)
+    if not has_row.any() and not overflowing.any():
+        return entries, (sketch_cells, sketch_influencers, sketch_registers)
+
+    # New dense rows for overflowing sketches, merged into the sorted rows
+    new_keys = run_keys[overflowing]
+    order = _merge_order(sketch_keys, new_keys)
+    sketch_keys = np.concatenate([sketch_keys, new_keys])[order]
+    sketch_cells = np.concatenate([sketch_cells, entry_cells[starts[overflowing]]])[order]
+    sketch_influencers = np.concatenate([sketch_influencers, influencer_keys[starts[overflowing]]])[order]
+    sketch_registers = np.concatenate([sketch_registers, np.zeros((len(new_keys), HLL_REGISTERS), dtype=np.uint8)])[order]
+
+    moving = np.repeat(has_row | overflowing, sizes)
+    rows = np.searchsorted(sketch_keys, entry_sketches[moving])
+    np.maximum.at(sketch_registers, (rows, entry_registers[moving].astype(np.int64)), ranks[moving])
+    return tuple(values[~moving] for values in entries), (sketch_cells, sketch_influencers, sketch_registers)
+
+def build_buyer_sketches(influencers, tracking_data):
+    """Builds the BuyerSketches of tracking_data."""
+    return BuyerSketches.build(influencers, tracking_data)
+
+def selected_buyer_cells(dataset, filters):
+    """Returns the mask of the buyer sketch cells in a filter selection and its tracking rows in partial months."""
+    brand, product, category, platform, start_date, end_date = filters
+    sketches = dataset.buyer_sketches
+    inside, edges = split_date_range(sketches.cells['month'].to_numpy(), start_date, end_date)
+    dates = dataset.tracking_data['date'].to_numpy()
+    edge_rows = [np.empty(0, dtype=np.int64)]
+    for first_day, stop_day in edges:
+        first, stop = np.searchsorted(dates, [first_day, stop_day], side='left')
+        edge_rows.append(dataset.bitmap_index.select(brand, product, category, platform, int(first), int(stop)))
+    return sketches.select(brand, product, category, platform) & inside, np.concatenate(edge_rows)
+
+def merge_buyer_registers(dataset, cells, edge_rows):
+    """Merges the dense sketches of the selected cells and the buyers of edge_rows into registers per category code."""
+    sketches = dataset.buyer_sketches
+    category_dtype = dataset.influencers['category'].dtype
+    merged = np.zeros((len(category_dtype.categories), HLL_REGISTERS), dtype=np.uint8)
+    cell_category = sketches.cells['category'].array
+    cell_codes = category_dtype.categories.get_indexer(cell_category.categories)[cell_category.codes]
+    for code in np.unique(cell_codes[cells]):
+        merged[code] = sketches.registers[cells & (cell_codes == code)].max(axis=0)
+    influencer_keys = dataset.tracking_data['influencer_key'].to_numpy()[edge_rows]
+    registers, ranks = hll_hash(dataset.tracking_data['user_key'].to_numpy()[edge_rows])
+    np.maximum.at(merged, (dataset.influencers['category'].cat.codes.to_numpy()[influencer_keys], registers), ranks)
+    return merged
+
+def count_influencer_buyers(dataset, cells, edge_rows):
+    """Estimates distinct buyers per influencer_key over the selected sketch cells and the tracking rows edge_rows."""
+    tracking_data = dataset.tracking_data
+    return dataset.buyer_sketches.count_influencers(cells, len(dataset.influencers), tracking_data['influencer_key'].to_numpy()[edge_rows],
+                                                    tracking_data['user_key'].to_numpy()[edge_rows])
+
+# --- Bootstrap intervals ---
+# ROAS and incremental ROAS are reported with percentile intervals of a Poisson bootstrap over the
+# selection's tracking rows (not cube cells, which would treat a day's sum as one observation):
+# each resample gives every row a Poisson(1) weight, the number of times it is redrawn, and sums the
+# weighted revenue per influencer; payouts are fixed amounts, so they are not resampled. A group's
+# Poisson-bootstrapped sum has exactly its sum as mean and its sum of squares as variance, and with
+# many rows it is normal. So resampling is spent where that approximation is weakest: groups are
+# taken smallest first and resampled row by row while their rows x resamples fit BOOTSTRAP_MAX_DRAWS;
+# the remaining (larger) groups get the normal interval from their two moments. Resampled groups go
+# in blocks of at most BOOTSTRAP_CHUNK_DRAWS weights, each reduced to its groups' quantiles before
+# the next is drawn, so time and memory stay bounded however many rows and influencers a selection
+# has. The selection total adds a normal draw for the approximated groups to every resample.
+
+BOOTSTRAP_MAX_DRAWS = 1 << 24 # Row weights drawn per selection, at most
+BOOTSTRAP_CHUNK_DRAWS = 1 << 22 # Row weights drawn per block
+BOOTSTRAP_MIN_RESAMPLES = 200 # Percentile intervals from fewer resamples are too noisy to report
+BOOTSTRAP_SEED = 0 # Fixed, so a selection's intervals do not change between requests or workers
+# Poisson(1) inverse CDF over 16-bit uniforms; a table lookup is several times faster than rng.poisson
+_POISSON_WEIGHTS = np.searchsorted(np.cumsum(np.exp(-1) / np.cumprod(np.r_[1, np.arange(1, 16)])),
+                                   (np.arange(1 << 16) + 0.5) / (1 << 16)).astype(np.uint8)
+
+def poisson_weights(rng, resamples, num_rows):
+    """Draws a (resamples, num_rows) uint8 array of Poisson(1) weights."""
+    return _POISSON_WEIGHTS[np.frombuffer(rng.bytes(2 * resamples * num_rows), dtype=np.uint16).reshape(resamples, num_rows)]
+
+def bootstrap_sum_intervals(groups, values, num_groups, resamples=1000, confidence=0.95, seed=BOOTSTRAP_SEED):
+    """Poisson-bootstraps the sum of values of every group and of all values (see the section comment).
+
+    groups holds the group (0 to num_groups - 1) of each value. Returns the (2, num_groups) (low, high)
+    intervals of the group sums, the (low, high) interval of the total, and how many groups were resampled
+    row by row (the rest use the normal approximation). Groups without values get (0, 0).
+    """
+    if resamples < BOOTSTRAP_MIN_RESAMPLES:
+        raise ValueError(f"bootstrap needs at least {BOOTSTRAP_MIN_RESAMPLES} resamples, got {resamples}")
+    tail = (1 - confidence) / 2
+    counts = np.bincount(groups, minlength=num_groups)
+    sums = np.bincount(groups, weights=values, minlength=num_groups)
+    squares = np.bincount(groups, weights=values * values, minlength=num_groups)
+
+    # Smallest groups first, as long as their rows fit the draw budget (and each fits one block)
+    nonempty = np.flatnonzero(counts)
+    by_size = nonempty[np.argsort(counts[nonempty], kind='stable')]
+    block_rows = max(1, BOOTSTRAP_CHUNK_DRAWS // resamples)
+    fits = (np.cumsum(counts[by_size]) * resamples <= BOOTSTRAP_MAX_DRAWS) & (counts[by_size] <= block_rows)
+    num_resampled = int(np.argmin(fits)) if not fits.all() else len(by_size)
+    resampled = by_size[:num_resampled]
+
+    z = statistics.NormalDist().inv_cdf(1 - tail)
+    spread = z * np.sqrt(squares)
+    intervals = np.stack([sums - spread, sums + spread])
+    rng = np.random.default_rng(seed)
+    total_samples = rng.normal(sums[by_size[num_resampled:]].sum(), np.sqrt(squares[by_size[num_resampled:]].sum()), resamples)
+
+    # Rows of the resampled groups, in their size order, cut into blocks of whole groups
+    rank = np.full(num_groups, num_resampled, dtype=np.int64)
+    rank[resampled] = np.arange(num_resampled)
+    row_ranks = rank[groups]
+    order = np.flatnonzero(row_ranks < num_resampled)
+    order = order[np.argsort(row_ranks[order], kind='stable')]
+    group_starts = np.concatenate([[0], np.cumsum(counts[resampled])])
+    first_group = 0
+    while first_group < num_resampled:
+        first_row = group_starts[first_group]
+        stop_group = int(np.searchsorted(group_starts, first_row + block_rows, side='right')) - 1 # Every group fits one block
+        rows = order[first_row:group_starts[stop_group]]
+        starts = group_starts[first_group:stop_group] - first_row
+        block_sums = np.add.reduceat(poisson_weights(rng, resamples, len(rows)) * values[rows], starts, axis=1)
+        intervals[:, resampled[first_group:stop_group]] = np.quantile(block_sums, [tail, 1 - tail], axis=0)
+        total_samples += block_sums.sum(axis=1)
+        first_group = stop_group
+    return intervals, np.quantile(total_samples, [tail, 1 - tail]), num_resampled
+
+def revenue_intervals(influencer_keys, revenue, num_influencers, resamples=1000, confidence=0.95):
+    """Bootstraps the revenue of a selection's tracking rows, given as their influencer_key and revenue arrays.
+
+    Returns the ascending influencer keys with rows in the selection, their (2, influencers) revenue
+    intervals, and the (low, high) interval of the selection's total revenue.
+    """
+    matching = np.flatnonzero(np.bincount(influencer_keys, minlength=num_influencers))
+    intervals, total_interval, _ = bootstrap_sum_intervals(np.searchsorted(matching, influencer_keys), revenue.astype(np.float64, copy=False),
+                                                           len(matching), resamples, confidence)
+    return matching, intervals, total_interval
+
+# --- 11. Post Attribution ---
+# Tracking rows only name the influencer, so each event is attributed to the most recent post by
+# that influencer on the event's platform (tracking 'source') within a lookback window. This is a
+# sorted as-of join: posts are sorted once on an (influencer, platform, day) key and every event
+# finds its post by binary search, so the cost is O((posts + events) log posts), not a cross-product.
+
+ATTRIBUTION_LOOKBACK_DAYS = TRACKING_WINDOW_DAYS
+
+def attribute_posts(posts, tracking_data, lookback_days=ATTRIBUTION_LOOKBACK_DAYS):
+    """Returns, per tracking_data row, the posts row position of the post it is attributed to, or -1.
+
+    An event is attributed to the latest post by the same influencer on the same platform dated on
+    or before the event and fewer than lookback_days days before it.
+    """
+    attributed = np.full(len(tracking_data), -1, dtype=np.int64)
+    if len(posts) == 0 or len(tracking_data) == 0:
+        return attributed
+    platforms = posts['platform'].cat.categories.union(tracking_data['source'].cat.categories)
+    def group_and_day(df, platform_col):
+        column = df[platform_col].array
+        platform = platforms.get_indexer(column.categories)[column.codes]
+        group = df['influencer_key'].to_numpy().astype(np.int64) * len(platforms) + platform
+        return group, df['date'].to_numpy().astype('datetime64[D]').astype(np.int64)
+
+    post_group, post_day = group_and_day(posts, 'platform')
+    event_group, event_day = group_and_day(tracking_data, 'source')
+    origin = min(post_day.min(), event_day.min())
+    span = max(post_day.max(), event_day.max()) - origin + 1
+    post_order = np.argsort(post_group * span + (post_day - origin), kind='stable')
+    sorted_keys = (post_group * span + (post_day - origin))[post_order]
+    # Last post whose (group, day) key is <= the event's; ties go to the later posts row
+    position = np.searchsorted(sorted_keys, event_group * span + (event_day - origin), side='right') - 1
+    candidate = post_order[np.maximum(position, 0)]
+    valid = (position >= 0) & (post_group[candidate] == event_group) & (event_day - post_day[candidate] < lookback_days)
+    attributed[valid] = candidate[valid]
+    return attributed
+
+def match_payouts(posts, payouts):
+    """Returns the payouts row position of each post, or -1, joining on the payouts' post_key.
+
+    A post with several payout rows is matched to the last of them.
+    """
+    matched = np.full(len(posts), -1, dtype=np.int64)
+    post_keys = payouts['post_key'].to_numpy()
+    linked = np.flatnonzero(post_keys >= 0)
+    np.maximum.at(matched, post_keys[linked], linked)
+    return matched
+
+def post_performance(dataset, tracking_rows, lookback_days=ATTRIBUTION_LOOKBACK_DAYS):
+    """Computes attributed revenue, orders, ROAS and payout reconciliation for each post with attributed tracking_rows."""
+    num_posts = len(dataset.posts)
+    post_keys = dataset.post_attribution(lookback_days)[tracking_rows]
+    attributed = post_keys >= 0
+    keys = post_keys[attributed]
+    tracking_data = dataset.tracking_data
+    revenue = np.bincount(keys, weights=tracking_data['revenue'].to_numpy(dtype=np.float64)[tracking_rows][attributed], minlength=num_posts)
+    orders = np.bincount(keys, weights=tracking_data['orders'].to_numpy(dtype=np.float64)[tracking_rows][attributed], minlength=num_posts)
+    matching = np.flatnonzero(np.bincount(keys, minlength=num_posts))
+    revenue = revenue[matching].round().astype(np.int64)
+    orders = orders[matching].round().astype(np.int64)
+
+    # Payout reconciliation: what the recorded rate and basis imply for the attributed orders
+    payouts = dataset.payouts
+    payout_rows = match_payouts(dataset.posts, payouts)[matching]
+    has_payout = payout_rows >= 0
+    rows = np.maximum(payout_rows, 0)
+    basis = payouts['basis'].array
+    rate = np.where(has_payout, payouts['rate'].to_numpy()[rows], 0.0)
+    total_payout = np.where(has_payout, payouts['total_payout'].to_numpy()[rows], 0.0)
+    expected_payout = np.where((basis == 'post')[rows], rate, orders * rate) # rate is 0 without a payout row
+
+    posts = dataset.posts.iloc[matching]
+    influencer_keys = posts['influencer_key'].to_numpy()
+    return pd.DataFrame({
+        'post_key': matching,
+        'influencer_key': influencer_keys,
+        'name': dataset.influencers['name'].to_numpy()[influencer_keys],
+        'platform': posts['platform'].array,
+        'date': posts['date'].to_numpy(),
+        'URL': posts['URL'].to_numpy(),
+        'totalRevenue': revenue,
+        'totalOrders': orders,
+        'basis': pd.Categorical.from_codes(np.where(has_payout, basis.codes[rows], -1), dtype=basis.dtype),
+        'rate': rate,
+        'orders': np.where(has_payout, payouts['orders'].to_numpy()[rows], 0), # Orders recorded on the payout
+        'total_payout': total_payout,
+        'expected_payout': expected_payout,
+        'payout_gap': total_payout - expected_payout,
+        'roas': np.divide(revenue, total_payout, out=np.zeros(len(matching)), where=total_payout > 0)
+    })
+
+# --- 12. Payout Scenarios ---
+# total_payout is recomputed for every payout row from its basis, rate and attributed orders in
+# array form. A row's payout is linear in the rate changes, so each row is split once into its
+# per-post and per-order components; a scenario is then a weighting of those components, and the
+# totals of any number of scenarios follow from the component sums, fast enough for a slider.
+# A scenario is a dict with optional 'post_rate_change' and 'order_rate_change' (fractions, e.g.
+# 0.2 for +20%) and 'basis' ('post' or 'order' moves every row to that basis).
+
+BASELINE_SCENARIO = {'name': 'Baseline'}
+PAYOUT_SCENARIOS = [
+    {'name': 'Per-order rates +20%', 'order_rate_change': 0.2},
+    {'name': 'Per-post rates -20%', 'post_rate_change': -0.2},
+    {'name': 'Everyone per-post', 'basis': 'post'},
+    {'name': 'Everyone per-order', 'basis': 'order'}
+]
+SCENARIO_BASES = [None, 'post', 'order'] # Index into the first axis of payout_components
+
+def build_payout_inputs(dataset):
+    """Returns (basis_is_post, rate, orders) arrays over the payout rows.
+
+    orders are the orders attributed to each payout's post (see attribute_posts); payout rows
+    without a post reference keep their recorded orders.
+    """
+    payouts = dataset.payouts
+    post_keys = dataset.post_attribution(app_config['attribution_lookback_days'])
+    attributed = post_keys >= 0
+    post_orders = np.bincount(post_keys[attributed], weights=dataset.tracking_data['orders'].to_numpy(dtype=np.float64)[attributed],
+                              minlength=len(dataset.posts))
+    orders = payouts['orders'].to_numpy().astype(np.float64)
+    payout_posts = payouts['post_key'].to_numpy()
+    linked = payout_posts >= 0
+    orders[linked] = post_orders[payout_posts[linked]]
+    return (payouts['basis'] == 'post').to_numpy(), payouts['rate'].to_numpy(dtype=np.float64), orders
+
+def payout_components(basis_is_post, rate, orders):
+    """Returns a (SCENARIO_BASES x 2 x rows) array of each row's per-post and per-order payout before rate changes.
+
+    Rows moved to a basis they are not on take the mean rate of the rows already on it.
+    """
+    mean_post_rate = rate[basis_is_post].mean() if basis_is_post.any() else 0.0
+    mean_order_rate = rate[~basis_is_post].mean() if not basis_is_post.all() else 0.0
+    none = np.zeros_like(rate)
+    return np.array([
+        [np.where(basis_is_post, rate, 0.0), np.where(basis_is_post, 0.0, orders * rate)], # As contracted
+        [np.where(basis_is_post, rate, mean_post_rate), none], # Everyone per-post
+        [none, orders * np.where(basis_is_post, mean_order_rate, rate)] # Everyone per-order
+    ])
+
+def scenario_weights(scenarios):
+    """Returns each scenario's SCENARIO_BASES index and its (per-post, per-order) rate multipliers."""
+    bases = np.array([SCENARIO_BASES.index(scenario.get('basis')) for scenario in scenarios], dtype=np.intp)
+    multipliers = 1 + np.array([[scenario.get('post_rate_change', 0), scenario.get('order_rate_change', 0)] for scenario in scenarios],
+                               dtype=np.float64).reshape(-1, 2)
+    return bases, multipliers
+
+def scenario_payouts(basis_is_post, rate, orders, scenarios):
+    """Returns a (scenarios x rows) array of total_payout recomputed under each scenario."""
+    bases, multipliers = scenario_weights(scenarios)
+    return np.einsum('sc,scr->sr', multipliers, payout_components(basis_is_post, rate, orders)[bases])
+
+def scenario_kpis(revenue, component_totals, scenarios, incremental_share=0.7):
+    """Returns total payout, ROAS and incremental ROAS per scenario, with deltas against BASELINE_SCENARIO.
+
+    component_totals is payout_components(...) summed over the rows of the selection.
+    """
+    scenarios = [BASELINE_SCENARIO] + list(scenarios)
+    bases, multipliers = scenario_weights(scenarios)
+    total_payout = (multipliers * component_totals[bases]).sum(axis=1)
+    has_payout = total_payout > 0
+    roas = np.divide(revenue, total_payout, out=np.zeros(len(scenarios)), where=has_payout)
+    incremental_roas = np.divide(revenue * incremental_share, total_payout, out=np.zeros(len(scenarios)), where=has_payout)
+    return pd.DataFrame({
+        'scenario': [scenario.get('name', f'Scenario {i}') for i, scenario in enumerate(scenarios)],
+        'total_payout': total_payout,
+        'payout_delta': total_payout - total_payout[0],
+        'roas': roas,
+        'roas_delta': roas - roas[0],
+        'incremental_roas': incremental_roas,
+        'incremental_roas_delta': incremental_roas - incremental_roas[0]
+    })
+
+# --- 13. Background Jobs ---
+# Data generation, ingestion, cube rebuilds and exports run on a local job queue instead of inside
+# the request that starts them. Jobs run one at a time on a queue thread, in submission order; their
+# CPU-heavy steps (generating and compacting data, building the cube) go to a process pool, so
+# they do not hold the GIL the interactive callbacks need. Each job has an ID and reports progress
+# between steps, which the dashboard polls into the data-generation-status area. With a data_dir,
+# every job's state is also written to jobs/<id>.json and exports to exports/<id>.zip, so any
+# worker process can report on a job or serve its download, whichever process ran it.
+
+JOB_HISTORY = 20 # Finished jobs kept for status lookups and downloads
+JOB_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn' # Job processes never fork the server's threads and locks
+
+class Job:
+    """One background job: its kind, state, progress (0-1) with a message, and result or error."""
+
+    def __init__(self, job_id, kind, queue=None):
+        self.job_id = job_id
+        self.kind = kind
+        self.state = 'queued' # queued -> running -> done | failed
+        self.progress = 0.0
+        self.message = "Queued"
+        self.result = None
+        self.error = None
+        self.files = [] # Files deleted when the job leaves the history
+        self._queue = queue
+
+    @classmethod
+    def from_record(cls, record):
+        """Returns a Job, not attached to any queue, from a record written by save."""
+        job = cls(record['job_id'], record['kind'])
+        for name in ('state', 'progress', 'message', 'result', 'error', 'files'):
+            setattr(job, name, record[name])
+        return job
+
+    def save(self):
+        """Writes the job's state to jobs/<job_id>.json under the queue's directory, if it has one."""
+        directory = self._queue.directory('jobs') if self._queue is not None else None
+        if directory is None:
+            return
+        record = {name: getattr(self, name) for name in ('job_id', 'kind', 'state', 'progress', 'message', 'result', 'error', 'files')}
+        path = os.path.join(directory, self.job_id + '.json')
+        with open(path + '.tmp', 'w') as record_file:
+            json.dump(record, record_file)
+        os.replace(path + '.tmp', path) # Readers in other processes never see a partial record
+
+    def update(self, progress, message):
+        """Records the job's progress; called by the job function between steps."""
+        self.progress, self.message = progress, message
+        self.save()
+
+    def run_in_process(self, func, *args):
+        """Runs func(*args) in the queue's process pool (in this thread without one) and returns the result."""
+        pool = self._queue.process_pool()
+        return func(*args) if pool is None else pool.submit(func, *args).result()
+
+    @property
+    def finished(self):
+        return self.state in ('done', 'failed')
+
+class JobQueue:
+    """Runs job functions func(job, *args) one at a time on a background thread, tracked by job ID."""
+
+    def __init__(self, max_history=JOB_HISTORY):
+        self.max_history = max_history
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._runner = ThreadPoolExecutor(max_workers=1, thread_name_prefix='healthkart-jobs')
+        self._processes = None
+
+    def directory(self, name):
+        """Returns (creating it) the data_dir subdirectory shared by every worker's jobs, or None without a data_dir."""
+        if not app_config['data_dir']:
+            return None
+        directory = os.path.join(app_config['data_dir'], name)
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def process_pool(self):
+        """Returns the process pool for heavy job steps, started on first use; None if app_config['job_workers'] is 0."""
+        with self._lock:
+            if self._processes is None and app_config['job_workers'] > 0:
+                self._processes = ProcessPoolExecutor(max_workers=app_config['job_workers'],
+                                                      mp_context=multiprocessing.get_context(JOB_START_METHOD))
+            return self._processes
+
+    def submit(self, kind, func, *args):
+        """Queues func(job, *args) and returns the new job's ID."""
+        job = Job(uuid.uuid4().hex[:12], kind, self)
+        job.save()
+        directory = self.directory('jobs')
+        with self._lock:
+            self._jobs[job.job_id] = job
+            finished = [old for old in self._jobs.values() if old.finished]
+            for old in finished[:max(len(self._jobs) - self.max_history, 0)]:
+                del self._jobs[old.job_id]
+                for path in old.files if directory is None else []: # Stored jobs are pruned by their records
+                    if os.path.exists(path):
+                        os.remove(path)
+        if directory is not None:
+            self._prune(directory)
+        self._runner.submit(self._run, job, func, args)
+        return job.job_id
+
+    def _stored_jobs(self, directory):
+        """Returns the job records in the jobs directory."""
+        records = []
+        for name in os.listdir(directory):
+            if name.endswith('.json'):
+                try:
+                    records.append(self._read(os.path.join(directory, name)))
+                except (FileNotFoundError, ValueError): # Pruned by another process meanwhile
+                    pass
+        return records
+
+    @staticmethod
+    def _read(path):
+        with open(path) as record_file:
+            record = json.load(record_file)
+        record['mtime'] = os.path.getmtime(path)
+        return record
+
+    def _prune(self, directory):
+        """Deletes the records and files of the oldest finished jobs past max_history, whichever worker ran them."""
+        records = sorted(self._stored_jobs(directory), key=lambda record: record['mtime'])
+        finished = [record for record in records if record['state'] in ('done', 'failed')]
+        for record in finished[:max(len(records) - self.max_history, 0)]:
+            for path in record['files'] + [os.path.join(directory, record['job_id'] + '.json')]:
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _run(self, job, func, args):
+        """Runs one job, recording its result or error."""
+        job.state = 'running'
+        job.save()
+        try:
+            job.result = func(job, *args)
+            job.state, job.progress, job.message = 'done', 1.0, "Done"
+        except Exception as error:
+            job.state, job.error, job.message = 'failed', f"{type(error).__name__}: {error}", "Failed"
+        job.save()
+
+    def get(self, job_id):
+        """Returns the Job with job_id, or None if it is unknown or was dropped from the history.
+
+        With a jobs directory the job is read from its record, so jobs run by other worker processes are found too.
+        """
+        directory = self.directory('jobs')
+        if directory is None:
+            with self._lock:
+                return self._jobs.get(job_id)
+        if not job_id.isalnum(): # IDs are hex; anything else could name a path outside the directory
+            return None
+        try:
+            return Job.from_record(self._read(os.path.join(directory, job_id + '.json')))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def shutdown(self):
+        """Waits for queued jobs and stops the worker processes."""
+        self._runner.shutdown(wait=True)
+        if self._processes is not None:
+            self._processes.shutdown()
+
+job_queue = JobQueue()
+
+def generate_compact_data(generation):
+    """Generates mock data and converts it to the compact schema; returns (tables, user_ids). Runs in a job process."""
+    return compact_tables(*generate_mock_data(**generation))
+
+def generation_job(job, generation):
+    """Generates and registers a new dataset, with its cube and buyer sketches prebuilt; returns the version key."""
+    job.update(0.05, "Generating mock data")
+    tables, user_ids = job.run_in_process(generate_compact_data, generation)
+    job.update(0.6, "Building aggregate cube")
+    cube = job.run_in_process(build_cube, tables[0][['category']], tables[2])
+    job.update(0.75, "Building buyer sketches")
+    buyer_sketches = job.run_in_process(build_buyer_sketches, tables[0][['category']], tables[2])
+    job.update(0.9, "Registering dataset")
+    version = dataset_registry.put_compact(tables, user_ids, {'cube': cube, 'buyer_sketches': buyer_sketches})
+    invalidate_caches()
+    persist_dataset(version)
+    return version
+
+def append_job(job, influencers, posts, tracking_data, payouts):
+    """Appends a batch (see append_batch) and returns the new version key."""
+    job.update(0.1, "Appending batch")
+    return append_batch(influencers, posts, tracking_data, payouts)
+
+def cube_rebuild_job(job, version):
+    """Builds the aggregate cube of a dataset that has none yet, so no dashboard request has to; returns the version key."""
+    dataset = dataset_registry.get(version)
+    if 'cube' in dataset._derived:
+        return dataset.version
+    job.update(0.1, "Building aggregate cube")
+    cube = job.run_in_process(build_cube, dataset.influencers[['category']], dataset.tracking_data)
+    dataset.derived('cube', lambda dataset: cube) # Keeps a cube that a request built in the meantime
+    return dataset.version
+
+def export_job(job, version, filters, export_format):
+    """Writes a filtered export to a zip file and returns (path, download file name).
+
+    The zip is exports/<job ID>.zip under the data directory, so every worker can serve it, or a temporary file without one.
+    """
+    dataset = dataset_registry.get(version)
+    directory = job_queue.directory('exports')
+    if directory is None:
+        descriptor, path = tempfile.mkstemp(prefix='healthkart_export_', suffix='.zip')
+        fileobj = os.fdopen(descriptor, 'wb')
+    else:
+        path = os.path.abspath(os.path.join(directory, job.job_id + '.zip')) # Flask resolves relative paths against the app root
+        fileobj = open(path, 'wb')
+    job.files.append(path)
+    with fileobj:
+        write_export(dataset, filters, export_format, fileobj, progress=lambda fraction, message: job.update(0.05 + 0.9 * fraction, message))
+    return path, f"healthkart_influencer_data_{export_format}.zip"
+
+def start_generation(generation=None):
+    """Queues generation of a new dataset (generate_mock_data keyword arguments, app_config['generation'] by default)."""
+    return job_queue.submit('generate', generation_job, app_config['generation'] if generation is None else generation)
+
+def start_append_batch(influencers=None, posts=None, tracking_data=None, payouts=None):
+    """Queues append_batch for a batch of string-schema rows and returns the job ID."""
+    return job_queue.submit('append', append_job, influencers, posts, tracking_data, payouts)
+
+def start_cube_rebuild(version=None):
+    """Queues building the aggregate cube of a dataset version (the latest by default) and returns the job ID."""
+    return job_queue.submit('cube', cube_rebuild_job, version)
+
+def start_export(version, filters, export_format='csv'):
+    """Queues an export of a filter selection and returns the job ID; /export/<job ID> serves the finished zip."""
+    return job_queue.submit('export', export_job, version, filters, export_format)
+
+JOB_LABELS = {'generate': "Generating data", 'append': "Appending data", 'cube': "Rebuilding cube", 'export': "Preparing export"}
+
+def render_job(job):
+    """Renders one job's status for the data-generation-status area."""
+    box_class = "px-4 py-2 rounded-lg shadow-lg mb-2 text-sm"
+    if job.state == 'failed':
+        return html.Div(f"{JOB_LABELS[job.kind]} failed: {job.error}", className=f"bg-red-500 text-white {box_class}")
+    if job.state == 'done':
+        if job.kind == 'export':
+            return html.Div(className=f"bg-green-500 text-white {box_class}", children=html.A(
+                "Export ready: download", href=dash.get_relative_path(f'/export/{job.job_id}'), className="underline font-semibold"))
+        return html.Div("Data Generated Successfully!" if job.kind == 'generate' else f"{JOB_LABELS[job.kind]}: done",
+                        className=f"bg-green-500 text-white flex items-center {box_class}")
+    return html.Div(className=f"bg-blue-600 text-white {box_class}", children=[
+        html.Div(f"{JOB_LABELS[job.kind]}: {job.progress:.0%} ({job.message})"),
+        html.Div(className="w-48 bg-blue-300 rounded h-1 mt-1", children=html.Div(
+            className="bg-white rounded h-1", style={'width': f"{job.progress:.0%}"}))
+    ])
 
 external_stylesheets = [
     'https://cdn.jsdelivr.net/npm/tailwindcss@2.2.19/dist/tailwind.min.css',
     'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0-beta3/css/all.min.css' # Font Awesome 6
 ]
 
-app = dash.Dash(__name__, external_stylesheets=external_stylesheets)
-
-app.layout = html.Div(className="min-h-screen bg-gray-100 font-inter p-4 sm:p-6 md:p-8", children=[
-    html.Div(className="max-w-7xl mx-auto bg-white rounded-xl shadow-lg p-4 sm:p-6 md:p-8", children=[
-        html.H1("HealthKart Influencer Dashboard", className="text-3xl sm:text-4xl font-bold text-gray-800 mb-6 text-center"),
+def filter_options(values):
+    """Dropdown options for one filter dimension: 'All' followed by its values."""
+    return [{'label': 'All', 'value': 'All'}] + [{'label': value, 'value': value} for value in values]
+
+def build_layout(config):
+    """Builds the dashboard layout; the filter options are filled in by update_data once data is loaded."""
+    charts = build_charts()
+    return html.Div(className="min-h-screen bg-gray-100 font-inter p-4 sm:p-6 md:p-8", children=[
+        html.Div(className="max-w-7xl mx-auto bg-white rounded-xl shadow-lg p-4 sm:p-6 md:p-8", children=[
+            html.H1("HealthKart Influencer Dashboard", className="text-3xl sm:text-4xl font-bold text-gray-800 mb-6 text-center"),
+
+            # Data Ingestion Section
+            html.Div(className="bg-blue-50 p-4 rounded-lg flex flex-col sm:flex-row items-center justify-between mb-6 shadow-sm", children=[
+                html.P("Simulate Data Ingestion:", className="text-blue-800 text-lg font-medium mb-3 sm:mb-0"),
+                html.Button(
+                    "Generate New Mock Data",
+                    id="generate-data-button",
+                    n_clicks=0,
+                    className="flex items-center px-6 py-3 bg-blue-600 text-white rounded-lg shadow-md hover:bg-blue-700 transition-colors text-lg font-semibold"
+                ),
+                html.Div(id="data-generation-status", className="absolute top-4 right-4")
+            ]),
 
-        # Data Ingestion Section
-        html.Div(className="bg-blue-50 p-4 rounded-lg flex flex-col sm:flex-row items-center justify-between mb-6 shadow-sm", children=[
-            html.P("Simulate Data Ingestion:", className="text-blue-800 text-lg font-medium mb-3 sm:mb-0"),
-            html.Button(
-                "Generate New Mock Data",
-                id="generate-data-button",
-                n_clicks=0,
-                className="flex items-center px-6 py-3 bg-blue-600 text-white rounded-lg shadow-md hover:bg-blue-700 transition-colors text-lg font-semibold"
-            ),
-            html.Div(id="data-generation-status", className="absolute top-4 right-4")
-        ]),
-
-        # Filters Section
-        html.Div(className="bg-gray-50 p-4 rounded-lg mb-6 shadow-sm", children=[
-            html.H2(html.Span([html.I(className="fas fa-filter mr-2 text-gray-600"), "Filters"]), className="text-xl font-semibold text-gray-700 mb-4 flex items-center"),
-            html.Div(className="grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-4 gap-4", children=[
-                html.Div(children=[
-                    html.Label("Brand", className="block text-sm font-medium text-gray-700 mb-1"),
-                    dcc.Dropdown(
-                        id='brand-filter',
-                        options=[{'label': 'All', 'value': 'All'}] + [{'label': brand, 'value': brand} for brand in sorted(tracking_data_df['brand'].unique())],
-                        value='All',
-                        clearable=False,
-                        className="mt-1 block w-full text-base rounded-md shadow-sm"
-                    )
-                ]),
-                html.Div(children=[
-                    html.Label("Product", className="block text-sm font-medium text-gray-700 mb-1"),
-                    dcc.Dropdown(
-                        id='product-filter',
-                        options=[{'label': 'All', 'value': 'All'}] + [{'label': product, 'value': product} for product in sorted(tracking_data_df['product'].unique())],
-                        value='All',
-                        clearable=False,
-                        className="mt-1 block w-full text-base rounded-md shadow-sm"
-                    )
-                ]),
-                html.Div(children=[
-                    html.Label("Influencer Category", className="block text-sm font-medium text-gray-700 mb-1"),
-                    dcc.Dropdown(
-                        id='influencer-category-filter',
-                        options=[{'label': 'All', 'value': 'All'}] + [{'label': category, 'value': category} for category in sorted(influencers_df['category'].unique())],
-                        value='All',
-                        clearable=False,
-                        className="mt-1 block w-full text-base rounded-md shadow-sm"
-                    )
-                ]),
-                html.Div(children=[
-                    html.Label("Platform", className="block text-sm font-medium text-gray-700 mb-1"),
-                    dcc.Dropdown(
-                        id='platform-filter',
-                        options=[{'label': 'All', 'value': 'All'}] + [{'label': platform, 'value': platform} for platform in sorted(tracking_data_df['source'].unique())],
-                        value='All',
-                        clearable=False,
-                        className="mt-1 block w-full text-base rounded-md shadow-sm"
-                    )
-                ])
-            ])
-        ]),
-
-        # Campaign Performance Section
-        html.Div(className="mb-8", children=[
-            html.H2("Campaign Performance", className="text-2xl font-bold text-gray-800 mb-4 text-center"),
-            html.Div(className="grid grid-cols-1 md:grid-cols-3 lg:grid-cols-5 gap-6 mb-8", children=[
-                html.Div(className="bg-white p-5 rounded-lg shadow-md flex items-center justify-between", children=[
+            # Filters Section
+            html.Div(className="bg-gray-50 p-4 rounded-lg mb-6 shadow-sm", children=[
+                html.H2(html.Span([html.I(className="fas fa-filter mr-2 text-gray-600"), "Filters"]), className="text-xl font-semibold text-gray-700 mb-4 flex items-center"),
+                html.Div(className="grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-5 gap-4", children=[
                     html.Div(children=[
-                        html.P("Total Revenue", className="text-gray-500 text-sm"),
-                        html.P(id="total-revenue", className="text-2xl font-semibold text-gray-900")
+                        html.Label("Brand", className="block text-sm font-medium text-gray-700 mb-1"),
+                        dcc.Dropdown(
+                            id='brand-filter',
+                            options=filter_options([]),
+                            value='All',
+                            clearable=False,
+                            className="mt-1 block w-full text-base rounded-md shadow-sm"
+                        )
                     ]),
-                    html.Div(className="p-3 bg-green-100 rounded-full text-green-600", children=html.I(className="fas fa-dollar-sign text-xl"))
-                ]),
-                html.Div(className="bg-white p-5 rounded-lg shadow-md flex items-center justify-between", children=[
                     html.Div(children=[
-                        html.P("Total Orders", className="text-gray-500 text-sm"),
-                        html.P(id="total-orders", className="text-2xl font-semibold text-gray-900")
+                        html.Label("Product", className="block text-sm font-medium text-gray-700 mb-1"),
+                        dcc.Dropdown(
+                            id='product-filter',
+                            options=filter_options([]),
+                            value='All',
+                            clearable=False,
+                            className="mt-1 block w-full text-base rounded-md shadow-sm"
+                        )
                     ]),
-                    html.Div(className="p-3 bg-blue-100 rounded-full text-blue-600", children=html.I(className="fas fa-shopping-cart text-xl"))
-                ]),
-                html.Div(className="bg-white p-5 rounded-lg shadow-md flex items-center justify-between", children=[
                     html.Div(children=[
-                        html.P("Total Payout", className="text-gray-500 text-sm"),
-                        html.P(id="total-payout", className="text-2xl font-semibold text-gray-900")
+                        html.Label("Influencer Category", className="block text-sm font-medium text-gray-700 mb-1"),
+                        dcc.Dropdown(
+                            id='influencer-category-filter',
+                            options=filter_options([]),
+                            value='All',
+                            clearable=False,
+                            className="mt-1 block w-full text-base rounded-md shadow-sm"
+                        )
                     ]),
-                    html.Div(className="p-3 bg-red-100 rounded-full text-red-600", children=html.I(className="fas fa-money-bill-wave text-xl"))
-                ]),
-                html.Div(className="bg-white p-5 rounded-lg shadow-md flex items-center justify-between", children=[
                     html.Div(children=[
-                        html.P("ROAS", className="text-gray-500 text-sm"),
-                        html.P(id="roas", className="text-2xl font-semibold text-gray-900")
+                        html.Label("Platform", className="block text-sm font-medium text-gray-700 mb-1"),
+                        dcc.Dropdown(
+                            id='platform-filter',
+                            options=filter_options([]),
+                            value='All',
+                            clearable=False,
+                            className="mt-1 block w-full text-base rounded-md shadow-sm"
+                        )
                     ]),
-                    html.Div(className="p-3 bg-purple-100 rounded-full text-purple-600", children=html.I(className="fas fa-chart-line text-xl"))
-                ]),
-                html.Div(className="bg-white p-5 rounded-lg shadow-md flex items-center justify-between", children=[
                     html.Div(children=[
-                        html.P("Incremental ROAS", className="text-gray-500 text-sm"),
-                        html.P(id="incremental-roas", className="text-2xl font-semibold text-gray-900")
-                    ]),
-                    html.Div(className="p-3 bg-teal-100 rounded-full text-teal-600", children=html.I(className="fas fa-chart-area text-xl"))
+                        html.Label("Date Range", className="block text-sm font-medium text-gray-700 mb-1"),
+                        dcc.DatePickerRange(
+                            id='date-range-filter',
+                            clearable=True, # Cleared dates leave that end of the range open
+                            display_format='YYYY-MM-DD',
+                            className="mt-1 block w-full text-base"
+                        )
+                    ])
                 ])
             ]),
 
-            html.Div(className="grid grid-cols-1 lg:grid-cols-2 gap-6", children=[
-                html.Div(className="bg-white p-6 rounded-lg shadow-md", children=[
-                    html.H3("Revenue Over Time", className="text-lg font-semibold text-gray-800 mb-4"),
-                    dcc.Graph(id='revenue-over-time-chart', config={'displayModeBar': False})
-                ]),
-                html.Div(className="bg-white p-6 rounded-lg shadow-md", children=[
-                    html.H3("Revenue by Platform", className="text-lg font-semibold text-gray-800 mb-4"),
-                    dcc.Graph(id='revenue-by-platform-chart', config={'displayModeBar': False})
-                ]),
-                html.Div(className="bg-white p-6 rounded-lg shadow-md lg:col-span-2", children=[
-                    html.H3("Revenue by Campaign", className="text-lg font-semibold text-gray-800 mb-4"),
-                    dcc.Graph(id='revenue-by-campaign-chart', config={'displayModeBar': False})
-                ])
-            ])
-        ]),
-
-        # Influencer Insights Section
-        html.Div(className="mb-8", children=[
-            html.H2("Influencer Insights", className="text-2xl font-bold text-gray-800 mb-4 text-center"),
-            html.Div(className="grid grid-cols-1 lg:grid-cols-2 gap-6", children=[
-                html.Div(className="bg-white p-6 rounded-lg shadow-md", children=[
-                    html.H3("Top 5 Influencers by Revenue", className="text-lg font-semibold text-gray-800 mb-4"),
-                    html.Div(id="top-influencers-revenue-table", className="overflow-x-auto")
-                ]),
-                html.Div(className="bg-white p-6 rounded-lg shadow-md", children=[
-                    html.H3("Top 5 Influencers by ROAS", className="text-lg font-semibold text-gray-800 mb-4"),
-                    html.Div(id="top-influencers-roas-table", className="overflow-x-auto")
-                ]),
-                html.Div(className="bg-white p-6 rounded-lg shadow-md", children=[
-                    html.H3("Best Performing Personas (by Avg. ROAS)", className="text-lg font-semibold text-gray-800 mb-4"),
-                    html.Div(id="best-personas-table", className="overflow-x-auto")
+            # Campaign Performance Section
+            html.Div(className="mb-8", children=[
+                html.H2("Campaign Performance", className="text-2xl font-bold text-gray-800 mb-4 text-center"),
+                html.Div(className="grid grid-cols-1 md:grid-cols-3 lg:grid-cols-6 gap-6 mb-8", children=[
+                    html.Div(className="bg-white p-5 rounded-lg shadow-md flex items-center justify-between", children=[
+                        html.Div(children=[
+                            html.P("Total Revenue", className="text-gray-500 text-sm"),
+                            html.P(id="total-revenue", className="text-2xl font-semibold text-gray-900")
+                        ]),
+                        html.Div(className="p-3 bg-green-100 rounded-full text-green-600", children=html.I(className="fas fa-dollar-sign text-xl"))
+                    ]),
+                    html.Div(className="bg-white p-5 rounded-lg shadow-md flex items-center justify-between", children=[
+                        html.Div(children=[
+                            html.P("Total Orders", className="text-gray-500 text-sm"),
+                            html.P(id="total-orders", className="text-2xl font-semibold text-gray-900")
+                        ]),
+                        html.Div(className="p-3 bg-blue-100 rounded-full text-blue-600", children=html.I(className="fas fa-shopping-cart text-xl"))
+                    ]),
+                    html.Div(className="bg-white p-5 rounded-lg shadow-md flex items-center justify-between", children=[
+                        html.Div(children=[
+                            html.P("Total Payout", className="text-gray-500 text-sm"),
+                            html.P(id="total-payout", className="text-2xl font-semibold text-gray-900")
+                        ]),
+                        html.Div(className="p-3 bg-red-100 rounded-full text-red-600", children=html.I(className="fas fa-money-bill-wave text-xl"))
+                    ]),
+                    html.Div(className="bg-white p-5 rounded-lg shadow-md flex items-center justify-between", children=[
+                        html.Div(children=[
+                            html.P("ROAS", className="text-gray-500 text-sm"),
+                            html.P(id="roas", className="text-2xl font-semibold text-gray-900"),
+                            html.P(id="roas-interval", className="text-xs text-gray-500")
+                        ]),
+                        html.Div(className="p-3 bg-purple-100 rounded-full text-purple-600", children=html.I(className="fas fa-chart-line text-xl"))
+                    ]),
+                    html.Div(className="bg-white p-5 rounded-lg shadow-md flex items-center justify-between", children=[
+                        html.Div(children=[
+                            html.P("Incremental ROAS", className="text-gray-500 text-sm"),
+                            html.P(id="incremental-roas", className="text-2xl font-semibold text-gray-900"),
+                            html.P(id="incremental-roas-interval", className="text-xs text-gray-500")
+                        ]),
+                        html.Div(className="p-3 bg-teal-100 rounded-full text-teal-600", children=html.I(className="fas fa-chart-area text-xl"))
+                    ]),
+                    html.Div(className="bg-white p-5 rounded-lg shadow-md flex items-center justify-between", children=[
+                        html.Div(children=[
+                            html.P(f"Unique Buyers (±{HLL_ERROR:.1%})", className="text-gray-500 text-sm"),
+                            html.P(id="unique-buyers", className="text-2xl font-semibold text-gray-900")
+                        ]),
+                        html.Div(className="p-3 bg-yellow-100 rounded-full text-yellow-600", children=html.I(className="fas fa-users text-xl"))
+                    ])
                 ]),
-                html.Div(className="bg-white p-6 rounded-lg shadow-md", children=[
-                    html.H3("Poor ROIs (ROAS < 1)", className="text-lg font-semibold text-gray-800 mb-4"),
-                    html.Div(id="poor-rois-table", className="overflow-x-auto")
+
+                html.Div(className="grid grid-cols-1 lg:grid-cols-2 gap-6", children=[
+                    html.Div(className="bg-white p-6 rounded-lg shadow-md", children=[
+                        html.H3("Revenue Over Time", className="text-lg font-semibold text-gray-800 mb-4"),
+                        dcc.Graph(id='revenue-over-time-chart', figure=charts['revenue-over-time-chart'], config={'displayModeBar': False})
+                    ]),
+                    html.Div(className="bg-white p-6 rounded-lg shadow-md", children=[
+                        html.H3("Revenue by Platform", className="text-lg font-semibold text-gray-800 mb-4"),
+                        dcc.Graph(id='revenue-by-platform-chart', figure=charts['revenue-by-platform-chart'], config={'displayModeBar': False})
+                    ]),
+                    html.Div(className="bg-white p-6 rounded-lg shadow-md lg:col-span-2", children=[
+                        html.H3("Revenue by Campaign", className="text-lg font-semibold text-gray-800 mb-4"),
+                        dcc.Graph(id='revenue-by-campaign-chart', figure=charts['revenue-by-campaign-chart'], config={'displayModeBar': False})
+                    ])
                 ])
-            ])
-        ]),
-
-        # Payout Tracking Section
-        html.Div(className="mb-8", children=[
-            html.H2("Payout Tracking", className="text-2xl font-bold text-gray-800 mb-4 text-center"),
-            html.Div(className="bg-white p-6 rounded-lg shadow-md", children=[
-                html.H3("Detailed Payouts", className="text-lg font-semibold text-gray-800 mb-4"),
-                html.Div(id="payouts-table", className="overflow-x-auto")
-            ])
-        ]),
-
-        # Export Section
-        html.Div(className="bg-blue-50 p-4 rounded-lg flex flex-col sm:flex-row items-center justify-between shadow-sm", children=[
-            html.P("Export Current Data:", className="text-blue-800 text-lg font-medium mb-3 sm:mb-0"),
-            html.Button(
-                "Export Filtered Data to CSV",
-                id="export-csv-button",
-                n_clicks=0,
-                className="flex items-center px-6 py-3 bg-green-600 text-white rounded-lg shadow-md hover:bg-green-700 transition-colors text-lg font-semibold"
-            ),
-            dcc.Download(id="download-dataframe-csv")
-        ]),
-
-        # Hidden Div to store filtered data for export and calculations
-        dcc.Store(id='filtered-tracking-data-store'),
-        dcc.Store(id='filtered-payouts-data-store'),
-        dcc.Store(id='filtered-influencers-data-store'), # To pass influencer details for insights
-        dcc.Store(id='filtered-posts-data-store') # To pass post details for insights
+            ]),
+
+            # Influencer Insights Section
+            html.Div(className="mb-8", children=[
+                html.H2(html.Button(id="insights-toggle", n_clicks=0, className="inline-flex items-center font-bold", children=[
+                    "Influencer Insights", html.I(id="insights-toggle-icon")
+                ]), className="text-2xl font-bold text-gray-800 mb-4 text-center"),
+                html.Div(id="insights-content", children=html.Div(className="grid grid-cols-1 lg:grid-cols-2 gap-6", children=[
+                    html.Div(className="bg-white p-6 rounded-lg shadow-md", children=[
+                        html.H3("Top 5 Influencers by Revenue", className="text-lg font-semibold text-gray-800 mb-4"),
+                        html.Div(id="top-influencers-revenue-table", className="overflow-x-auto")
+                    ]),
+                    html.Div(className="bg-white p-6 rounded-lg shadow-md", children=[
+                        html.H3("Top 5 Influencers by ROAS", className="text-lg font-semibold text-gray-800 mb-4"),
+                        html.Div(id="top-influencers-roas-table", className="overflow-x-auto")
+                    ]),
+                    html.Div(className="bg-white p-6 rounded-lg shadow-md", children=[
+                        html.H3("Best Performing Personas (by Avg. ROAS)", className="text-lg font-semibold text-gray-800 mb-4"),
+                        html.Div(id="best-personas-table", className="overflow-x-auto")
+                    ]),
+                    html.Div(className="bg-white p-6 rounded-lg shadow-md", children=[
+                        html.H3("Poor ROIs (ROAS < 1)", className="text-lg font-semibold text-gray-800 mb-4"),
+                        table_pager('poor-rois', {'roas': 'ROAS', 'roas_high': 'ROAS upper bound', 'totalRevenue': 'Revenue', 'total_payout': 'Payout'},
+                                    'roas', default_ascending=True),
+                        html.Div(id="poor-rois-table", className="overflow-x-auto")
+                    ])
+                ]))
+            ]),
+
+            # Payout Tracking Section
+            html.Div(className="mb-8", children=[
+                html.H2(html.Button(id="payouts-toggle", n_clicks=0, className="inline-flex items-center font-bold", children=[
+                    "Payout Tracking", html.I(id="payouts-toggle-icon")
+                ]), className="text-2xl font-bold text-gray-800 mb-4 text-center"),
+                html.Div(id="payouts-content", children=html.Div(className="grid grid-cols-1 gap-6", children=[
+                    html.Div(className="bg-white p-6 rounded-lg shadow-md", children=[
+                        html.H3("Detailed Payouts", className="text-lg font-semibold text-gray-800 mb-4"),
+                        table_pager('payouts', {'total_payout': 'Total Payout', 'rate': 'Rate', 'orders': 'Orders', 'basis': 'Basis'}, 'total_payout'),
+                        html.Div(id="payouts-table", className="overflow-x-auto")
+                    ]),
+                    html.Div(className="bg-white p-6 rounded-lg shadow-md", children=[
+                        html.H3("Post Performance and Payout Reconciliation", className="text-lg font-semibold text-gray-800 mb-4"),
+                        table_pager('post-performance', {'totalRevenue': 'Revenue', 'roas': 'ROAS', 'total_payout': 'Payout',
+                                                         'payout_gap': 'Payout Gap'}, 'totalRevenue'),
+                        html.Div(id="post-performance-table", className="overflow-x-auto")
+                    ]),
+                    html.Div(className="bg-white p-6 rounded-lg shadow-md", children=[
+                        html.H3("What-if Payout Scenarios", className="text-lg font-semibold text-gray-800 mb-4"),
+                        html.Div(className="grid grid-cols-1 md:grid-cols-3 gap-4 mb-4", children=[
+                            html.Div([
+                                html.Label("Per-post rate change", className="block text-sm font-medium text-gray-700 mb-1"),
+                                dcc.Slider(id='post-rate-change', min=-50, max=100, step=5, value=0, updatemode='drag',
+                                           marks={change: f'{change:+d}%' for change in range(-50, 101, 25)})
+                            ]),
+                            html.Div([
+                                html.Label("Per-order rate change", className="block text-sm font-medium text-gray-700 mb-1"),
+                                dcc.Slider(id='order-rate-change', min=-50, max=100, step=5, value=0, updatemode='drag',
+                                           marks={change: f'{change:+d}%' for change in range(-50, 101, 25)})
+                            ]),
+                            html.Div([
+                                html.Label("Payout basis", className="block text-sm font-medium text-gray-700 mb-1"),
+                                dcc.RadioItems(
+                                    id='scenario-basis',
+                                    options=[{'label': 'As contracted', 'value': 'current'},
+                                             {'label': 'All per-post', 'value': 'post'},
+                                             {'label': 'All per-order', 'value': 'order'}],
+                                    value='current',
+                                    inline=True,
+                                    inputClassName="mr-1",
+                                    labelClassName="mr-4 text-sm text-gray-700"
+                                )
+                            ])
+                        ]),
+                        html.Div(id="payout-scenarios-table", className="overflow-x-auto")
+                    ])
+                ]))
+            ]),
+
+            # Export Section
+            html.Div(className="bg-blue-50 p-4 rounded-lg flex flex-col sm:flex-row items-center justify-between shadow-sm", children=[
+                html.P("Export Current Data:", className="text-blue-800 text-lg font-medium mb-3 sm:mb-0"),
+                dcc.RadioItems(
+                    id="export-format",
+                    options=[{'label': label, 'value': export_format, 'disabled': export_format == 'parquet' and not PARQUET_AVAILABLE}
+                             for export_format, label in EXPORT_FORMATS.items()],
+                    value='csv',
+                    inline=True,
+                    inputClassName="mr-1",
+                    labelClassName="mr-4 text-blue-800",
+                    className="mb-3 sm:mb-0"
+                ),
+                html.Button(
+                    "Export Filtered Data",
+                    id="export-button",
+                    n_clicks=0,
+                    className="flex items-center px-6 py-3 bg-green-600 text-white rounded-lg shadow-md hover:bg-green-700 transition-colors text-lg font-semibold"
+                )
+            ]),
+
+            # Version key of the dataset in dataset_registry, used for export and calculations
+            dcc.Store(id='dataset-version-store'),
+            # Polls for versions registered by append_batch
+            dcc.Interval(id='dataset-poll', interval=config['poll_interval_ms']),
+            # IDs of the background jobs this page started, and the poll that follows them while any runs
+            dcc.Store(id='job-ids', data=[]),
+            dcc.Interval(id='job-poll', interval=1000, disabled=True)
+        ])
     ])
-])
 
 #Callbacks
-
-@app.callback(
-    [Output('data-generation-status', 'children'),
-     Output('filtered-tracking-data-store', 'data'),
-     Output('filtered-payouts-data-store', 'data'),
-     Output('filtered-influencers-data-store', 'data'),
-     Output('filtered-posts-data-store', 'data'),
+# Callbacks are recorded here and registered on each app built by create_app.
+DASHBOARD_CALLBACKS = []
+
+def dashboard_callback(*args, **kwargs):
+    """Records a Dash callback (same arguments as app.callback) for create_app to register, timed by timed_callback."""
+    def record(func):
+        DASHBOARD_CALLBACKS.append((args, kwargs, timed_callback(func)))
+        return func
+    return record
+
+@dashboard_callback(
+    [Output('job-ids', 'data'),
+     Output('job-poll', 'disabled'),
+     Output('data-generation-status', 'children')],
+    [Input('generate-data-button', 'n_clicks'),
+     Input('export-button', 'n_clicks'),
+     Input('job-poll', 'n_intervals')],
+    [State('job-ids', 'data'),
+     State('export-format', 'value'),
+     State('brand-filter', 'value'),
+     State('product-filter', 'value'),
+     State('influencer-category-filter', 'value'),
+     State('platform-filter', 'value'),
+     State('date-range-filter', 'start_date'),
+     State('date-range-filter', 'end_date'),
+     State('dataset-version-store', 'data')],
+    prevent_initial_call=True
+)
+def update_jobs(generate_clicks, export_clicks, n_intervals, job_ids, export_format,
+                selected_brand, selected_product, selected_influencer_category, selected_platform, start_date, end_date, dataset_version):
+    """Starts generation and export jobs and shows the progress of this page's jobs."""
+    job_ids = list(job_ids or [])
+    if dash.ctx.triggered_id == 'generate-data-button':
+        job_ids.append(start_generation())
+    elif dash.ctx.triggered_id == 'export-button':
+        filters = (selected_brand, selected_product, selected_influencer_category, selected_platform, start_date, end_date)
+        job_ids.append(start_export(dataset_version, filters, export_format))
+    jobs = [job for job in map(job_queue.get, job_ids[-3:]) if job is not None]
+    return [job.job_id for job in jobs], all(job.finished for job in jobs), [render_job(job) for job in jobs]
+
+@dashboard_callback(
+    [Output('dataset-version-store', 'data'),
      Output('brand-filter', 'options'),
      Output('product-filter', 'options'),
      Output('influencer-category-filter', 'options'),
-     Output('platform-filter', 'options')],
-    [Input('generate-data-button', 'n_clicks')]
+     Output('platform-filter', 'options'),
+     Output('date-range-filter', 'min_date_allowed'),
+     Output('date-range-filter', 'max_date_allowed')],
+    [Input('dataset-poll', 'n_intervals'),
+     Input('job-poll', 'n_intervals')],
+    [State('dataset-version-store', 'data')]
 )
-def update_data(n_clicks):
-    global influencers_df, posts_df, tracking_data_df, payouts_df # Declare as global to modify
-    if n_clicks > 0:
-        influencers_df, posts_df, tracking_data_df, payouts_df = generate_mock_data()
-        status_message = html.Div(
-            "Data Generated Successfully!",
-            className="bg-green-500 text-white px-4 py-2 rounded-lg shadow-lg flex items-center"
-        )
-    else:
-        status_message = "" # No message on initial load
-
-    # Update filter options based on new data
-    unique_brands = [{'label': 'All', 'value': 'All'}] + [{'label': brand, 'value': brand} for brand in sorted(tracking_data_df['brand'].unique())]
-    unique_products = [{'label': 'All', 'value': 'All'}] + [{'label': product, 'value': product} for product in sorted(tracking_data_df['product'].unique())]
-    unique_influencer_categories = [{'label': 'All', 'value': 'All'}] + [{'label': category, 'value': category} for category in sorted(influencers_df['category'].unique())]
-    unique_platforms = [{'label': 'All', 'value': 'All'}] + [{'label': platform, 'value': platform} for platform in sorted(tracking_data_df['source'].unique())]
-
-    return (
-        status_message,
-        tracking_data_df.to_dict('records'),
-        payouts_df.to_dict('records'),
-        influencers_df.to_dict('records'),
-        posts_df.to_dict('records'),
-        unique_brands,
-        unique_products,
-        unique_influencer_categories,
-        unique_platforms
-    )
+def update_data(n_intervals, job_intervals, current_version):
+    # Generation and append jobs register new versions; both polls pick them up
+    if dash.ctx.triggered_id is not None and current_version == dataset_registry.latest_version:
+        raise PreventUpdate # Nothing new since the last poll
+
+    # Update filter options from the latest dataset's dimension table
+    dataset = dataset_registry.get()
+    options = tuple(filter_options(dataset.dimensions[dimension]) for dimension in FILTER_DIMENSIONS)
+    date_span = tuple(None if date is None else date.strftime('%Y-%m-%d') for date in dataset.date_span)
+    return (dataset.version,) + options + date_span
+
+# Each dashboard section has its own callback, so a section renders as soon as its result is
+# ready. All sections share one cached filter selection, and collapsible sections are only
+# computed while they are open.
+
+FILTER_INPUTS = [
+    Input('brand-filter', 'value'),
+    Input('product-filter', 'value'),
+    Input('influencer-category-filter', 'value'),
+    Input('platform-filter', 'value'),
+    Input('date-range-filter', 'start_date'),
+    Input('date-range-filter', 'end_date'),
+    Input('dataset-version-store', 'data')
+]
 
-@app.callback(
-    [Output('total-revenue', 'children'),
-     Output('total-orders', 'children'),
-     Output('total-payout', 'children'),
-     Output('roas', 'children'),
-     Output('incremental-roas', 'children'),
-     Output('revenue-over-time-chart', 'figure'),
-     Output('revenue-by-platform-chart', 'figure'),
-     Output('revenue-by-campaign-chart', 'figure'),
-     Output('top-influencers-revenue-table', 'children'),
-     Output('top-influencers-roas-table', 'children'),
-     Output('best-personas-table', 'children'),
-     Output('poor-rois-table', 'children'),
-     Output('payouts-table', 'children')],
-    [Input('brand-filter', 'value'),
-     Input('product-filter', 'value'),
-     Input('influencer-category-filter', 'value'),
-     Input('platform-filter', 'value'),
-     Input('filtered-tracking-data-store', 'data'),
-     Input('filtered-payouts-data-store', 'data'),
-     Input('filtered-influencers-data-store', 'data'),
-     Input('filtered-posts-data-store', 'data')]
-)
-def update_dashboard(selected_brand, selected_product, selected_influencer_category, selected_platform,
-                     stored_tracking_data, stored_payouts_data, stored_influencers_data, stored_posts_data):
-
-    # Convert stored data back to DataFrames
-    current_tracking_df = pd.DataFrame(stored_tracking_data)
-    current_payouts_df = pd.DataFrame(stored_payouts_data)
-    current_influencers_df = pd.DataFrame(stored_influencers_data)
-    current_posts_df = pd.DataFrame(stored_posts_data)
-
-    # Apply filters
-    filtered_tracking_df = current_tracking_df.copy()
-    if selected_brand != 'All':
-        filtered_tracking_df = filtered_tracking_df[filtered_tracking_df['brand'] == selected_brand]
-    if selected_product != 'All':
-        filtered_tracking_df = filtered_tracking_df[filtered_tracking_df['product'] == selected_product]
-    if selected_platform != 'All':
-        filtered_tracking_df = filtered_tracking_df[filtered_tracking_df['source'] == selected_platform]
-
-    # Filter by influencer category (requires joining with influencers_df)
-    if selected_influencer_category != 'All':
-        filtered_influencer_ids = current_influencers_df[
-            current_influencers_df['category'] == selected_influencer_category
-        ]['ID'].tolist()
-        filtered_tracking_df = filtered_tracking_df[
-            filtered_tracking_df['influencer_id'].isin(filtered_influencer_ids)
-        ]
-    
-    # Filter payouts based on the filtered tracking data's influencer_ids
-    # This ensures payouts are only for influencers whose tracking data matches the current filters
-    filtered_payouts_df = current_payouts_df[
-        current_payouts_df['influencer_id'].isin(filtered_tracking_df['influencer_id'].unique())
-    ].copy()
-
-    # --- KPIs ---
-    total_revenue = filtered_tracking_df['revenue'].sum() if not filtered_tracking_df.empty else 0
-    total_orders = filtered_tracking_df['orders'].sum() if not filtered_tracking_df.empty else 0
+# Collapsible sections and whether they start open; the payouts table is the slowest to render
+COLLAPSIBLE_SECTIONS = {'insights': True, 'payouts': False}
+
+def section_is_open(section, toggle_clicks):
+    """Returns whether a collapsible section is open after toggle_clicks clicks on its header."""
+    return COLLAPSIBLE_SECTIONS[section] != bool((toggle_clicks or 0) % 2)
+
+def get_selection(dataset, filters):
+    """Returns (filtered_cells, filtered_payouts_df) for a filter selection, shared by all sections."""
+    @timed_stage('filter')
+    def compute_selection():
+        current_influencers_df, current_posts_df, current_tracking_df, current_payouts_df = dataset.tables()
+
+        # Apply filters through the aggregate cube or the bitmap indexes (see FILTER_ENGINE)
+        filtered_cells = select_cells(dataset, *filters)
+
+        # Filter payouts based on the influencers with tracking data matching the current filters
+        matching_influencers = influencer_mask(filtered_cells['influencer_key'].to_numpy(), len(current_influencers_df))
+        filtered_payouts_df = current_payouts_df[matching_influencers[current_payouts_df['influencer_key'].to_numpy()]]
+        return filtered_cells, filtered_payouts_df
+
+    return selection_cache.get_or_compute((dataset.version,) + tuple(filters), compute_selection)
+
+def compute_section(section, compute, dataset_version, filters, *args, cache=dashboard_cache):
+    """Returns compute(dataset, filters, *args) for a section, memoized in cache."""
+    dataset = dataset_registry.get(dataset_version)
+    def compute_timed():
+        with timed_stage(section):
+            return compute(dataset, filters, *args)
+    return cache.get_or_compute((section, dataset.version) + tuple(filters) + args, compute_timed)
+
+def compute_kpis(dataset, filters):
+    """Computes the formatted KPI cards from the cube and the buyer sketches."""
+    filtered_cells, filtered_payouts_df = get_selection(dataset, filters)
+    total_revenue = filtered_cells['revenue'].sum() if not filtered_cells.empty else 0
+    total_orders = filtered_cells['orders'].sum() if not filtered_cells.empty else 0
     total_payout = filtered_payouts_df['total_payout'].sum() if not filtered_payouts_df.empty else 0
 
     roas = (total_revenue / total_payout) if total_payout > 0 else 0
-    incremental_revenue = total_revenue * 0.7 # Simplified assumption
+    incremental_share = app_config['incremental_share'] # Simplified assumption
+    incremental_revenue = total_revenue * incremental_share
     incremental_roas = (incremental_revenue / total_payout) if total_payout > 0 else 0
 
     # Format KPIs
@@ -410,135 +2992,286 @@ def update_dashboard(selected_brand, selected_product, selected_influencer_categ
     formatted_total_payout = f"${total_payout:,.2f}"
     formatted_roas = f"{roas:.2f}" if roas != 0 else "N/A"
     formatted_incremental_roas = f"{incremental_roas:.2f}" if incremental_roas != 0 else "N/A"
-
-    # --- Charts ---
-    # Revenue Over Time
-    revenue_by_date = filtered_tracking_df.groupby('date')['revenue'].sum().reset_index()
-    revenue_by_date = revenue_by_date.sort_values('date')
-    fig_revenue_over_time = px.line(revenue_by_date, x='date', y='revenue', title='Revenue Over Time',
-                                    labels={'date': 'Date', 'revenue': 'Revenue ($)'},
-                                    color_discrete_sequence=px.colors.qualitative.Plotly)
-    fig_revenue_over_time.update_layout(
-        plot_bgcolor='white', paper_bgcolor='white', font_color='#333',
-        xaxis_title=None, yaxis_title=None, margin=dict(l=20, r=20, t=40, b=20)
-    )
-
-    # Revenue by Platform
-    revenue_by_platform = filtered_tracking_df.groupby('source')['revenue'].sum().reset_index()
-    fig_revenue_by_platform = px.bar(revenue_by_platform, x='source', y='revenue', title='Revenue by Platform',
-                                     labels={'source': 'Platform', 'revenue': 'Revenue ($)'},
-                                     color='source', color_discrete_sequence=px.colors.qualitative.Pastel)
-    fig_revenue_by_platform.update_layout(
-        plot_bgcolor='white', paper_bgcolor='white', font_color='#333',
-        xaxis_title=None, yaxis_title=None, margin=dict(l=20, r=20, t=40, b=20)
+    total_buyers, category_buyers = compute_section('unique_buyers', compute_unique_buyers, dataset.version, filters)
+    formatted_unique_buyers = f"{total_buyers:,.0f}"
+    return (formatted_total_revenue, formatted_total_orders, formatted_total_payout, formatted_roas,
+            formatted_incremental_roas, formatted_unique_buyers)
+
+def compute_kpi_intervals(dataset, filters):
+    """Computes the formatted ROAS and incremental ROAS intervals shown under the KPI cards."""
+    filtered_cells, filtered_payouts_df = get_selection(dataset, filters)
+    total_payout = filtered_payouts_df['total_payout'].sum() if not filtered_payouts_df.empty else 0
+    if filtered_cells.empty or total_payout <= 0 or filtered_cells['revenue'].sum() == 0:
+        return "", "" # The cards show N/A
+    matching, influencer_bounds, total_bounds = compute_section('revenue_intervals', compute_revenue_intervals, dataset.version, filters, cache=table_cache)
+    roas_bounds = total_bounds / total_payout
+    incremental_share = app_config['incremental_share']
+    confidence = f"{app_config['confidence_level']:.0%} CI ({app_config['bootstrap_resamples']:,} resamples)"
+    return (f"{confidence} {roas_bounds[0]:.2f} – {roas_bounds[1]:.2f}",
+            f"{confidence} {roas_bounds[0] * incremental_share:.2f} – {roas_bounds[1] * incremental_share:.2f}")
+
+def compute_revenue_intervals(dataset, filters):
+    """Bootstraps the selection's revenue per influencer and in total over its tracking rows (see revenue_intervals)."""
+    rows = select_tracking_rows(dataset, *filters)
+    tracking_data = dataset.tracking_data
+    return revenue_intervals(tracking_data['influencer_key'].to_numpy()[rows], tracking_data['revenue'].to_numpy()[rows],
+                             len(dataset.influencers), app_config['bootstrap_resamples'], app_config['confidence_level'])
+
+def compute_unique_buyers(dataset, filters):
+    """Estimates the selection's distinct buyers, in total and per category code, from the dense sketches."""
+    category_registers = merge_buyer_registers(dataset, *selected_buyer_cells(dataset, filters))
+    return float(count_dense(category_registers.max(axis=0, initial=0))), count_dense(category_registers)
+
+def compute_influencer_buyers(dataset, filters):
+    """Estimates the selection's distinct buyers per influencer_key, from the per-influencer sketches."""
+    return count_influencer_buyers(dataset, *selected_buyer_cells(dataset, filters))
+
+def compute_daily_revenue(dataset, filters):
+    """Returns the selection's revenue per day as date-sorted (dates, revenue) arrays."""
+    filtered_cells, filtered_payouts_df = get_selection(dataset, filters)
+    revenue_by_date = rollup_cube(filtered_cells, 'date').sort_values('date')
+    return revenue_by_date['date'].to_numpy().astype('datetime64[D]'), revenue_by_date['revenue'].to_numpy()
+
+def compute_time_series(dataset, filters, start=None, end=None):
+    """Returns the Revenue Over Time chart update for the dates in [start, end] (all dates when None)."""
+    dates, revenue = compute_section('daily_revenue', compute_daily_revenue, dataset.version, filters)
+    revenue_by_date, granularity = downsample_time_series(dates, revenue, start, end)
+    patch = trace_patch(np.datetime_as_string(revenue_by_date['date'].to_numpy(), unit='D'), revenue_by_date['revenue'].tolist())
+    patch['layout']['title']['text'] = TIME_SERIES_TITLES[granularity]
+    patch['layout']['uirevision'] = str(filters) # Keep the user's zoom until the filters change
+    if start is None:
+        patch['layout']['xaxis']['autorange'] = True
+    else:
+        patch['layout']['xaxis']['range'] = [str(start), str(end)]
+    return patch
+
+def compute_breakdowns(dataset, filters):
+    """Returns the Revenue by Platform and Revenue by Campaign chart updates."""
+    filtered_cells, filtered_payouts_df = get_selection(dataset, filters)
+    revenue_by_platform = rollup_cube(filtered_cells, 'platform')
+    revenue_by_campaign = rollup_cube(filtered_cells, 'campaign')
+    return (
+        trace_patch(revenue_by_platform['platform'].tolist(), revenue_by_platform['revenue'].tolist(), PLATFORM_COLORS),
+        trace_patch(revenue_by_campaign['campaign'].tolist(), revenue_by_campaign['revenue'].tolist(), CAMPAIGN_COLORS)
     )
 
-    # Revenue by Campaign
-    revenue_by_campaign = filtered_tracking_df.groupby('campaign')['revenue'].sum().reset_index()
-    fig_revenue_by_campaign = px.bar(revenue_by_campaign, x='campaign', y='revenue', title='Revenue by Campaign',
-                                     labels={'campaign': 'Campaign', 'revenue': 'Revenue ($)'},
-                                     color='campaign', color_discrete_sequence=px.colors.qualitative.Set2)
-    fig_revenue_by_campaign.update_layout(
-        plot_bgcolor='white', paper_bgcolor='white', font_color='#333',
-        xaxis_title=None, yaxis_title=None, margin=dict(l=20, r=20, t=40, b=20)
-    )
+def compute_influencer_performance(dataset, filters):
+    """Computes revenue, orders, payout, post reach and ROAS per influencer with matching tracking data."""
+    filtered_cells, filtered_payouts_df = get_selection(dataset, filters)
+    influencer_buyers = compute_section('influencer_buyers', compute_influencer_buyers, dataset.version, filters, cache=table_cache)
+    matching, influencer_bounds, total_bounds = compute_section('revenue_intervals', compute_revenue_intervals, dataset.version, filters, cache=table_cache)
+    return influencer_performance(dataset, filtered_cells, app_config['incremental_share'], influencer_buyers, influencer_bounds)
 
-
-    # --- Influencer Insights ---
-    # Merge dataframes for comprehensive influencer performance
-    influencer_performance_df = filtered_tracking_df.groupby('influencer_id').agg(
-        totalRevenue=('revenue', 'sum'),
-        totalOrders=('orders', 'sum')
-    ).reset_index()
-
-    payouts_agg = filtered_payouts_df.groupby('influencer_id')['total_payout'].sum().reset_index()
-    influencer_performance_df = pd.merge(influencer_performance_df, payouts_agg, on='influencer_id', how='left').fillna(0)
-
-    # Add post metrics (reach, likes, comments)
-    posts_agg = current_posts_df.groupby('influencer_id').agg(
-        totalReach=('reach', 'sum'),
-        totalLikes=('likes', 'sum'),
-        totalComments=('comments', 'sum')
-    ).reset_index()
-    influencer_performance_df = pd.merge(influencer_performance_df, posts_agg, on='influencer_id', how='left').fillna(0)
-
-    # Merge with influencer details (name, category, platform, follower_count)
-    influencer_performance_df = pd.merge(
-        influencer_performance_df,
-        current_influencers_df[['ID', 'name', 'category', 'platform', 'follower_count']],
-        left_on='influencer_id',
-        right_on='ID',
-        how='left'
-    ).drop(columns=['ID'])
-
-    # Calculate ROAS and Incremental ROAS for each influencer
-    influencer_performance_df['roas'] = influencer_performance_df.apply(
-        lambda row: (row['totalRevenue'] / row['total_payout']) if row['total_payout'] > 0 else 0, axis=1
-    )
-    influencer_performance_df['incremental_roas'] = influencer_performance_df.apply(
-        lambda row: (row['totalRevenue'] * 0.7 / row['total_payout']) if row['total_payout'] > 0 else 0, axis=1
-    )
+def compute_influencer_insights(dataset, filters):
+    """Builds the top influencer and persona insight tables."""
+    influencer_performance_df = compute_section('influencer_performance', compute_influencer_performance, dataset.version, filters, cache=table_cache)
 
     # Top 5 Influencers by Revenue
-    top_influencers_revenue = influencer_performance_df.sort_values(by='totalRevenue', ascending=False).head(5)
-    top_influencers_revenue_table = generate_table(top_influencers_revenue[['name', 'totalRevenue', 'totalOrders', 'roas', 'platform']])
+    top_influencers_revenue = top_influencers(influencer_performance_df, 'totalRevenue')
+    top_influencers_revenue_table = generate_table(top_influencers_revenue[['name', 'totalRevenue', 'totalOrders', 'uniqueBuyers', 'roas', 'platform']])
 
-    # Top 5 Influencers by ROAS (only valid ROAS > 0)
-    top_influencers_roas = influencer_performance_df[influencer_performance_df['roas'] > 0].sort_values(by='roas', ascending=False).head(5)
-    top_influencers_roas_table = generate_table(top_influencers_roas[['name', 'roas', 'totalRevenue', 'total_payout', 'platform']])
+    # Top 5 Influencers by ROAS (only valid ROAS > 0), ranked on the interval's lower bound so a few lucky rows do not top the list
+    top_influencers_roas = top_influencers(influencer_performance_df[influencer_performance_df['roas'].to_numpy() > 0], 'roas_low')
+    top_influencers_roas_table = generate_table(top_influencers_roas[['name', 'roas', 'roas_low', 'roas_high', 'totalRevenue', 'total_payout', 'platform']])
 
     # Best Performing Personas (by Avg. ROAS)
-    persona_performance = influencer_performance_df.groupby('category').agg(
-        avg_roas=('roas', lambda x: x[x > 0].mean() if not x[x > 0].empty else 0), # Average of valid ROAS
-        totalRevenue=('totalRevenue', 'sum'),
-        totalPayout=('total_payout', 'sum'),
-        influencerCount=('name', 'count')
-    ).reset_index().sort_values(by='avg_roas', ascending=False)
-    best_personas_table = generate_table(persona_performance)
+    total_buyers, category_buyers = compute_section('unique_buyers', compute_unique_buyers, dataset.version, filters)
+    best_personas_table = generate_table(persona_performance(influencer_performance_df, category_buyers))
 
-    # Poor ROIs (ROAS < 1 and payout > 0)
-    poor_rois = influencer_performance_df[(influencer_performance_df['roas'] < 1) & (influencer_performance_df['total_payout'] > 0)].sort_values(by='roas', ascending=True).head(5)
-    poor_rois_table = generate_table(poor_rois[['name', 'roas', 'totalRevenue', 'total_payout', 'platform']])
+    return top_influencers_revenue_table, top_influencers_roas_table, best_personas_table
 
-    # Payout Tracking Table
-    payouts_table = generate_table(filtered_payouts_df[['influencer_id', 'basis', 'rate', 'orders', 'total_payout']])
+def compute_poor_rois(dataset, filters):
+    """Returns every influencer with ROAS < 1 and a payout, for the paginated Poor ROIs table."""
+    influencer_performance_df = compute_section('influencer_performance', compute_influencer_performance, dataset.version, filters, cache=table_cache)
+    poor_rois = influencer_performance_df[(influencer_performance_df['roas'].to_numpy() < 1) & (influencer_performance_df['total_payout'].to_numpy() > 0)]
+    return poor_rois[['name', 'roas', 'roas_low', 'roas_high', 'incremental_roas', 'totalRevenue', 'total_payout', 'platform']]
 
-    return (
-        formatted_total_revenue,
-        formatted_total_orders,
-        formatted_total_payout,
-        formatted_roas,
-        formatted_incremental_roas,
-        fig_revenue_over_time,
-        fig_revenue_by_platform,
-        fig_revenue_by_campaign,
-        top_influencers_revenue_table,
-        top_influencers_roas_table,
-        best_personas_table,
-        poor_rois_table,
-        payouts_table
-    )
+def compute_payouts(dataset, filters):
+    """Returns the payout rows for the paginated Detailed Payouts table."""
+    filtered_cells, filtered_payouts_df = get_selection(dataset, filters)
+    influencer_ids = dataset.influencers['ID'].to_numpy()[filtered_payouts_df['influencer_key'].to_numpy()]
+    return filtered_payouts_df.assign(influencer_id=influencer_ids)[['influencer_id', 'basis', 'rate', 'orders', 'total_payout']]
+
+@dashboard_callback(
+    [Output('total-revenue', 'children'),
+     Output('total-orders', 'children'),
+     Output('total-payout', 'children'),
+     Output('roas', 'children'),
+     Output('incremental-roas', 'children'),
+     Output('unique-buyers', 'children')],
+    FILTER_INPUTS
+)
+def update_kpis(selected_brand, selected_product, selected_influencer_category, selected_platform, start_date, end_date, dataset_version):
+    filters = (selected_brand, selected_product, selected_influencer_category, selected_platform, start_date, end_date)
+    return compute_section('kpis', compute_kpis, dataset_version, filters)
+
+# The intervals bootstrap the selection's tracking rows, so they get their own callback and the cards do not wait for them
+@dashboard_callback(
+    [Output('roas-interval', 'children'),
+     Output('incremental-roas-interval', 'children')],
+    FILTER_INPUTS
+)
+def update_kpi_intervals(selected_brand, selected_product, selected_influencer_category, selected_platform, start_date, end_date, dataset_version):
+    filters = (selected_brand, selected_product, selected_influencer_category, selected_platform, start_date, end_date)
+    return compute_section('kpi_intervals', compute_kpi_intervals, dataset_version, filters)
 
+@dashboard_callback(
+    Output('revenue-over-time-chart', 'figure'),
+    FILTER_INPUTS + [Input('revenue-over-time-chart', 'relayoutData')]
+)
+def update_time_series(selected_brand, selected_product, selected_influencer_category, selected_platform, start_date, end_date, dataset_version, relayout_data):
+    filters = (selected_brand, selected_product, selected_influencer_category, selected_platform, start_date, end_date)
+    date_range = (None, None) # Filter changes reset the zoom
+    if dash.ctx.triggered_id == 'revenue-over-time-chart':
+        date_range = visible_range(relayout_data)
+        if date_range is None:
+            raise PreventUpdate # A layout change other than zooming
+    return compute_section('time_series', compute_time_series, dataset_version, filters, *date_range)
+
+@dashboard_callback(
+    [Output('revenue-by-platform-chart', 'figure'),
+     Output('revenue-by-campaign-chart', 'figure')],
+    FILTER_INPUTS
+)
+def update_breakdowns(selected_brand, selected_product, selected_influencer_category, selected_platform, start_date, end_date, dataset_version):
+    filters = (selected_brand, selected_product, selected_influencer_category, selected_platform, start_date, end_date)
+    return compute_section('breakdowns', compute_breakdowns, dataset_version, filters)
+
+@dashboard_callback(
+    [Output('top-influencers-revenue-table', 'children'),
+     Output('top-influencers-roas-table', 'children'),
+     Output('best-personas-table', 'children')],
+    FILTER_INPUTS + [Input('insights-toggle', 'n_clicks')]
+)
+def update_influencer_insights(selected_brand, selected_product, selected_influencer_category, selected_platform, start_date, end_date, dataset_version, toggle_clicks):
+    if not section_is_open('insights', toggle_clicks):
+        raise PreventUpdate # Computed when the section is opened
+    filters = (selected_brand, selected_product, selected_influencer_category, selected_platform, start_date, end_date)
+    return compute_section('insights', compute_influencer_insights, dataset_version, filters)
+
+@dashboard_callback(
+    [Output('poor-rois-table', 'children'),
+     Output('poor-rois-page', 'data'),
+     Output('poor-rois-page-info', 'children')],
+    FILTER_INPUTS + [Input('insights-toggle', 'n_clicks'),
+                     Input('poor-rois-sort-by', 'value'),
+                     Input('poor-rois-sort-order', 'value'),
+                     Input('poor-rois-prev', 'n_clicks'),
+                     Input('poor-rois-next', 'n_clicks')],
+    State('poor-rois-page', 'data')
+)
+def update_poor_rois(selected_brand, selected_product, selected_influencer_category, selected_platform, start_date, end_date, dataset_version, toggle_clicks,
+                     sort_by, sort_order, prev_clicks, next_clicks, page):
+    if not section_is_open('insights', toggle_clicks):
+        raise PreventUpdate # Computed when the section is opened
+    filters = (selected_brand, selected_product, selected_influencer_category, selected_platform, start_date, end_date)
+    poor_rois = compute_section('poor_rois', compute_poor_rois, dataset_version, filters, cache=table_cache)
+    table, page, total_rows = render_table_page(poor_rois, sort_by, sort_order == 'asc', turn_page('poor-rois', page))
+    return table, page, describe_page(page, total_rows)
+
+def compute_post_performance(dataset, filters):
+    """Returns the attributed posts of a selection for the paginated Post Performance table."""
+    tracking_rows = select_tracking_rows(dataset, *filters)
+    performance = post_performance(dataset, tracking_rows, app_config['attribution_lookback_days'])
+    return performance.assign(date=performance['date'].dt.strftime('%Y-%m-%d'))[
+        ['name', 'platform', 'date', 'totalRevenue', 'totalOrders', 'roas', 'basis', 'orders', 'total_payout', 'expected_payout', 'payout_gap']]
+
+@dashboard_callback(
+    [Output('payouts-table', 'children'),
+     Output('payouts-page', 'data'),
+     Output('payouts-page-info', 'children')],
+    FILTER_INPUTS + [Input('payouts-toggle', 'n_clicks'),
+                     Input('payouts-sort-by', 'value'),
+                     Input('payouts-sort-order', 'value'),
+                     Input('payouts-prev', 'n_clicks'),
+                     Input('payouts-next', 'n_clicks')],
+    State('payouts-page', 'data')
+)
+def update_payouts(selected_brand, selected_product, selected_influencer_category, selected_platform, start_date, end_date, dataset_version, toggle_clicks,
+                   sort_by, sort_order, prev_clicks, next_clicks, page):
+    if not section_is_open('payouts', toggle_clicks):
+        raise PreventUpdate # Computed when the section is opened
+    filters = (selected_brand, selected_product, selected_influencer_category, selected_platform, start_date, end_date)
+    payouts = compute_section('payouts', compute_payouts, dataset_version, filters, cache=table_cache)
+    table, page, total_rows = render_table_page(payouts, sort_by, sort_order == 'asc', turn_page('payouts', page))
+    return table, page, describe_page(page, total_rows)
+
+@dashboard_callback(
+    [Output('post-performance-table', 'children'),
+     Output('post-performance-page', 'data'),
+     Output('post-performance-page-info', 'children')],
+    FILTER_INPUTS + [Input('payouts-toggle', 'n_clicks'),
+                     Input('post-performance-sort-by', 'value'),
+                     Input('post-performance-sort-order', 'value'),
+                     Input('post-performance-prev', 'n_clicks'),
+                     Input('post-performance-next', 'n_clicks')],
+    State('post-performance-page', 'data')
+)
+def update_post_performance(selected_brand, selected_product, selected_influencer_category, selected_platform, start_date, end_date, dataset_version,
+                            toggle_clicks, sort_by, sort_order, prev_clicks, next_clicks, page):
+    if not section_is_open('payouts', toggle_clicks):
+        raise PreventUpdate # Computed when the section is opened
+    filters = (selected_brand, selected_product, selected_influencer_category, selected_platform, start_date, end_date)
+    performance = compute_section('post_performance', compute_post_performance, dataset_version, filters, cache=table_cache)
+    table, page, total_rows = render_table_page(performance, sort_by, sort_order == 'asc', turn_page('post-performance', page))
+    return table, page, describe_page(page, total_rows)
+
+def compute_scenario_inputs(dataset, filters):
+    """Returns the selection's revenue and payout component totals (see payout_components)."""
+    filtered_cells, filtered_payouts_df = get_selection(dataset, filters)
+    matching_influencers = influencer_mask(filtered_cells['influencer_key'].to_numpy(), len(dataset.influencers))
+    rows = np.flatnonzero(matching_influencers[dataset.payouts['influencer_key'].to_numpy()])
+    return filtered_cells['revenue'].sum(), payout_components(*(values[rows] for values in dataset.payout_inputs)).sum(axis=2)
+
+def compute_payout_scenarios(dataset, filters, post_rate_change, order_rate_change, basis):
+    """Builds the what-if table: the slider scenario and PAYOUT_SCENARIOS against the baseline, for the selection's payouts."""
+    revenue, component_totals = compute_section('scenario_inputs', compute_scenario_inputs, dataset.version, filters)
+    custom = {'name': 'Selected scenario', 'post_rate_change': post_rate_change / 100, 'order_rate_change': order_rate_change / 100,
+              'basis': None if basis == 'current' else basis}
+    kpis = scenario_kpis(revenue, component_totals, [custom] + PAYOUT_SCENARIOS, app_config['incremental_share'])
+    for col in ('payout_delta', 'roas_delta', 'incremental_roas_delta'):
+        kpis[col] = [f"{delta:+,.2f}" for delta in kpis[col]]
+    return generate_table(kpis)
+
+@dashboard_callback(
+    Output('payout-scenarios-table', 'children'),
+    FILTER_INPUTS + [Input('payouts-toggle', 'n_clicks'),
+                     Input('post-rate-change', 'value'),
+                     Input('order-rate-change', 'value'),
+                     Input('scenario-basis', 'value')]
+)
+def update_payout_scenarios(selected_brand, selected_product, selected_influencer_category, selected_platform, start_date, end_date, dataset_version,
+                            toggle_clicks, post_rate_change, order_rate_change, basis):
+    if not section_is_open('payouts', toggle_clicks):
+        raise PreventUpdate # Computed when the section is opened
+    filters = (selected_brand, selected_product, selected_influencer_category, selected_platform, start_date, end_date)
+    return compute_section('payout_scenarios', compute_payout_scenarios, dataset_version, filters, post_rate_change, order_rate_change, basis,
+                           cache=scenario_cache) # Every slider step is a new entry
+
+@dashboard_callback(
+    [Output('insights-content', 'className'),
+     Output('insights-toggle-icon', 'className'),
+     Output('payouts-content', 'className'),
+     Output('payouts-toggle-icon', 'className')],
+    [Input('insights-toggle', 'n_clicks'),
+     Input('payouts-toggle', 'n_clicks')]
+)
+def toggle_sections(insights_clicks, payouts_clicks):
+    """Shows or hides the collapsible sections."""
+    classes = []
+    for section, toggle_clicks in (('insights', insights_clicks), ('payouts', payouts_clicks)):
+        is_open = section_is_open(section, toggle_clicks)
+        classes += ["" if is_open else "hidden", f"fas fa-chevron-{'up' if is_open else 'down'} ml-2 text-gray-500 text-base"]
+    return classes
+
+@timed_stage('render table')
 def generate_table(dataframe):
     """Generates an HTML table from a pandas DataFrame."""
     if dataframe.empty:
         return html.P("No data available for this selection.", className="text-gray-600 text-center py-4")
 
-    # Create a copy to avoid SettingWithCopyWarning
-    df_copy = dataframe.copy()
-
-    # Format currency columns
-    for col in ['totalRevenue', 'total_payout', 'rate']:
-        if col in df_copy.columns:
-            df_copy.loc[:, col] = df_copy[col].apply(lambda x: f"${x:,.2f}")
-    # Format ROAS columns
-    for col in ['roas', 'incremental_roas', 'avg_roas']:
-        if col in df_copy.columns:
-            df_copy.loc[:, col] = df_copy[col].apply(lambda x: f"{x:.2f}" if pd.notna(x) and x != 0 else "N/A")
-    # Format orders
-    for col in ['totalOrders', 'orders', 'follower_count', 'influencerCount', 'totalReach', 'totalLikes', 'totalComments']:
-        if col in df_copy.columns:
-            df_copy.loc[:, col] = df_copy[col].apply(lambda x: f"{int(x):,}" if pd.notna(x) else "N/A")
+    # Format whole columns at once into a new frame (the input is left untouched)
+    df_copy = pd.DataFrame({col: format_column(col, dataframe[col]) for col in dataframe.columns})
 
     return html.Table(
         className="min-w-full divide-y divide-gray-200 rounded-lg overflow-hidden", # Added rounded-lg and overflow-hidden
@@ -551,50 +3284,236 @@ def generate_table(dataframe):
                 className="bg-white divide-y divide-gray-200",
                 children=[
                     html.Tr(
-                        children=[html.Td(row[col], className="px-6 py-4 whitespace-nowrap text-sm text-gray-900") for col in df_copy.columns]
-                    ) for index, row in df_copy.iterrows()
+                        children=[html.Td(value, className="px-6 py-4 whitespace-nowrap text-sm text-gray-900") for value in row]
+                    ) for row in df_copy.to_numpy()
                 ]
             )
         ]
     )
 
-@app.callback(
-    Output("download-dataframe-csv", "data"),
-    Input("export-csv-button", "n_clicks"),
-    [dash.dependencies.State('filtered-tracking-data-store', 'data'),
-     dash.dependencies.State('filtered-payouts-data-store', 'data'),
-     dash.dependencies.State('filtered-influencers-data-store', 'data'),
-     dash.dependencies.State('filtered-posts-data-store', 'data')]
-)
-def export_csv(n_clicks, tracking_data_json, payouts_data_json, influencers_data_json, posts_data_json):
-    if n_clicks > 0:
-        # Convert JSON back to DataFrames
-        tracking_df = pd.DataFrame(tracking_data_json)
-        payouts_df = pd.DataFrame(payouts_data_json)
-        influencers_df = pd.DataFrame(influencers_data_json)
-        posts_df = pd.DataFrame(posts_data_json)
-
-        # Create a dictionary of dataframes to export
-        dfs_to_export = {
-            "tracking_data": tracking_df,
-            "payouts": payouts_df,
-            "influencers": influencers_df,
-            "posts": posts_df
-        }
-
-        # Create a zip file in memory
-        import io
-        import zipfile
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, 'a', zipfile.ZIP_DEFLATED, False) as zip_file:
-            for df_name, df in dfs_to_export.items():
-                csv_buffer = io.StringIO()
-                df.to_csv(csv_buffer, index=False)
-                zip_file.writestr(f"{df_name}.csv", csv_buffer.getvalue())
-        zip_buffer.seek(0)
-
-        return dcc.send_bytes(zip_buffer.read(), "healthkart_influencer_data.zip")
-    return None
+def export_data():
+    """Streams the filtered tables as a zip of CSV or Parquet files."""
+    from flask import request, send_file
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return f"Unknown export format: {export_format}", 400
+    dataset = dataset_registry.get(request.args.get('version', type=int))
+    filters = tuple(request.args.get(dimension, 'All') for dimension in FILTER_DIMENSIONS) + (
+        request.args.get('start_date'), request.args.get('end_date'))
+
+    spooled_zip = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES)
+    write_export(dataset, filters, export_format, spooled_zip)
+    spooled_zip.seek(0)
+    return send_file(spooled_zip, mimetype='application/zip', as_attachment=True,
+                     download_name=f"healthkart_influencer_data_{export_format}.zip")
+
+def download_export(job_id):
+    """Serves the zip written by a finished export job."""
+    from flask import send_file
+    job = job_queue.get(job_id)
+    if job is None or job.kind != 'export' or job.state != 'done':
+        return f"No finished export job {job_id}", 404
+    path, download_name = job.result
+    return send_file(path, mimetype='application/zip', as_attachment=True, download_name=download_name)
+
+def create_app(config=None):
+    """Builds the Dash app; config overrides DEFAULT_CONFIG. Data is loaded on first use unless config['preload']."""
+    global dataset_registry
+    app_config.update(config or {})
+    if app_config['shared_storage']:
+        if not (STORAGE_AVAILABLE and app_config['data_dir']):
+            raise ValueError("shared_storage requires pyarrow and a data_dir")
+        dataset_registry = SharedDatasetRegistry(app_config['data_dir'])
+    if app_config['bootstrap_resamples'] < BOOTSTRAP_MIN_RESAMPLES:
+        raise ValueError(f"bootstrap_resamples must be at least {BOOTSTRAP_MIN_RESAMPLES}")
+    app = dash.Dash(__name__, external_stylesheets=external_stylesheets)
+    with startup_stage('build layout'):
+        app.layout = build_layout(app_config)
+    with startup_stage('register callbacks'):
+        for args, kwargs, func in DASHBOARD_CALLBACKS:
+            app.callback(*args, **kwargs)(func)
+        app.server.add_url_rule('/export', 'export_data', export_data)
+        app.server.add_url_rule('/export/<job_id>', 'download_export', download_export)
+        app.server.add_url_rule('/metrics', 'metrics', metrics_endpoint)
+        app.server.before_request(start_request_trace)
+        app.server.after_request(finish_request_trace)
+    if app_config['preload']:
+        dataset_registry.get().dimensions
+    return app
+
+def create_server(config=None):
+    """Returns the Flask server of create_app(config), for WSGI servers such as gunicorn."""
+    return create_app(config).server
+
+# --- 14. Benchmarks ---
+# run_benchmarks builds a seeded dataset per BENCHMARK_SCALES entry and times each callback path on
+# it: generation, compaction, derived structures, the filter sections over every filter
+# combination, table rendering, figure construction and zip export. Each case records its best
+# wall time, its peak memory traced by tracemalloc (in a separate run, so tracing does not skew the
+# timing) and the JSON bytes it would send to the browser. compare_benchmarks checks the results
+# against a stored baseline file, e.g. to gate dependency upgrades on throughput.
+
+BENCHMARK_SEED = 42
+BENCHMARK_SCALES = OrderedDict([ # generate_mock_data arguments; tracking rows = influencers x posts x entries
+    ('tiny', {'num_influencers': 20, 'num_posts_per_influencer': 5, 'num_tracking_entries_per_post': 3}), # 300 rows
+    ('small', {'num_influencers': 2000, 'num_posts_per_influencer': 5, 'num_tracking_entries_per_post': 3}), # 30k rows
+    ('medium', {'num_influencers': 20000, 'num_posts_per_influencer': 5, 'num_tracking_entries_per_post': 3}), # 300k rows
+    ('large', {'num_influencers': 100000, 'num_posts_per_influencer': 5, 'num_tracking_entries_per_post': 4}) # 2M rows
+])
+BENCHMARK_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json') # Committed for tiny and small
+BENCHMARK_REPEAT = 3 # Timed runs per case; the best one is reported
+BENCHMARK_BASELINE_SCALES = ['tiny', 'small'] # Scales in the committed baseline, run by default
+BENCHMARK_TOLERANCE = 0.2 # Allowed relative increase over the baseline before a case counts as a regression
+BENCHMARK_METRICS = ['seconds', 'peak_bytes', 'payload_bytes']
+BENCHMARK_SLACK = {'seconds': 0.005, 'peak_bytes': 64 * 1024, 'payload_bytes': 0} # Absolute allowance on top, so sub-millisecond cases do not flap
+
+def payload_size(output):
+    """Returns the size in bytes of a callback output serialized the way Dash sends it."""
+    from plotly.io.json import to_json_plotly
+    return len(to_json_plotly(output).encode('utf-8'))
+
+def measure(func, repeat=BENCHMARK_REPEAT):
+    """Runs func() repeat times on a cold dashboard cache and once more under tracemalloc; returns (output, best seconds, peak bytes)."""
+    timings = []
+    for _ in range(repeat):
+        invalidate_caches()
+        started = time.perf_counter()
+        output = func()
+        timings.append(time.perf_counter() - started)
+    invalidate_caches()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return output, min(timings), peak_bytes
+
+def filter_combinations(dataset):
+    """Returns every (brand, product, category, platform) selection of a dataset, 'All' included, without a date range."""
+    values = [['All'] + dataset.dimensions[dimension] for dimension in FILTER_DIMENSIONS]
+    return [combination + (None, None) for combination in itertools.product(*values)]
+
+def benchmark_cases(raw_tables, dataset):
+    """Returns (case, func) pairs for one dataset; each func runs one callback path and returns its payload bytes."""
+    combinations = filter_combinations(dataset)
+    all_filters = ('All',) * len(FILTER_DIMENSIONS) + (None, None)
+
+    def over_combinations(compute):
+        return lambda: sum(payload_size(compute(dataset, filters)) for filters in combinations)
+
+    def export(export_format):
+        def run():
+            with tempfile.TemporaryFile() as fileobj:
+                write_export(dataset, all_filters, export_format, fileobj)
+                return fileobj.tell()
+        return run
+
+    def build(builder, *args):
+        def run():
+            builder(*args)
+            return 0 # Builds send nothing to the browser
+        return run
+
+    tables = (dataset.influencers, dataset.tracking_data)
+    cases = [
+        ('compact schema', build(Dataset.from_frames, 0, *raw_tables)),
+        ('build cube', build(build_cube, *tables)),
+        ('build bitmap index', build(build_bitmap_index, *tables)),
+        ('build influencer totals', build(build_influencer_totals, len(dataset.influencers), dataset.posts, dataset.tracking_data, dataset.payouts)),
+        ('build buyer sketches', build(build_buyer_sketches, *tables)),
+        ('attribute posts', build(attribute_posts, dataset.posts, dataset.tracking_data)),
+        (f'filters: kpis x{len(combinations)}', over_combinations(compute_kpis)),
+        ('kpi intervals: all rows', lambda: payload_size(compute_kpi_intervals(dataset, all_filters))),
+        (f'filters: breakdowns x{len(combinations)}', over_combinations(compute_breakdowns)),
+        (f'filters: time series x{len(combinations)}', over_combinations(compute_time_series)),
+        (f'filters: influencer insights x{len(combinations)}', over_combinations(compute_influencer_insights)),
+        ('render table: payouts page', lambda: payload_size(render_table_page(compute_payouts(dataset, all_filters), 'total_payout', False, 0)[0])),
+        ('render table: post performance page', lambda: payload_size(
+            render_table_page(compute_post_performance(dataset, all_filters), 'totalRevenue', False, 0)[0])),
+        ('render table: poor ROIs page', lambda: payload_size(render_table_page(compute_poor_rois(dataset, all_filters), 'roas', True, 0)[0])),
+        ('build figures', lambda: payload_size(build_charts())),
+        ('export zip: csv', export('csv'))
+    ]
+    if PARQUET_AVAILABLE:
+        cases.append(('export zip: parquet', export('parquet')))
+    return cases
+
+def run_benchmarks(scales=None, repeat=BENCHMARK_REPEAT, seed=BENCHMARK_SEED):
+    """Benchmarks every callback path at each named scale (all of BENCHMARK_SCALES by default); returns one row per case.
+
+    Each scale's dataset is registered in dataset_registry, since the dashboard sections look datasets up there.
+    """
+    rows = []
+    for scale in scales or list(BENCHMARK_SCALES):
+        generation = dict(BENCHMARK_SCALES[scale], seed=seed)
+        raw_tables, seconds, peak_bytes = measure(lambda: generate_mock_data(**generation), repeat)
+        dataset = dataset_registry.get(dataset_registry.put(*raw_tables))
+        tracking_rows = len(dataset.tracking_data)
+        rows.append({'scale': scale, 'tracking_rows': tracking_rows, 'case': 'generate', 'seconds': seconds, 'peak_bytes': peak_bytes,
+                     'payload_bytes': 0})
+        for case, func in benchmark_cases(raw_tables, dataset):
+            payload_bytes, seconds, peak_bytes = measure(func, repeat)
+            rows.append({'scale': scale, 'tracking_rows': tracking_rows, 'case': case, 'seconds': seconds, 'peak_bytes': peak_bytes,
+                         'payload_bytes': int(payload_bytes)})
+    invalidate_caches()
+    return pd.DataFrame(rows)
+
+def save_benchmark_baseline(results, path=BENCHMARK_BASELINE):
+    """Stores benchmark results as the baseline JSON file."""
+    with open(path, 'w') as baseline_file:
+        json.dump(results.to_dict('records'), baseline_file, indent=2)
+
+def compare_benchmarks(results, path=BENCHMARK_BASELINE, tolerance=BENCHMARK_TOLERANCE):
+    """Joins results with the baseline file on (scale, case).
+
+    A case regresses when any metric exceeds its baseline by more than tolerance plus that metric's BENCHMARK_SLACK.
+    A case the baseline does not have is marked missing, and counts as a regression too: it would otherwise pass unchecked.
+    """
+    with open(path) as baseline_file:
+        baseline = pd.DataFrame(json.load(baseline_file))
+    comparison = results.merge(baseline[['scale', 'case'] + BENCHMARK_METRICS], on=['scale', 'case'], how='left', suffixes=('', '_baseline'))
+    regressed = np.zeros(len(comparison), dtype=bool)
+    for metric in BENCHMARK_METRICS:
+        baseline_values = comparison[f'{metric}_baseline'].to_numpy(dtype=np.float64)
+        comparison[f'{metric}_ratio'] = comparison[metric].to_numpy(dtype=np.float64) / np.where(baseline_values > 0, baseline_values, np.nan)
+        regressed |= comparison[metric].to_numpy(dtype=np.float64) > baseline_values * (1 + tolerance) + BENCHMARK_SLACK[metric]
+    comparison['missing'] = comparison[[f'{metric}_baseline' for metric in BENCHMARK_METRICS]].isna().any(axis=1).to_numpy()
+    comparison['regressed'] = regressed | comparison['missing'].to_numpy()
+    return comparison
+
+def benchmark_main(argv):
+    """Command line entry point: python HealthKart.py --benchmark [options]; returns 1 if a case regressed."""
+    import argparse
+    parser = argparse.ArgumentParser(prog='HealthKart.py --benchmark', description="Benchmark the dashboard's callback paths.")
+    parser.add_argument('--benchmark', action='store_true')
+    parser.add_argument('--scales', default=','.join(BENCHMARK_BASELINE_SCALES),
+                        help="Comma-separated names from BENCHMARK_SCALES (default: the scales in the committed baseline)")
+    parser.add_argument('--repeat', type=int, default=BENCHMARK_REPEAT, help="Timed runs per case; the best one is reported")
+    parser.add_argument('--baseline', default=BENCHMARK_BASELINE, help="Baseline JSON file to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="Store the results as the new baseline instead of comparing")
+    parser.add_argument('--tolerance', type=float, default=BENCHMARK_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    app_config['data_dir'] = '' # Benchmarks never touch the stored dataset
+    results = run_benchmarks(args.scales.split(','), args.repeat)
+    if args.save_baseline or not os.path.exists(args.baseline):
+        save_benchmark_baseline(results, args.baseline)
+        print(results.to_string(index=False))
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    comparison = compare_benchmarks(results, args.baseline, args.tolerance)
+    print(comparison[['scale', 'case'] + BENCHMARK_METRICS + [f'{metric}_ratio' for metric in BENCHMARK_METRICS] + ['regressed']].to_string(index=False))
+    missing = comparison[comparison['missing']]
+    if len(missing):
+        print(f"{len(missing)} cases have no baseline in {args.baseline}, e.g. {missing['scale'].iloc[0]}: {missing['case'].iloc[0]}; "
+              "run with --save-baseline to add them")
+    return 1 if comparison['regressed'].any() else 0
+
+STARTUP_TIMINGS['module definitions'] = time.perf_counter() - _plotly_imported
 
 if __name__ == '__main__':
-    app.run_server(host='127.0.0.1', port=8050, debug=True)
+    if '--benchmark' in sys.argv[1:]:
+        sys.exit(benchmark_main(sys.argv[1:]))
+    app = create_app()
+    app.run(host='127.0.0.1', port=8050, debug=True)
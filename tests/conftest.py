@@ -0,0 +1,48 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # HealthKart.py is a top-level module
+
+import HealthKart as hk
+
+BRANDS = ['MuscleBlaze', 'HKVitals', 'Gritzo']
+PRODUCTS = ['Whey', 'Multivitamin', 'Kids Protein', 'Omega 3']
+CATEGORIES = ['Fitness', 'Lifestyle', 'Nutrition']
+PLATFORMS = ['Instagram', 'YouTube', 'Twitter']
+
+def _make_tables(rng, num_influencers=40, num_posts=200, num_events=3000):
+    """Small compact influencers, posts and tracking_data tables with random dates in 2024."""
+    influencers = pd.DataFrame({'category': pd.Categorical(rng.choice(CATEGORIES, num_influencers))})
+    posts = pd.DataFrame({
+        'influencer_key': rng.integers(0, num_influencers, num_posts).astype(np.int32),
+        'platform': pd.Categorical(rng.choice(PLATFORMS, num_posts)),
+        'date': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 120, num_posts), unit='D')
+    })
+    tracking_data = pd.DataFrame({
+        'brand': pd.Categorical(rng.choice(BRANDS, num_events)),
+        'product': pd.Categorical(rng.choice(PRODUCTS, num_events)),
+        'source': pd.Categorical(rng.choice(PLATFORMS[:2], num_events)), # Twitter posts never get events
+        'influencer_key': rng.integers(0, num_influencers, num_events).astype(np.int32),
+        'user_key': rng.integers(0, 5000, num_events).astype(np.int32),
+        'date': pd.Timestamp('2024-01-01') + pd.to_timedelta(np.sort(rng.integers(0, 150, num_events)), unit='D')
+    })
+    return influencers, posts, tracking_data
+
+@pytest.fixture
+def make_tables():
+    """make_tables(rng, num_influencers=40, num_posts=200, num_events=3000) builds small compact tables."""
+    return _make_tables
+
+@pytest.fixture
+def registry(monkeypatch):
+    """A fresh in-memory DatasetRegistry as hk.dataset_registry, without persistence, on cold result caches."""
+    registry = hk.DatasetRegistry()
+    monkeypatch.setattr(hk, 'dataset_registry', registry)
+    monkeypatch.setitem(hk.app_config, 'data_dir', '')
+    hk.invalidate_caches()
+    yield registry
+    hk.invalidate_caches()
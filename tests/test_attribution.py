@@ -0,0 +1,18 @@
+"""Seeded checks of post attribution against pandas merge_asof."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import HealthKart as hk
+
+@pytest.mark.parametrize('lookback_days', [1, 7, 30])
+def test_attribute_posts_matches_merge_asof(make_tables, lookback_days):
+    rng = np.random.default_rng(lookback_days)
+    _, posts, tracking_data = make_tables(rng)
+    events = tracking_data.assign(row=np.arange(len(tracking_data)), platform=tracking_data['source'].astype(str))
+    # Equal post dates sort by row, so merge_asof takes the later posts row, as attribute_posts does
+    candidates = posts.assign(post=np.arange(len(posts)), platform=posts['platform'].astype(str)).sort_values(['date', 'post'])
+    expected = pd.merge_asof(events, candidates[['date', 'influencer_key', 'platform', 'post']], on='date',
+                             by=['influencer_key', 'platform'], tolerance=pd.Timedelta(days=lookback_days - 1))
+    expected = expected.sort_values('row')['post'].fillna(-1).astype(np.int64).to_numpy()
+    assert np.array_equal(hk.attribute_posts(posts, tracking_data, lookback_days), expected)
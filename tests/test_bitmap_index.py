@@ -0,0 +1,34 @@
+"""Seeded checks of the bitmap indexes against boolean masks built with pandas."""
+import numpy as np
+
+import HealthKart as hk
+
+def test_append_bits_matches_concatenated_booleans():
+    rng = np.random.default_rng(1)
+    packed, bits = np.zeros(0, dtype=np.uint8), np.zeros(0, dtype=bool)
+    for size in rng.integers(0, 30, 40): # Batches ending mid-byte carry their partial byte over
+        new_bits = rng.random(size) < 0.5
+        packed = hk._append_bits(packed, len(bits), new_bits)
+        bits = np.concatenate([bits, new_bits])
+        assert len(packed) == (len(bits) + 7) // 8
+        assert np.array_equal(np.unpackbits(packed, count=len(bits)).astype(bool), bits)
+
+def test_bitmap_select_matches_pandas_mask(make_tables):
+    rng = np.random.default_rng(2)
+    influencers, _, tracking_data = make_tables(rng)
+    index = hk.BitmapIndex()
+    for rows in np.array_split(np.arange(len(tracking_data)), [5, 13, 900, 2001]): # Built from uneven batches
+        index = index.append(influencers, tracking_data.iloc[rows].reset_index(drop=True))
+    frame = tracking_data.assign(category=influencers['category'].to_numpy()[tracking_data['influencer_key']])
+    options_by_dimension = [column.cat.categories.tolist() for column in (
+        tracking_data['brand'], tracking_data['product'], influencers['category'], tracking_data['source'])]
+    options_by_dimension[3].append('Twitter') # A platform without tracking rows
+    for _ in range(50):
+        values = [rng.choice(['All'] + options) for options in options_by_dimension]
+        first, stop = np.sort(rng.integers(0, len(tracking_data) + 1, 2))
+        mask = np.zeros(len(frame), dtype=bool)
+        mask[first:stop] = True
+        for column, value in zip(['brand', 'product', 'category', 'source'], values):
+            if value != 'All':
+                mask &= (frame[column] == value).to_numpy()
+        assert np.array_equal(index.select(*values, first=first, stop=stop), np.flatnonzero(mask))
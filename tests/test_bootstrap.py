@@ -0,0 +1,69 @@
+"""Seeded checks of the bootstrap intervals against naive pandas versions and their normal approximation."""
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import HealthKart as hk
+
+def naive_bootstrap_intervals(groups, values, num_groups, resamples, confidence):
+    """Redraws the weights of a single-block, all-resampled bootstrap_sum_intervals from the same seed and sums them with pandas."""
+    rng = np.random.default_rng(hk.BOOTSTRAP_SEED)
+    rng.normal(0, 0, resamples) # No approximated groups
+    counts = np.bincount(groups, minlength=num_groups)
+    nonempty = np.flatnonzero(counts)
+    rank = np.empty(num_groups, dtype=np.int64)
+    rank[nonempty[np.argsort(counts[nonempty], kind='stable')]] = np.arange(len(nonempty))
+    order = np.argsort(rank[groups], kind='stable')
+    weighted = pd.DataFrame(hk.poisson_weights(rng, resamples, len(order)) * values[order], columns=groups[order])
+    sums = weighted.T.groupby(level=0).sum().T
+    tail = (1 - confidence) / 2
+    intervals = sums.quantile([tail, 1 - tail]).reindex(columns=range(num_groups), fill_value=0).to_numpy()
+    return intervals, np.quantile(sums.sum(axis=1), [tail, 1 - tail])
+
+def test_bootstrap_intervals_match_naive():
+    rng = np.random.default_rng(7)
+    groups, values = rng.integers(0, 12, 3000), rng.exponential(100, 3000)
+    groups[groups == 5] = 6 # A group without rows gets (0, 0)
+    intervals, total, num_resampled = hk.bootstrap_sum_intervals(groups, values, 12, resamples=200, confidence=0.9)
+    expected, expected_total = naive_bootstrap_intervals(groups, values, 12, 200, 0.9)
+    assert num_resampled == 11
+    assert np.allclose(intervals, expected) and np.allclose(total, expected_total)
+    assert not intervals[:, 5].any()
+
+def test_bootstrap_blocks_and_draw_budget(monkeypatch):
+    rng = np.random.default_rng(8)
+    groups = np.repeat(np.arange(6), [50, 100, 200, 400, 3000, 20_000])
+    values = rng.exponential(50, len(groups))
+    sums = np.bincount(groups, weights=values)
+    spread = 1.959964 * np.sqrt(np.bincount(groups, weights=values ** 2))
+    monkeypatch.setattr(hk, 'BOOTSTRAP_CHUNK_DRAWS', 2000 * 450) # Blocks of whole groups, at most 450 rows each
+    monkeypatch.setattr(hk, 'BOOTSTRAP_MAX_DRAWS', 2000 * 4000) # The two largest groups use the normal approximation
+    intervals, total, num_resampled = hk.bootstrap_sum_intervals(groups, values, 6, resamples=2000)
+    assert num_resampled == 4
+    assert np.allclose(intervals[:, 4:], [sums[4:] - spread[4:], sums[4:] + spread[4:]])
+    # Resampled groups agree with their normal approximation up to skew and sampling noise
+    assert np.allclose(intervals[:, :4], [sums[:4] - spread[:4], sums[:4] + spread[:4]], rtol=0.1)
+    total_spread = 1.959964 * np.sqrt((values ** 2).sum())
+    assert np.allclose(total, [values.sum() - total_spread, values.sum() + total_spread], rtol=0.01)
+
+def test_poisson_weights_table():
+    frequencies = np.bincount(hk._POISSON_WEIGHTS, minlength=10) / len(hk._POISSON_WEIGHTS)
+    pmf = np.array([math.exp(-1) / math.factorial(k) for k in range(10)])
+    assert np.abs(frequencies - pmf).max() <= 1 / len(hk._POISSON_WEIGHTS)
+
+def test_bootstrap_rejects_too_few_resamples():
+    with pytest.raises(ValueError):
+        hk.bootstrap_sum_intervals(np.zeros(10, dtype=np.int64), np.ones(10), 1, resamples=hk.BOOTSTRAP_MIN_RESAMPLES - 1)
+
+def test_revenue_intervals_are_aligned_on_matching_influencers():
+    rng = np.random.default_rng(9)
+    influencer_keys = rng.choice([2, 3, 7, 11], 5000).astype(np.int32)
+    revenue = rng.exponential(80, 5000).astype(np.float32)
+    matching, intervals, total = hk.revenue_intervals(influencer_keys, revenue, 12, resamples=500)
+    sums = np.bincount(influencer_keys, weights=revenue, minlength=12)
+    assert matching.tolist() == [2, 3, 7, 11]
+    assert intervals.shape == (2, 4)
+    assert np.all((intervals[0] < sums[matching]) & (sums[matching] < intervals[1]))
+    assert total[0] < revenue.sum() < total[1]
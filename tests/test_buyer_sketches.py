@@ -0,0 +1,131 @@
+"""Seeded checks of the HyperLogLog buyer sketches against exact counts and fresh builds."""
+import functools
+
+import numpy as np
+import pandas as pd
+
+import HealthKart as hk
+
+def naive_hll_hash(user_key):
+    """splitmix64 of one key with Python integers; returns its (register, rank)."""
+    mask = (1 << 64) - 1
+    z = (user_key + 0x9E3779B97F4A7C15) & mask
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & mask
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & mask
+    z ^= z >> 31
+    rest_bits = 64 - hk.HLL_PRECISION
+    rest = z & ((1 << rest_bits) - 1)
+    return z >> rest_bits, rest_bits - rest.bit_length() + 1 # Rank: position of the first set bit after the register bits
+
+def test_hll_hash_matches_python_splitmix64():
+    rng = np.random.default_rng(5)
+    user_keys = np.concatenate([np.arange(20), rng.integers(0, 2 ** 31, 2000)]).astype(np.int32)
+    registers, ranks = hk.hll_hash(user_keys)
+    assert list(zip(registers.tolist(), ranks.tolist())) == [naive_hll_hash(int(key)) for key in user_keys]
+
+def test_hll_counts_match_nunique():
+    rng = np.random.default_rng(6)
+    groups = rng.integers(0, 4, 200_000)
+    user_keys = rng.integers(0, 10 ** (2 + groups)) # From about 100 to about 40,000 distinct keys per group
+    exact = pd.Series(user_keys).groupby(groups).nunique().to_numpy()
+
+    registers, ranks = hk.hll_hash(user_keys)
+    dense = np.zeros((4, hk.HLL_REGISTERS), dtype=np.uint8)
+    np.maximum.at(dense, (groups, registers), ranks)
+    order = np.lexsort((registers, groups))
+    sparse = hk.count_sparse(groups[order], registers[order], ranks[order], 4)
+    assert np.allclose(hk.count_dense(dense), sparse) # Same registers, same estimate
+    assert np.all(np.abs(sparse / exact - 1) < 4 * hk.HLL_ERROR)
+
+def skewed_tables(make_tables, rng, num_influencers=40, num_events=60_000):
+    """Tables where influencer 0 has enough buyers per cell for dense sketches and the others stay sparse."""
+    influencers, _, tracking_data = make_tables(rng, num_influencers, num_events=num_events)
+    weights = 1 / np.arange(1, num_influencers + 1) ** 2
+    tracking_data['influencer_key'] = rng.choice(num_influencers, num_events, p=weights / weights.sum()).astype(np.int32)
+    tracking_data['brand'] = pd.Categorical(['MuscleBlaze'] * num_events) # Fewer cells, more buyers per cell
+    tracking_data['user_key'] = rng.integers(0, 50_000, num_events).astype(np.int32)
+    return influencers, tracking_data
+
+def naive_influencer_counts(influencers, tracking_data, sketches, cells):
+    """Estimates distinct buyers per influencer over the rows of the selected sketch cells, from one dense sketch each."""
+    row_cells = pd.MultiIndex.from_frame(sketches.cells).get_indexer(pd.MultiIndex.from_frame(pd.DataFrame({
+        'brand': tracking_data['brand'].array,
+        'product': tracking_data['product'].array,
+        'category': influencers['category'].to_numpy()[tracking_data['influencer_key']],
+        'platform': tracking_data['source'].array,
+        'month': tracking_data['date'].to_numpy().astype('datetime64[M]').astype('datetime64[ns]')
+    })))
+    rows = cells[row_cells]
+    registers, ranks = hk.hll_hash(tracking_data['user_key'].to_numpy()[rows])
+    dense = np.zeros((len(influencers), hk.HLL_REGISTERS), dtype=np.uint8)
+    np.maximum.at(dense, (tracking_data['influencer_key'].to_numpy()[rows], registers), ranks)
+    return hk.count_dense(dense)
+
+def test_count_influencers_matches_dense_counts(make_tables):
+    rng = np.random.default_rng(9)
+    influencers, tracking_data = skewed_tables(make_tables, rng)
+    sketches = hk.BuyerSketches.build(influencers, tracking_data)
+    assert len(sketches.sketch_cells) and len(sketches.entry_cells) # Both representations are exercised
+    for _ in range(5):
+        cells = rng.random(len(sketches.cells)) < 0.5
+        expected = naive_influencer_counts(influencers, tracking_data, sketches, cells)
+        assert np.allclose(sketches.count_influencers(cells, len(influencers)), expected)
+
+def test_count_influencers_adds_extra_rows(make_tables):
+    rng = np.random.default_rng(10)
+    influencers, tracking_data = skewed_tables(make_tables, rng)
+    first_rows = tracking_data.iloc[:40_000].reset_index(drop=True)
+    extra = tracking_data.iloc[40_000:].reset_index(drop=True)
+    sketches = hk.BuyerSketches.build(influencers, first_rows)
+    counts = sketches.count_influencers(np.ones(len(sketches.cells), dtype=bool), len(influencers),
+                                        extra['influencer_key'].to_numpy(), extra['user_key'].to_numpy())
+    full = hk.BuyerSketches.build(influencers, tracking_data)
+    assert np.allclose(counts, full.count_influencers(np.ones(len(full.cells), dtype=bool), len(influencers)))
+
+def test_merged_sketches_match_fresh_build(make_tables):
+    rng = np.random.default_rng(11)
+    influencers, tracking_data = skewed_tables(make_tables, rng)
+    batches = np.array_split(np.arange(len(tracking_data)), [7, 20_000, 20_100, 45_000])
+    merged = functools.reduce(hk.BuyerSketches.merge, [
+        hk.BuyerSketches.build(influencers, tracking_data.iloc[rows].reset_index(drop=True)) for rows in batches])
+    fresh = hk.BuyerSketches.build(influencers, tracking_data)
+
+    # Cells are numbered differently; align the merged ones on the fresh ones
+    positions = pd.MultiIndex.from_frame(merged.cells).get_indexer(pd.MultiIndex.from_frame(fresh.cells))
+    assert len(merged.cells) == len(fresh.cells) and (positions >= 0).all()
+    assert np.array_equal(merged.registers[positions], fresh.registers)
+    for _ in range(5):
+        cells = rng.random(len(fresh.cells)) < 0.5
+        merged_cells = np.zeros(len(merged.cells), dtype=bool)
+        merged_cells[positions] = cells
+        assert np.array_equal(merged.count_influencers(merged_cells, len(influencers)), fresh.count_influencers(cells, len(influencers)))
+
+def sketch_registers(entries, sketches, span):
+    """Returns {(cell, influencer): dense registers} from sparse entries and dense rows."""
+    result = {}
+    for cell, influencer, register, rank in zip(*entries):
+        registers = result.setdefault((int(cell), int(influencer)), np.zeros(hk.HLL_REGISTERS, dtype=np.uint8))
+        registers[register] = max(registers[register], rank)
+    for cell, influencer, row in zip(*sketches):
+        registers = result.setdefault((int(cell), int(influencer)), np.zeros(hk.HLL_REGISTERS, dtype=np.uint8))
+        np.maximum(registers, row, out=registers)
+    return result
+
+def test_densify_moves_large_and_dense_sketches():
+    rng = np.random.default_rng(12)
+    span = 4
+    # (cell, influencer): (0, 1) overflows, (0, 2) already has a dense row, (1, 1) stays sparse
+    runs = [(0, 1, hk.HLL_SPARSE_MAX + 1), (0, 2, 10), (1, 1, hk.HLL_SPARSE_MAX)]
+    entries = [np.concatenate(parts) for parts in zip(*[
+        (np.full(size, cell, dtype=np.int32), np.full(size, influencer, dtype=np.int32),
+         np.sort(rng.choice(hk.HLL_REGISTERS, size, replace=False)).astype(np.uint16), rng.integers(1, 20, size).astype(np.uint8))
+        for cell, influencer, size in runs])]
+    sketches = (np.array([0, 1], dtype=np.int32), np.array([2, 3], dtype=np.int32),
+                rng.integers(0, 5, (2, hk.HLL_REGISTERS)).astype(np.uint8))
+    new_entries, new_sketches = hk._densify(tuple(entries), sketches, span)
+
+    assert set(zip(new_entries[0].tolist(), new_entries[1].tolist())) == {(1, 1)}
+    assert list(zip(new_sketches[0].tolist(), new_sketches[1].tolist())) == [(0, 1), (0, 2), (1, 3)] # Still sorted
+    before, after = sketch_registers(entries, sketches, span), sketch_registers(new_entries, new_sketches, span)
+    assert before.keys() == after.keys()
+    assert all(np.array_equal(before[key], after[key]) for key in before)
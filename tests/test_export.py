@@ -0,0 +1,83 @@
+"""Checks of the filtered zip export against filtering the generator's string-schema tables with pandas."""
+import io
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import HealthKart as hk
+
+@pytest.fixture(scope='module')
+def raw_tables():
+    return hk.generate_mock_data(30, 4, 3, seed=14)
+
+@pytest.fixture(scope='module')
+def dataset(raw_tables):
+    return hk.Dataset.from_frames(1, *raw_tables)
+
+def read_export(data, export_format):
+    """Reads every table of an export zip back as string columns."""
+    with zipfile.ZipFile(io.BytesIO(data)) as zip_file:
+        assert sorted(zip_file.namelist()) == sorted(f'{table_name}.{export_format}' for table_name in hk.EXPORT_TABLES)
+        tables = {}
+        for table_name in hk.EXPORT_TABLES:
+            with zip_file.open(f'{table_name}.{export_format}') as entry:
+                if export_format == 'csv':
+                    tables[table_name] = pd.read_csv(entry, dtype=str, keep_default_na=False)
+                else:
+                    tables[table_name] = pd.read_parquet(io.BytesIO(entry.read())).astype(str)
+        return tables
+
+def expected_tracking(raw_tables, filters):
+    """The selection's tracking rows, filtered with pandas on the string schema."""
+    influencers, _, tracking_data, _ = raw_tables
+    brand, product, category, platform, start_date, end_date = filters
+    category_by_id = dict(zip(influencers['ID'], influencers['category']))
+    mask = np.ones(len(tracking_data), dtype=bool)
+    for column, value in (('brand', brand), ('product', product), ('source', platform)):
+        if value != 'All':
+            mask &= (tracking_data[column] == value).to_numpy()
+    if category != 'All':
+        mask &= (tracking_data['influencer_id'].map(category_by_id) == category).to_numpy()
+    if start_date is not None:
+        mask &= (tracking_data['date'] >= start_date).to_numpy() & (tracking_data['date'] <= end_date).to_numpy()
+    return tracking_data[mask]
+
+def sorted_strings(df):
+    return df.astype(str).sort_values(list(df.columns)).reset_index(drop=True)
+
+@pytest.mark.parametrize('filters', [
+    ('All', 'All', 'All', 'All', None, None),
+    ('MuscleBlaze', 'All', 'All', 'Instagram', None, None),
+    ('All', 'All', 'Fitness', 'All', '2024-03-01', '2024-08-31')
+])
+@pytest.mark.parametrize('export_format', ['csv', pytest.param('parquet', marks=pytest.mark.skipif(
+    not hk.PARQUET_AVAILABLE, reason="Parquet export requires pyarrow"))])
+def test_write_export_matches_pandas_filter(raw_tables, dataset, filters, export_format):
+    fileobj = io.BytesIO()
+    progress = []
+    hk.write_export(dataset, filters, export_format, fileobj, lambda fraction, message: progress.append(fraction))
+    tables = read_export(fileobj.getvalue(), export_format)
+    assert progress == [i / len(hk.EXPORT_TABLES) for i in range(len(hk.EXPORT_TABLES))]
+
+    tracking = expected_tracking(raw_tables, filters)
+    assert sorted_strings(tables['tracking_data']).equals(sorted_strings(tracking[hk.STRING_SCHEMA_COLUMNS['tracking_data']]))
+    influencers, _, _, payouts = raw_tables
+    matching = set(tracking['influencer_id'])
+    assert set(tables['influencers']['ID']) == matching
+    assert sorted_strings(tables['payouts']).equals(sorted_strings(payouts[payouts['influencer_id'].isin(matching)].fillna('')))
+    assert set(tables['posts']['influencer_id']) <= matching
+
+def test_iter_export_chunks_splits_the_selected_rows(dataset):
+    rows = np.flatnonzero(np.arange(len(dataset.tracking_data)) % 3 == 0)
+    chunks = list(hk.iter_export_chunks(dataset, 'tracking_data', rows, chunk_rows=7))
+    assert [len(chunk) for chunk in chunks[:-1]] == [7] * (len(chunks) - 1) and 0 < len(chunks[-1]) <= 7
+    whole = dataset.decode('tracking_data', dataset.tracking_data.iloc[rows])
+    assert pd.concat(chunks, ignore_index=True).equals(whole.reset_index(drop=True))
+    assert [len(chunk) for chunk in hk.iter_export_chunks(dataset, 'tracking_data', rows[:0])] == [0] # Still one (empty) chunk
+
+def test_write_export_rejects_parquet_without_pyarrow(dataset, monkeypatch):
+    monkeypatch.setattr(hk, 'PARQUET_AVAILABLE', False)
+    with pytest.raises(ValueError):
+        hk.write_export(dataset, ('All',) * 4 + (None, None), 'parquet', io.BytesIO())
@@ -0,0 +1,89 @@
+"""Checks that appended datasets, and the derived structures extended with each batch, match a dataset built fresh."""
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import HealthKart as hk
+
+def make_batch(seed, days_earlier=0):
+    """A batch of new influencers with their posts, tracking data and payouts, optionally dated before the existing rows."""
+    batch = list(hk.generate_mock_data(5, 3, 4, seed=seed))
+    if days_earlier:
+        batch[2] = batch[2].assign(date=(pd.to_datetime(batch[2]['date']) - pd.Timedelta(days=days_earlier)).dt.strftime('%Y-%m-%d'))
+    return batch
+
+def comparable(df):
+    """df with categoricals as strings, since appends merge categories in a different order than a fresh build."""
+    return df.astype({col: str for col in df.select_dtypes('category').columns})
+
+@pytest.fixture
+def appended_and_fresh(registry):
+    """(appended dataset, the same rows registered fresh), after four appends, two of them dated before earlier rows."""
+    base = hk.generate_mock_data(40, 4, 3, seed=15)
+    base_dataset = registry.get(registry.put(*base))
+    for name in ('cube', 'bitmap_index', 'influencer_totals', 'buyer_sketches'): # Built, so appends extend them
+        getattr(base_dataset, name)
+    batches = [make_batch(16), make_batch(17, days_earlier=90), make_batch(18), make_batch(19, days_earlier=200)]
+    for batch in batches:
+        version = hk.append_batch(*batch)
+    appended = registry.get(version)
+    fresh = registry.get(registry.put(*(pd.concat(tables, ignore_index=True) for tables in zip(base, *batches))))
+    return appended, fresh
+
+def test_appended_tables_match_fresh_build(appended_and_fresh):
+    appended, fresh = appended_and_fresh
+    for table_name in hk.TABLE_NAMES:
+        assert comparable(getattr(appended, table_name)).equals(comparable(getattr(fresh, table_name)))
+    assert appended.user_ids.equals(fresh.user_ids)
+    assert comparable(appended.cube).equals(comparable(fresh.cube))
+    assert set(appended._derived) >= {'cube', 'influencer_totals', 'buyer_sketches'} # Extended, not rebuilt
+    # Lookups extended per batch map every ID to its key
+    assert np.array_equal(appended.user_lookup.get_indexer(fresh.user_ids), np.arange(len(fresh.user_ids)))
+    assert np.array_equal(appended.influencer_lookup.get_indexer(fresh.influencers['ID']), np.arange(len(fresh.influencers)))
+
+def test_appended_sections_match_fresh_build(appended_and_fresh):
+    appended, fresh = appended_and_fresh
+    values = [['All'] + fresh.dimensions[dimension] for dimension in hk.FILTER_DIMENSIONS]
+    date_ranges = [(None, None), ('2024-02-01', '2024-05-31'), ('2024-07-15', '2024-07-15')]
+    for combination in itertools.islice(itertools.product(*values), 0, None, 37):
+        for date_range in date_ranges:
+            filters = combination + date_range
+            for compute in (hk.compute_kpis, hk.compute_kpi_intervals, hk.compute_breakdowns, hk.compute_influencer_insights):
+                assert str(compute(appended, filters)) == str(compute(fresh, filters)), (compute.__name__, filters)
+
+@pytest.mark.parametrize('batch_tables, message', [
+    (lambda base, batch: (base[0].iloc[:1], None, None, None), 'repeats'), # An existing influencer ID
+    (lambda base, batch: (pd.concat([batch[0], batch[0].iloc[:1]]), None, None, None), 'repeats'), # A duplicate within the batch
+    (lambda base, batch: (None, None, batch[2], None), 'unknown influencer'), # Tracking rows of influencers not in the dataset
+    (lambda base, batch: (None, None, None, batch[3].assign(influencer_id=base[0]['ID'].iloc[0])), 'unknown post')
+])
+def test_append_rejects_invalid_batches(registry, batch_tables, message):
+    base = hk.generate_mock_data(10, 2, 2, seed=20)
+    version = registry.put(*base)
+    with pytest.raises(ValueError, match=message):
+        hk.append_batch(*batch_tables(base, make_batch(21)))
+    assert registry.latest_version == version
+
+def test_key_lookup_extends_in_few_layers():
+    rng = np.random.default_rng(22)
+    lookup, ids = hk.KeyLookup(), []
+    for size in rng.integers(1, 200, 300):
+        new_ids = [f'id-{len(ids) + i}' for i in range(size)]
+        lookup = lookup.extended(new_ids)
+        ids += new_ids
+        assert len(lookup.layers) <= 2 * np.log2(len(ids)) + 2
+    assert len(lookup) == len(ids)
+    assert lookup.ids().tolist() == ids
+    assert lookup.ids(len(ids) - 5).tolist() == ids[-5:]
+    queries = rng.choice(ids, 1000).tolist() + ['missing']
+    assert lookup.get_indexer(queries).tolist() == [int(query[3:]) for query in queries[:-1]] + [-1]
+
+def test_merge_by_date_matches_stable_sort():
+    rng = np.random.default_rng(23)
+    dates = lambda size: pd.Timestamp('2024-01-01') + pd.to_timedelta(np.sort(rng.integers(0, 30, size)), unit='D')
+    old = pd.DataFrame({'date': dates(500), 'row': np.arange(500)})
+    new = pd.DataFrame({'date': dates(80), 'row': np.arange(500, 580)})
+    expected = pd.concat([old, new], ignore_index=True).sort_values('date', kind='stable', ignore_index=True)
+    assert hk.merge_by_date(old, new).equals(expected)
@@ -0,0 +1,86 @@
+"""Checks of the background job queue: progress, failures, history pruning and records shared between workers."""
+import os
+import time
+
+import pytest
+
+import HealthKart as hk
+
+def wait(queue, job_id, timeout=60):
+    """Polls a job until it finishes; returns it."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job is not None and job.finished:
+            return job
+        time.sleep(0.01)
+    raise TimeoutError(job_id)
+
+def steps(job, values):
+    for number, value in enumerate(values):
+        job.update(number / len(values), f"Step {number}")
+    return sum(values)
+
+def fails(job):
+    job.update(0.5, "Halfway")
+    raise ValueError("bad batch")
+
+@pytest.fixture
+def queue(monkeypatch):
+    monkeypatch.setitem(hk.app_config, 'data_dir', '')
+    monkeypatch.setitem(hk.app_config, 'job_workers', 0)
+    queue = hk.JobQueue(max_history=3)
+    yield queue
+    queue.shutdown()
+
+def test_jobs_run_in_order_and_report_results(queue):
+    job_ids = [queue.submit('sum', steps, [number, 1, 2]) for number in range(3)]
+    jobs = [wait(queue, job_id) for job_id in job_ids]
+    assert [(job.state, job.result, job.progress, job.message) for job in jobs] == [('done', number + 3, 1.0, "Done") for number in range(3)]
+
+def test_failed_jobs_record_the_error(queue):
+    job = wait(queue, queue.submit('fail', fails))
+    assert (job.state, job.error, job.message, job.result) == ('failed', "ValueError: bad batch", "Failed", None)
+
+def test_history_drops_the_oldest_finished_jobs_and_their_files(queue, tmp_path):
+    paths = []
+    def with_file(job, number):
+        path = tmp_path / f'{number}.zip'
+        path.write_bytes(b'zip')
+        job.files.append(str(path))
+        paths.append(path)
+    job_ids = [queue.submit('export', with_file, number) for number in range(3)]
+    for job_id in job_ids:
+        wait(queue, job_id)
+    wait(queue, queue.submit('export', with_file, 3)) # The fourth pushes the first out
+    assert queue.get(job_ids[0]) is None and not paths[0].exists()
+    assert all(queue.get(job_id) is not None for job_id in job_ids[1:]) and all(path.exists() for path in paths[1:])
+
+def test_jobs_are_shared_through_records_in_the_data_dir(monkeypatch, tmp_path):
+    monkeypatch.setitem(hk.app_config, 'data_dir', str(tmp_path))
+    monkeypatch.setitem(hk.app_config, 'job_workers', 0)
+    worker, other_worker = hk.JobQueue(max_history=2), hk.JobQueue(max_history=2)
+    try:
+        job_id = worker.submit('sum', steps, [1, 2])
+        job = wait(other_worker, job_id) # Read from jobs/<id>.json, not from the queue that ran it
+        assert (job.kind, job.state, job.result) == ('sum', 'done', 3)
+        assert os.path.exists(tmp_path / 'jobs' / f'{job_id}.json')
+        assert other_worker.get('../jobs') is None and other_worker.get('missing') is None
+
+        for values in ([1], [2], [3]): # Either worker's submissions prune the shared records
+            wait(worker, other_worker.submit('sum', steps, values))
+        assert worker.get(job_id) is None
+        assert len(os.listdir(tmp_path / 'jobs')) == 2
+    finally:
+        worker.shutdown()
+        other_worker.shutdown()
+
+def test_run_in_process_uses_the_job_processes(monkeypatch):
+    monkeypatch.setitem(hk.app_config, 'data_dir', '')
+    monkeypatch.setitem(hk.app_config, 'job_workers', 1)
+    queue = hk.JobQueue()
+    try:
+        job = wait(queue, queue.submit('pid', lambda job: job.run_in_process(os.getpid)))
+        assert job.state == 'done' and job.result != os.getpid()
+    finally:
+        queue.shutdown()
@@ -0,0 +1,74 @@
+"""Checks of the runtime metrics histograms: bucketing, quantile estimates and the Prometheus text format."""
+import threading
+
+import numpy as np
+import pytest
+
+import HealthKart as hk
+
+def make_histogram():
+    return hk.Histogram('test_seconds', "Test latencies.", 'callback', (0.1, 0.2, 0.4, 0.8))
+
+def test_observe_counts_per_bucket_with_inclusive_upper_bounds():
+    histogram = make_histogram()
+    for value in (0.05, 0.1, 0.15, 0.4, 0.5, 3.0):
+        histogram.observe('kpis', value)
+    histogram.observe('charts', 0.3)
+    cumulative, total, count = histogram.snapshot()['kpis']
+    assert cumulative == [2, 3, 4, 5, 6] # le=0.1 holds 0.1 itself; +Inf last
+    assert total == pytest.approx(4.2) and count == 6
+    assert histogram.snapshot()['charts'] == ([0, 0, 1, 1, 1], pytest.approx(0.3), 1)
+
+def test_quantile_interpolates_within_buckets_like_histogram_quantile():
+    histogram = make_histogram()
+    for value in [0.05] * 10 + [0.15] * 10 + [0.3] * 20:
+        histogram.observe('kpis', value)
+    cumulative, _, count = histogram.snapshot()['kpis']
+    assert histogram.quantile(cumulative, count, 0.25) == pytest.approx(0.1) # Rank 10: the top of the first bucket
+    assert histogram.quantile(cumulative, count, 0.375) == pytest.approx(0.15) # Halfway through (0.1, 0.2]
+    assert histogram.quantile(cumulative, count, 0.75) == pytest.approx(0.3) # Halfway through (0.2, 0.4]
+    histogram.observe('slow', 5.0)
+    cumulative, _, count = histogram.snapshot()['slow']
+    assert histogram.quantile(cumulative, count, 0.99) == 0.8 # Above the largest finite bound
+
+def test_quantile_estimates_track_exact_quantiles():
+    rng = np.random.default_rng(38)
+    histogram = hk.Histogram('test_seconds', "Test latencies.", 'callback', hk.LATENCY_BUCKETS)
+    values = rng.lognormal(-4, 1, 20_000)
+    for value in values:
+        histogram.observe('kpis', value)
+    cumulative, _, count = histogram.snapshot()['kpis']
+    for q in (0.5, 0.9, 0.99):
+        position = np.searchsorted(hk.LATENCY_BUCKETS, np.quantile(values, q))
+        lower = hk.LATENCY_BUCKETS[position - 1] if position else 0.0
+        assert lower <= histogram.quantile(cumulative, count, q) <= hk.LATENCY_BUCKETS[position] # Same bucket as the exact quantile
+
+def test_render_uses_the_prometheus_text_format():
+    histogram = make_histogram()
+    histogram.observe('kpis', 0.15)
+    histogram.observe('kpis', 1.5)
+    assert histogram.render().splitlines() == [
+        "# HELP test_seconds Test latencies.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{callback="kpis",le="0.1"} 0',
+        'test_seconds_bucket{callback="kpis",le="0.2"} 1',
+        'test_seconds_bucket{callback="kpis",le="0.4"} 1',
+        'test_seconds_bucket{callback="kpis",le="0.8"} 1',
+        'test_seconds_bucket{callback="kpis",le="+Inf"} 2',
+        'test_seconds_sum{callback="kpis"} 1.65',
+        'test_seconds_count{callback="kpis"} 2'
+    ]
+
+def test_observe_is_consistent_under_concurrent_use():
+    histogram = make_histogram()
+    def worker(seed):
+        for value in np.random.default_rng(seed).random(2000):
+            histogram.observe(f'series-{seed % 2}', value)
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    snapshot = histogram.snapshot()
+    assert [snapshot[f'series-{number}'][2] for number in range(2)] == [8000, 8000]
+    assert all(cumulative[-1] == count for cumulative, _, count in snapshot.values())
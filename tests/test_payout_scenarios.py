@@ -0,0 +1,54 @@
+"""Checks of the what-if payout scenarios against recomputing every payout row in plain Python."""
+import numpy as np
+import pytest
+
+import HealthKart as hk
+
+def naive_payout(basis_is_post, rate, orders, scenario, mean_post_rate, mean_order_rate):
+    """One row's total_payout under a scenario."""
+    post_change, order_change = 1 + scenario.get('post_rate_change', 0), 1 + scenario.get('order_rate_change', 0)
+    basis = scenario.get('basis')
+    if basis == 'post':
+        return (rate if basis_is_post else mean_post_rate) * post_change
+    if basis == 'order':
+        return orders * (mean_order_rate if basis_is_post else rate) * order_change
+    return rate * post_change if basis_is_post else orders * rate * order_change
+
+@pytest.fixture
+def payout_rows():
+    rng = np.random.default_rng(37)
+    num_rows = 300
+    return rng.random(num_rows) < 0.4, rng.uniform(5, 5000, num_rows), rng.integers(0, 80, num_rows).astype(np.float64)
+
+SCENARIOS = hk.PAYOUT_SCENARIOS + [
+    {'name': 'Both rates', 'post_rate_change': 0.35, 'order_rate_change': -0.5},
+    {'name': 'Per-post, cheaper', 'basis': 'post', 'post_rate_change': -0.1},
+    {'name': 'Per-order, dearer', 'basis': 'order', 'order_rate_change': 0.25}
+]
+
+def test_scenario_payouts_match_naive(payout_rows):
+    basis_is_post, rate, orders = payout_rows
+    means = rate[basis_is_post].mean(), rate[~basis_is_post].mean()
+    expected = [[naive_payout(*row, scenario, *means) for row in zip(basis_is_post, rate, orders)] for scenario in SCENARIOS]
+    assert np.allclose(hk.scenario_payouts(basis_is_post, rate, orders, SCENARIOS), expected)
+
+def test_scenario_kpis_match_naive(payout_rows):
+    basis_is_post, rate, orders = payout_rows
+    revenue = 2_500_000.0
+    selection = np.arange(0, 300, 2) # Component totals are summed over a selection's rows
+    component_totals = hk.payout_components(basis_is_post, rate, orders)[:, :, selection].sum(axis=2)
+    kpis = hk.scenario_kpis(revenue, component_totals, SCENARIOS, incremental_share=0.6)
+
+    means = rate[basis_is_post].mean(), rate[~basis_is_post].mean() # Mean rates are taken over all rows
+    totals = np.array([sum(naive_payout(basis_is_post[i], rate[i], orders[i], scenario, *means) for i in selection)
+                       for scenario in [hk.BASELINE_SCENARIO] + SCENARIOS])
+    assert kpis['scenario'].tolist() == ['Baseline'] + [scenario['name'] for scenario in SCENARIOS]
+    assert np.allclose(kpis['total_payout'], totals)
+    assert np.allclose(kpis['payout_delta'], totals - totals[0])
+    assert np.allclose(kpis['roas'], revenue / totals)
+    assert np.allclose(kpis['incremental_roas'], 0.6 * revenue / totals)
+    assert np.allclose(kpis['roas_delta'], revenue / totals - revenue / totals[0])
+
+def test_scenario_kpis_without_payouts_report_zero_roas():
+    kpis = hk.scenario_kpis(1000.0, np.zeros((len(hk.SCENARIO_BASES), 2)), hk.PAYOUT_SCENARIOS)
+    assert (kpis['total_payout'] == 0).all() and (kpis['roas'] == 0).all() and (kpis['incremental_roas'] == 0).all()
@@ -0,0 +1,55 @@
+"""Checks of the memoized result caches: hits and misses, LRU eviction by entries and by bytes."""
+import threading
+
+import numpy as np
+
+import HealthKart as hk
+
+def test_result_cache_memoizes_and_counts():
+    cache = hk.ResultCache(max_entries=4)
+    calls = []
+    compute = lambda: calls.append(1) or len(calls)
+    assert cache.get_or_compute('a', compute) == 1
+    assert cache.get_or_compute('a', compute) == 1
+    assert cache.get_or_compute('b', compute) == 2
+    assert len(calls) == 2
+    assert cache.stats() == {'hits': 1, 'misses': 2, 'entries': 2, 'max_entries': 4, 'bytes': 0, 'max_bytes': None}
+
+def test_result_cache_evicts_least_recently_used():
+    cache = hk.ResultCache(max_entries=2)
+    cache.get_or_compute('a', lambda: 'a')
+    cache.get_or_compute('b', lambda: 'b')
+    cache.get_or_compute('a', lambda: 'recomputed') # a is now the most recently used
+    cache.get_or_compute('c', lambda: 'c')
+    assert cache.get_or_compute('a', lambda: 'recomputed') == 'a'
+    assert cache.get_or_compute('b', lambda: 'recomputed') == 'recomputed'
+
+def test_result_cache_bounds_bytes_but_keeps_the_newest_entry():
+    cache = hk.ResultCache(max_entries=100, max_bytes=1000, sizeof=hk.result_bytes)
+    for key in range(5):
+        cache.get_or_compute(key, lambda: np.zeros(40)) # 320 bytes each
+    assert cache.stats()['entries'] == 3 and cache.total_bytes == 960
+    cache.get_or_compute('large', lambda: (np.zeros(1000), 'label'))
+    assert cache.stats()['entries'] == 1 and cache.total_bytes == 8000
+
+def test_result_cache_invalidate_drops_everything():
+    cache = hk.ResultCache(max_bytes=10_000, sizeof=hk.result_bytes)
+    cache.get_or_compute('a', lambda: np.zeros(10))
+    cache.invalidate()
+    assert cache.stats()['entries'] == 0 and cache.total_bytes == 0
+    assert cache.get_or_compute('a', lambda: 'recomputed') == 'recomputed'
+
+def test_result_cache_is_consistent_under_concurrent_use():
+    cache = hk.ResultCache(max_entries=8, max_bytes=50 * 80, sizeof=hk.result_bytes)
+    def worker(seed):
+        rng = np.random.default_rng(seed)
+        for key in rng.integers(0, 20, 300):
+            assert cache.get_or_compute(int(key), lambda: np.full(10, key, dtype=np.float64))[0] == key
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = cache.stats()
+    assert stats['hits'] + stats['misses'] == 8 * 300
+    assert stats['entries'] <= 8 and stats['bytes'] == 80 * stats['entries']
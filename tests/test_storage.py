@@ -0,0 +1,57 @@
+"""Round trips of published generations, with and without appended segments, through save_dataset and load_dataset."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import HealthKart as hk
+
+feather = pytest.importorskip('pyarrow.feather')
+
+def comparable(df):
+    """df with categoricals as strings, since segments merge categories in a different order than in memory."""
+    return df.astype({col: str for col in df.select_dtypes('category').columns})
+
+def make_batch(seed, days_earlier=0):
+    batch = list(hk.generate_mock_data(3, 2, 3, seed=seed))
+    if days_earlier:
+        batch[2] = batch[2].assign(date=(pd.to_datetime(batch[2]['date']) - pd.Timedelta(days=days_earlier)).dt.strftime('%Y-%m-%d'))
+    return batch
+
+def assert_same_dataset(loaded, dataset):
+    for table_name in hk.TABLE_NAMES:
+        assert comparable(getattr(loaded, table_name)).equals(comparable(getattr(dataset, table_name))), table_name
+    assert loaded.user_ids.equals(dataset.user_ids)
+    assert comparable(loaded.cube).equals(comparable(dataset.cube))
+    assert comparable(loaded.buyer_sketches.cells).equals(comparable(dataset.buyer_sketches.cells))
+    for name in hk.SKETCH_ARRAYS:
+        assert np.array_equal(getattr(loaded.buyer_sketches, name), getattr(dataset.buyer_sketches, name)), name
+
+def test_appended_generations_round_trip_through_segments(tmp_path):
+    data_dir = str(tmp_path)
+    generation, dataset = hk.publish_generation(data_dir, lambda generation: hk.Dataset.from_frames(
+        generation, *hk.generate_mock_data(20, 3, 3, seed=24)))
+    assert hk.current_generation(data_dir) == generation and dataset.stored_dir == hk.generation_dir(data_dir, generation)
+    for number in range(hk.STORED_SEGMENTS + 2):
+        batch = make_batch(25 + number, days_earlier=120 * (number % 3 == 1))
+        generation, dataset = hk.publish_generation(data_dir, lambda generation: dataset.appended(generation, *batch))
+        directory = hk.generation_dir(data_dir, generation)
+        segments = hk.stored_segments(directory)
+        # Written in full again after STORED_SEGMENTS appends
+        assert len(segments) == (number + 1 if number < hk.STORED_SEGMENTS else number - hk.STORED_SEGMENTS)
+        if segments: # The newest segment holds the batch alone
+            assert feather.read_table(os.path.join(segments[-1], 'tracking_data.arrow')).num_rows == len(batch[2])
+        assert_same_dataset(hk.load_dataset(generation, directory), dataset)
+    assert hk.current_generation(data_dir) == generation
+    assert sorted(os.listdir(os.path.join(data_dir, 'generations')), key=int) == [
+        str(number) for number in range(generation - hk.STORED_GENERATIONS + 1, generation + 1)]
+
+def test_generations_in_another_format_are_ignored(tmp_path):
+    data_dir = str(tmp_path)
+    generation, _ = hk.publish_generation(data_dir, lambda generation: hk.Dataset.from_frames(generation, *hk.generate_mock_data(5, 2, 2, seed=35)))
+    with open(os.path.join(hk.generation_dir(data_dir, generation), 'FORMAT'), 'w') as format_file:
+        format_file.write(str(hk.STORAGE_FORMAT - 1))
+    assert hk.current_generation(data_dir) is None
+    new_generation, _ = hk.publish_generation(data_dir, lambda generation: hk.Dataset.from_frames(generation, *hk.generate_mock_data(5, 2, 2, seed=36)))
+    assert new_generation == generation + 1 and hk.current_generation(data_dir) == new_generation
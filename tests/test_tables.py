@@ -0,0 +1,63 @@
+"""Checks of the server-side paginated tables against sorting the whole frame with pandas."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import HealthKart as hk
+
+def table_rows(table):
+    """Returns the cell texts of a generate_table body, row by row."""
+    return [[cell.children for cell in row.children] for row in table.children[1].children]
+
+def expected_rows(df, sort_by, ascending, page, page_size=hk.TABLE_PAGE_SIZE):
+    """Sorts all of df with pandas (stable, descending as the reverse for text) and formats one page."""
+    if df[sort_by].dtype.kind in 'iuf':
+        order = np.argsort(df[sort_by].to_numpy(dtype=np.float64) * (1 if ascending else -1), kind='stable')
+    else:
+        order = np.argsort(df[sort_by].to_numpy(), kind='stable')
+        order = order if ascending else order[::-1]
+    page_df = df.iloc[order[page * page_size:(page + 1) * page_size]]
+    return pd.DataFrame({col: hk.format_column(col, page_df[col]) for col in page_df.columns}).to_numpy().tolist()
+
+@pytest.fixture
+def performance():
+    rng = np.random.default_rng(13)
+    num_rows = 237
+    return pd.DataFrame({
+        'name': [f'Influencer {i}' for i in rng.permutation(num_rows)],
+        'roas': np.round(rng.exponential(2, num_rows), 1), # Rounded, so sorting has ties
+        'totalRevenue': rng.exponential(5000, num_rows),
+        'totalOrders': rng.integers(0, 50, num_rows),
+        'platform': pd.Categorical(rng.choice(['Instagram', 'YouTube', 'Twitter'], num_rows))
+    })
+
+@pytest.mark.parametrize('sort_by', ['roas', 'totalRevenue', 'totalOrders', 'name'])
+@pytest.mark.parametrize('ascending', [True, False])
+@pytest.mark.parametrize('page', [0, 3, 11])
+def test_render_table_page_matches_full_sort(performance, sort_by, ascending, page):
+    table, shown_page, total_rows = hk.render_table_page(performance, sort_by, ascending, page)
+    assert shown_page == page and total_rows == len(performance)
+    assert table_rows(table) == expected_rows(performance, sort_by, ascending, page)
+
+def test_render_table_page_sorts_categoricals_by_code(performance):
+    table, _, _ = hk.render_table_page(performance, 'platform', True, 0, page_size=300)
+    codes = performance['platform'].cat.codes.to_numpy()
+    assert [row[-1] for row in table_rows(table)] == performance['platform'].to_numpy()[np.argsort(codes, kind='stable')].tolist()
+
+def test_render_table_page_clamps_the_page(performance):
+    assert hk.render_table_page(performance, 'roas', False, 99)[1] == 11 # 237 rows: pages 0-11
+    assert hk.render_table_page(performance, 'roas', False, -3)[1] == 0
+    table, page, total_rows = hk.render_table_page(performance.iloc[:0], 'roas', False, 2)
+    assert (page, total_rows) == (0, 0) and table.children == "No data available for this selection."
+
+def test_describe_page():
+    assert hk.describe_page(0, 0) == "No rows"
+    assert hk.describe_page(0, 5) == "Rows 1-5 of 5"
+    assert hk.describe_page(2, 2345) == "Rows 41-60 of 2,345"
+
+@pytest.mark.parametrize('ascending', [True, False])
+def test_render_table_page_sorts_missing_values_last(performance, ascending):
+    performance['roas'] = performance['roas'].where(performance['roas'] < 3) # Roughly a quarter NaN
+    for page in range(12):
+        table, _, _ = hk.render_table_page(performance, 'roas', ascending, page)
+        assert table_rows(table) == expected_rows(performance, 'roas', ascending, page)
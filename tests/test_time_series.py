@@ -0,0 +1,32 @@
+"""Seeded checks of the Revenue Over Time downsampling against naive versions."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import HealthKart as hk
+
+def naive_lttb(x, y, num_points):
+    """LTTB with the same bucket edges as hk.lttb, one point and one bucket at a time."""
+    n = len(x)
+    if num_points >= n or num_points < 3:
+        return list(range(n))
+    edges = [int(edge) for edge in np.linspace(1, n - 1, num_points - 1)]
+    selected = [0]
+    for i in range(num_points - 2):
+        start, stop = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_bucket = pd.DataFrame({'x': x[stop:edges[i + 2]], 'y': y[stop:edges[i + 2]]}).mean()
+            next_x, next_y = next_bucket['x'], next_bucket['y']
+        else:
+            next_x, next_y = x[-1], y[-1]
+        prev_x, prev_y = x[selected[-1]], y[selected[-1]]
+        areas = [abs((prev_x - next_x) * (y[j] - prev_y) - (prev_x - x[j]) * (next_y - prev_y)) for j in range(start, stop)]
+        selected.append(start + int(np.argmax(areas)))
+    return selected + [n - 1]
+
+@pytest.mark.parametrize('n, num_points', [(500, 40), (101, 100), (1000, 3), (50, 80), (7, 2)])
+def test_lttb_matches_naive(n, num_points):
+    rng = np.random.default_rng(n)
+    x = np.sort(rng.choice(10 * n, n, replace=False)).astype(np.float64)
+    y = rng.normal(size=n).cumsum()
+    assert list(hk.lttb(x, y, num_points)) == naive_lttb(x, y, num_points)